@@ -0,0 +1,125 @@
+# Test script for the accounts handler (modules/accounts_handler.py), run from the bot folder:
+# python accounts_test_file.py
+# Discord is replaced by a stand-in client whose DMs take DM_LATENCY seconds, then the script times:
+# - give_account called player by player, each call first waiting DB_LATENCY seconds as the previous version read
+#   the usages of the player from the database, against give_accounts for the whole match
+# - send_account awaited player by player (previous behaviour), against send_accounts
+# Both ways must give the same accounts and send one DM per player.
+
+import asyncio
+from time import perf_counter
+from types import SimpleNamespace
+
+import classes
+import modules.accounts_handler as accounts
+import modules.config as cfg
+import modules.send_scheduler as send_scheduler
+from display import ContextWrapper
+
+# Rough duration of a discord DM call
+DM_LATENCY = 0.25
+# Rough duration of the usages read (db.async_db_call) done for each player by the previous give_account
+DB_LATENCY = 0.01
+NB_PLAYERS = 12
+NB_ACCOUNTS = 60
+
+# Player ids must not collide with account ids: both are keys of the usage index
+FIRST_PLAYER_ID = 1000
+
+STAFF_CHANNEL = 1
+SPAM_CHANNEL = 2
+
+
+class StandInTarget:
+    def __init__(self, target_id):
+        self.id = target_id
+        self.mention = f"<@{target_id}>"
+        self.sent = list()
+
+    async def send(self, **kwargs):
+        await asyncio.sleep(DM_LATENCY)
+        self.sent.append(kwargs)
+        return SimpleNamespace(id=len(self.sent), channel=self)
+
+
+class StandInClient:
+    def __init__(self):
+        self.targets = dict()
+
+    def get_user(self, user_id):
+        if user_id not in self.targets:
+            self.targets[user_id] = StandInTarget(user_id)
+        return self.targets[user_id]
+
+    get_channel = get_user
+
+    async def fetch_user(self, user_id):
+        return self.get_user(user_id)
+
+
+def reset_accounts():
+    accounts._available_accounts.clear()
+    accounts._busy_accounts.clear()
+    accounts._available_heap.clear()
+    accounts._usages.clear()
+    for a_id in range(NB_ACCOUNTS):
+        # Some history: each account was used by a few players
+        usages = [p_id for p_id in range(FIRST_PLAYER_ID, FIRST_PLAYER_ID + NB_PLAYERS * 2)
+                  if (p_id + a_id) % 13 == 0]
+        accounts._usages[a_id] = usages
+        for p_id in usages:
+            accounts._usages.setdefault(p_id, list()).append(a_id)
+        accounts._available_accounts[a_id] = classes.Account(f"{a_id:04d}", f"user{a_id}", "pwd", usages)
+        accounts._push_available(accounts._available_accounts[a_id])
+
+
+def get_players():
+    match = SimpleNamespace(id=1)
+    return [SimpleNamespace(id=p_id, name=f"player{p_id}", mention=f"<@{p_id}>", match=match, account=None,
+                            unique_usages=None)
+            for p_id in range(FIRST_PLAYER_ID, FIRST_PLAYER_ID + NB_PLAYERS)]
+
+
+async def run(client, concurrent):
+    reset_accounts()
+    a_players = get_players()
+    start = perf_counter()
+    if concurrent:
+        assert accounts.give_accounts(a_players)
+    else:
+        for a_player in a_players:
+            # Previous behaviour: one database round trip per player before giving the account
+            await asyncio.sleep(DB_LATENCY)
+            assert accounts.give_account(a_player)
+    given = perf_counter()
+    if concurrent:
+        await accounts.send_accounts(STAFF_CHANNEL, a_players)
+    else:
+        for a_player in a_players:
+            await accounts.send_account(STAFF_CHANNEL, a_player)
+    sent = perf_counter()
+    for a_player in a_players:
+        assert a_player.account.message is not None
+        assert len(client.targets[a_player.id].sent) == 1
+        client.targets[a_player.id].sent.clear()
+    print(f"{'give_accounts + send_accounts' if concurrent else 'give_account + send_account loop':<34}"
+          f"give: {(given - start) * 1000:.2f}ms, send: {sent - given:.2f}s")
+    return {a_player.id: a_player.account.id for a_player in a_players}
+
+
+async def main():
+    client = StandInClient()
+    ContextWrapper.init(client)
+    cfg.channels["staff"] = STAFF_CHANNEL
+    cfg.channels["spam"] = SPAM_CHANNEL
+    cfg.roles["admin"] = 0
+    # Account logs are batched in the spam channel, as in main.py
+    send_scheduler.init(low_channels=[SPAM_CHANNEL])
+    sequential = await run(client, concurrent=False)
+    concurrent = await run(client, concurrent=True)
+    assert sequential == concurrent, "Accounts given differ"
+    print(f"{NB_PLAYERS} players, same accounts given both ways")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
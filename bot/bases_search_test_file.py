@@ -0,0 +1,90 @@
+# Benchmark of the base search (classes/bases.py), run from the bot folder:
+# python bases_search_test_file.py
+# Synthetic bases are loaded as they would be from static_bases, then each query is timed with the previous
+# implementation (substring scan of every base name) and with the trigram index.
+# Both must return the same bases (the index also ranks them), and a query with a typo must find the base.
+
+from random import Random
+from time import perf_counter
+
+from classes import Base
+
+NB_BASES = 400
+REPEATS = 200
+
+_FIRST = ["Crossroads", "Indar", "Allatum", "Zurvan", "Hvar", "Mao", "Saurva", "Tawrich", "Ceres", "Peris",
+          "Rashnu", "Xenotech", "Regent", "Nott", "Ikanam", "Chimney", "Hatcher", "Bravata", "Sungrey", "Dahaka"]
+_SECOND = ["Watchtower", "Outpost", "Depot", "Garrison", "Labs", "Station", "Refinery", "Skydock", "Pass",
+           "Overlook", "Complex", "Bastion", "Relay", "Quarry", "Checkpoint"]
+
+
+def get_bases_data():
+    rng = Random(0)
+    data = list()
+    names = set()
+    while len(data) < NB_BASES:
+        name = f"{rng.choice(_FIRST)}{rng.choice(['', chr(39) + 's'])} {rng.choice(_SECOND)}"
+        if rng.random() < 0.3:
+            name += f" {rng.choice(_SECOND)}"
+        if name in names:
+            continue
+        names.add(name)
+        data.append({"_id": len(data) + 1000, "name": name, "zone_id": 2, "type_id": rng.choice([2, 3, 4, 5, 6]),
+                     "in_base_pool": rng.random() < 0.2})
+    return data
+
+
+def scan(name, base_pool=False):
+    # Implementation before the index
+    results = list()
+    name = name.lower()
+    if not name or name.isspace():
+        return results
+    for base in (Base._base_pool if base_pool else Base._all_bases_list.values()):
+        b_name = base.name.lower()
+        if name in b_name or name in b_name.replace("'", ""):
+            results.append(base)
+    return results
+
+
+def timed(fct, *args, **kwargs):
+    start = perf_counter()
+    for _ in range(REPEATS):
+        result = fct(*args, **kwargs)
+    return result, (perf_counter() - start) / REPEATS * 1e6
+
+
+def main():
+    Base.clear_all()
+    start = perf_counter()
+    for data in get_bases_data():
+        Base(data)
+    print(f"{NB_BASES} bases indexed in {(perf_counter() - start) * 1000:.1f}ms")
+
+    queries = ["indar", "hvars depot", "mao watch", "station", "tech plant", "ch", "regent's", "xyz"]
+    total_scan = total_index = 0
+    print(f"{'query':<16}{'matches':>8}{'scan':>10}{'index':>10}{'pool scan':>12}{'pool index':>12}  (us)")
+    for query in queries:
+        line = f"{query!r:<16}"
+        for base_pool in (False, True):
+            expected, t_scan = timed(scan, query, base_pool=base_pool)
+            result, t_index = timed(Base.get_bases_from_name, query, base_pool=base_pool)
+            assert {b.id for b in result} == {b.id for b in expected}, query
+            total_scan += t_scan
+            total_index += t_index
+            if not base_pool:
+                line += f"{len(expected):>8}{t_scan:>10.1f}{t_index:>10.1f}"
+            else:
+                line += f"{t_scan:>12.1f}{t_index:>12.1f}"
+        print(line)
+    print(f"total  scan: {total_scan:.0f}us  index: {total_index:.0f}us")
+
+    target = Base.get_bases_from_name("hatcher garrison")
+    typo, t_fuzzy = timed(Base.get_bases_from_name, "hatchr garisson", fuzzy=True)
+    assert not Base.get_bases_from_name("hatchr garisson"), "Typo should not match without fuzzy"
+    assert target and target[0] in typo, "Typo should find the base"
+    print(f"fuzzy 'hatchr garisson' -> {[b.name for b in typo]} in {t_fuzzy:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
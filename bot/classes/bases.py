@@ -1,5 +1,6 @@
 """ Contains list of all possible bases
     Contains base selection object when searching for a base
+    Base names are indexed by trigrams when loaded, for fast (and typo tolerant) search by name
 """
 
 import modules.config as cfg
@@ -12,15 +13,48 @@ log = getLogger("pog_bot")
 
 MAX_SELECTED = 15
 
+#: Minimum trigram similarity (0 to 1) for a base to be returned by a fuzzy search.
+FUZZY_THRESHOLD = 0.4
+#: Maximum number of bases returned by a fuzzy search.
+MAX_FUZZY_RESULTS = 5
+
+
+def _normalize(name):
+    return " ".join(name.lower().replace("'", "").split())
+
+
+def _get_trigrams(string, padded=False):
+    if padded:
+        string = f" {string} "
+    return {string[i:i + 3] for i in range(len(string) - 2)}
+
 
 class Base:
     _all_bases_list = dict()
     _base_pool = list()
+    # Ids of the bases of the pool, for fast filtering
+    _pool_ids = set()
+    # Search index: trigram -> ids of the bases having it in one of their searchable names
+    _trigrams = dict()
+    # Base id -> searchable names (lowercase name, name without apostrophes, aliases)
+    _search_names = dict()
 
     @classmethod
     def clear_all(cls):
         cls._all_bases_list.clear()
         cls._base_pool.clear()
+        cls._pool_ids.clear()
+        cls._trigrams.clear()
+        cls._search_names.clear()
+
+    @classmethod
+    def _index(cls, base, aliases):
+        names = {base.name.lower(), _normalize(base.name)}
+        names.update(_normalize(alias) for alias in aliases)
+        cls._search_names[base.id] = names
+        for name in names:
+            for gram in _get_trigrams(name):
+                cls._trigrams.setdefault(gram, set()).add(base.id)
 
     @classmethod
     def get(cls, m_id: int):
@@ -29,16 +63,95 @@ class Base:
         return None
 
     @classmethod
-    def get_bases_from_name(cls, name, base_pool=False):
-        results = list()
+    def get_bases_from_name(cls, name, base_pool=False, fuzzy=False):
+        """
+        Find the bases whose name contains the given string, best matches first.
+
+        :param name: String to search.
+        :param base_pool: Only search within the base pool.
+        :param fuzzy: If no base contains the string, return the bases with the most similar names (typos).
+        :return: List of bases.
+        """
         name = name.lower()
         if not name or name.isspace():
-            return results
-        for base in (cls._base_pool if base_pool else cls._all_bases_list.values()):
-            b_name = base.name.lower()
-            if name in b_name or name in b_name.replace("'", ""):
-                results.append(base)
-        return results
+            return list()
+        candidates = cls._get_candidates(name, base_pool)
+
+        ranked = list()
+        for b_id in candidates:
+            rank = cls._get_rank(name, cls._search_names[b_id])
+            if rank is not None:
+                ranked.append((rank, len(cls._all_bases_list[b_id].name), b_id))
+        if not ranked and fuzzy:
+            return cls._fuzzy_search(name, base_pool)
+        ranked.sort()
+        return [cls._all_bases_list[b_id] for rank, length, b_id in ranked]
+
+    @classmethod
+    def _get_candidates(cls, name, base_pool):
+        """
+        Ids of the bases (of the pool if base_pool) having all the trigrams of name,
+        all of them if name is too short for trigrams.
+        """
+        if len(name) < 3:
+            return cls._pool_ids if base_pool else cls._all_bases_list.keys()
+        candidates = cls._pool_ids if base_pool else None
+        for gram in _get_trigrams(name):
+            ids = cls._trigrams.get(gram, set())
+            candidates = ids.copy() if candidates is None else candidates & ids
+            if not candidates:
+                break
+        return candidates
+
+    @classmethod
+    def _get_similar_candidates(cls, name):
+        """
+        Ids of the bases having at least one trigram of name.
+        """
+        candidates = set()
+        for gram in _get_trigrams(name):
+            candidates.update(cls._trigrams.get(gram, ()))
+        return candidates
+
+    @staticmethod
+    def _get_rank(name, search_names):
+        """
+        Rank of a substring match (lower is better): 0 exact name, 1 name start, 2 word start, 3 anywhere.
+        None if no searchable name contains name.
+        """
+        best = None
+        for s_name in search_names:
+            pos = s_name.find(name)
+            if pos == -1:
+                continue
+            if s_name == name:
+                rank = 0
+            elif pos == 0:
+                rank = 1
+            elif s_name[pos - 1] == " ":
+                rank = 2
+            else:
+                rank = 3
+            if best is None or rank < best:
+                best = rank
+        return best
+
+    @classmethod
+    def _fuzzy_search(cls, name, base_pool):
+        grams = _get_trigrams(_normalize(name), padded=True)
+        scored = list()
+        for b_id in cls._get_similar_candidates(_normalize(name)):
+            if base_pool and b_id not in cls._pool_ids:
+                continue
+            score = 0
+            for s_name in cls._search_names[b_id]:
+                s_grams = _get_trigrams(s_name, padded=True)
+                # Dice coefficient
+                score = max(score, 2 * len(grams & s_grams) / (len(grams) + len(s_grams)))
+            if score >= FUZZY_THRESHOLD:
+                scored.append((-score, b_id))
+        scored.sort()
+        return [cls._all_bases_list[b_id] for score, b_id in scored[:MAX_FUZZY_RESULTS]]
 
     @classmethod
     def get_bases(cls):
@@ -56,7 +169,9 @@ class Base:
         self.__in_pool = data["in_base_pool"]
         if self.__in_pool:
             Base._base_pool.append(self)
+            Base._pool_ids.add(self.__id)
         Base._all_bases_list[self.__id] = self
+        Base._index(self, data.get("aliases", list()))
 
     def get_data(self):  # get data for database push
         data = {"_id": self.__id,
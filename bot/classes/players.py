@@ -8,8 +8,7 @@
 import modules.config as cfg
 from modules.asynchttp import api_request_and_retry as http_request, ApiNotReachable
 from modules.tools import UnexpectedError
-from lib.tasks import loop
-from modules.roles import role_update
+from modules.roles import schedule_role_update
 import modules.database as db
 import modules.tools as tools
 import re
@@ -312,14 +311,7 @@ class Player:
         return accs
 
     def update_role(self):
-        try:
-            self.role_task.start()
-        except RuntimeError:  # if task is already active
-            log.warning(f"Player task conflict: {self.name}")
-
-    @loop(count=1)
-    async def role_task(self):
-        await role_update(self)
+        schedule_role_update(self, delay=0)
 
     def on_lobby_leave(self):
         self.__lobby_stamp = 0
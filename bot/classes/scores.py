@@ -3,9 +3,13 @@ import modules.database as db
 from modules.tools import AutoDict
 
 import operator
+from types import MappingProxyType
 
 _name_getter_func = None
 
+# Most players never use illegal weapons: their dictionaries are only created when needed
+_NO_ILL_WEAPONS = MappingProxyType(dict())
+
 
 def init(name_getter_func):
     global _name_getter_func
@@ -13,7 +17,9 @@ def init(name_getter_func):
 
 
 def ill_weapons_from_data(data):
-    ill_weapons = dict()
+    if not data:
+        return None
+    ill_weapons = AutoDict()
     for weap_doc in data:
         ill_weapons[weap_doc["weapon_id"]] = weap_doc["kills"]
     return ill_weapons
@@ -30,6 +36,10 @@ def get_ill_weapons_doc(ill_weapons):
 
 
 class TeamScore:
+    # Slotted: a whole tree of scores is built for every match loaded from the database
+    __slots__ = ("__id", "__name", "__faction", "__match", "__kills", "__deaths", "__net", "__score", "__cap",
+                 "__headshots", "__players", "__won_match")
+
     def __init__(self, t_id, match, name, faction):
         self.__id = t_id
         self.__name = name
@@ -166,6 +176,9 @@ class TeamScore:
 
 
 class PlayerScore:
+    __slots__ = ("stats", "__id", "__team", "__name", "__ig_name", "__ig_id", "__kills", "__deaths", "__net",
+                 "__score", "__headshots", "__is_disabled", "__rounds", "__illegal_weapons", "__loadouts")
+
     def __init__(self, p_id, team):
         self.stats = None
         self.__id = p_id
@@ -180,7 +193,7 @@ class PlayerScore:
         self.__headshots = 0
         self.__is_disabled = False
         self.__rounds = [False, False]
-        self.__illegal_weapons = AutoDict()
+        self.__illegal_weapons = None
         self.__loadouts = dict()
 
     @classmethod
@@ -205,10 +218,7 @@ class PlayerScore:
                 obj.__kills += ld.kills
                 obj.__headshots += ld.headshots
                 for weap in ld.ill_weapons.keys():
-                    if weap in obj.__illegal_weapons:
-                        obj.__illegal_weapons[weap] += ld.ill_weapons[weap]
-                    else:
-                        obj.__illegal_weapons[weap] = ld.ill_weapons[weap]
+                    obj.add_illegal_weapon(weap, ld.ill_weapons[weap])
         return obj
 
     def disable(self):
@@ -223,7 +233,7 @@ class PlayerScore:
         self.__deaths = 0
         self.__kills = 0
         self.__headshots = 0
-        self.__illegal_weapons.clear()
+        self.__illegal_weapons = None
         self.__loadouts.clear()
 
     def round_update(self, round_num):
@@ -247,8 +257,7 @@ class PlayerScore:
         return [load.name for load in sorted_loadouts]
 
     def update_stats(self):
-        nb_rounds_played = self.__rounds.count(True)
-        self.stats.add_data(self.team.match.id, self.team.match.round_length * nb_rounds_played, self)
+        self.stats.add_data(self.team.match.id, self.team.match.round_length * self.nb_rounds_played, self)
 
     async def db_update_stats(self):
         self.update_stats()
@@ -258,6 +267,10 @@ class PlayerScore:
     def match(self):
         return self.__team.match
 
+    @property
+    def nb_rounds_played(self):
+        return self.__rounds.count(True)
+
     @property
     def is_disabled(self):
         return self.__is_disabled
@@ -359,11 +372,16 @@ class PlayerScore:
         self.__net += points
         self.__team.add_net(points)
 
-    def add_illegal_weapon(self, weap_id):
-        self.__illegal_weapons.auto_add(weap_id, 1)
+    def add_illegal_weapon(self, weap_id, kills=1):
+        if self.__illegal_weapons is None:
+            self.__illegal_weapons = AutoDict()
+        self.__illegal_weapons.auto_add(weap_id, kills)
 
 
 class Loadout:
+    __slots__ = ("__id", "__player_score", "__name", "__faction", "__kills", "__deaths", "__score", "__net",
+                 "__headshots", "__illegal_weapons", "__weight")
+
     def __init__(self, l_id, p_score):
         self.__id = l_id
         self.__player_score = p_score
@@ -374,7 +392,7 @@ class Loadout:
         self.__score = 0
         self.__net = 0
         self.__headshots = 0
-        self.__illegal_weapons = AutoDict()
+        self.__illegal_weapons = None
         self.__weight = 0
 
     @property
@@ -415,7 +433,7 @@ class Loadout:
 
     @property
     def ill_weapons(self):
-        return self.__illegal_weapons
+        return self.__illegal_weapons or _NO_ILL_WEAPONS
 
     @property
     def headshots(self):
@@ -441,7 +459,7 @@ class Loadout:
                 "kills": self.__kills,
                 "weight": self.__weight,
                 "headshots": self.__headshots,
-                "ill_weapons": get_ill_weapons_doc(self.__illegal_weapons)
+                "ill_weapons": get_ill_weapons_doc(self.ill_weapons)
                 }
         return data
 
@@ -450,6 +468,8 @@ class Loadout:
 
     def add_illegal_weapon(self, weap_id):
         self.__player_score.add_illegal_weapon(weap_id)
+        if self.__illegal_weapons is None:
+            self.__illegal_weapons = AutoDict()
         self.__illegal_weapons.auto_add(weap_id, 1)
 
     def add_one_kill(self, points, is_hs):
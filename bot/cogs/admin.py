@@ -17,10 +17,18 @@ import modules.lobby as lobby
 import modules.tools as tools
 import modules.accounts_handler as accounts_sheet
 import modules.spam_checker as spam_checker
+import modules.base_stats as base_stats
+import modules.match_metrics as match_metrics
+import modules.message_filter as message_filter
+import modules.timers as timers
+import modules.diagnostics as diagnostics
+import modules.asynchttp as asynchttp
 import asyncio
-from lib.tasks import loop, Loop
+from lib.tasks import loop
 
 from match.classes.match import Match
+import match.commands.command as match_commands
+import match.plugins.ts3_interface as ts3_interface
 
 from classes import Player
 
@@ -147,6 +155,10 @@ class AdminCog(commands.Cog, name='admin'):
                     giga_string += f"\nSpammer: id[{k}], spam value: [{all_spammers[k]}]"
             await disp.SPAM_DEBUG.send(ctx, giga_string)
             return
+        if arg == "stats":
+            stats = spam_checker.get_stats()
+            await disp.SPAM_STATS.send(ctx, "\n".join(f"{k}: {v}" for k, v in stats.items()))
+            return
         await disp.WRONG_USAGE.send(ctx, ctx.command.name)
 
     @commands.command()
@@ -255,6 +267,43 @@ class AdminCog(commands.Cog, name='admin'):
             loader.unlock_all(self.client)
             await disp.BOT_UNLOCKED.send(ctx)
             return
+        if arg == "metrics":
+            if len(args) > 1 and args[1] == "export":
+                path = await asyncio.get_event_loop().run_in_executor(None, match_metrics.write_prometheus)
+                await disp.BOT_METRICS_EXPORT.image_send(ctx, path)
+                return
+            await disp.BOT_METRICS.send(ctx, summary=match_metrics.get_summary())
+            stats = message_filter.get_stats()
+            await disp.BOT_COMMAND_STATS.send(ctx, "\n".join(f"{k}: {v}" for k, v in stats.items()))
+            stats = match_commands.get_stats()
+            if stats:
+                await disp.BOT_MATCH_COMMAND_STATS.send(ctx, "\n".join(
+                    f"{k}: {v['count']} calls, {v['errors']} errors, avg {v['avg_time']:.2f}s, max {v['max_time']:.2f}s"
+                    for k, v in stats.items()))
+            stats = timers.get_stats()
+            await disp.BOT_TIMER_STATS.send(ctx, "\n".join(f"{k}: {v}" for k, v in stats.items()))
+            return
+        if arg == "diagnostics":
+            stats = diagnostics.get_stats()
+            lines = list()
+            for name, values in stats.items():
+                values = ", ".join(f"{k} {v:.3f}" if isinstance(v, float) else f"{k} {v}" for k, v in values.items())
+                lines.append(f"{name}: {values}")
+            await disp.BOT_DIAGNOSTICS.send(ctx, "\n".join(lines))
+            stats = asynchttp.get_stats()
+            await disp.BOT_HTTP_STATS.send(ctx, "\n".join(
+                f"{name}: {v['requests']} requests, {v['errors']} errors, "
+                f"{v['connections_reused']}/{v['connections_created'] + v['connections_reused']} connections reused, "
+                f"dns cache {v['dns_cache_hits']} hits {v['dns_cache_misses']} misses"
+                for name, v in stats.items()))
+            stats = ts3_interface.get_stats()
+            await disp.BOT_AUDIO_STATS.send(ctx, "\n".join(f"{k}: {v}" for k, v in stats.items()))
+            reports = diagnostics.get_stall_reports()
+            if reports:
+                task_name, blocked, stack = reports[-1]
+                # Keep the innermost frames, within discord message length
+                await disp.BOT_LAST_STALL.send(ctx, task_name, blocked, stack[-1500:])
+            return
         await disp.WRONG_USAGE.send(ctx, ctx.command.name)
 
     @commands.command()
@@ -282,7 +331,7 @@ class AdminCog(commands.Cog, name='admin'):
             arg = args[0]
             loop = asyncio.get_event_loop()
             if arg == "accounts":
-                await loop.run_in_executor(None, accounts_sheet.init, cfg.GAPI_JSON)
+                await loop.run_in_executor(None, accounts_sheet.init)
                 await disp.BOT_RELOAD.send(ctx, "Accounts")
                 return
             if arg == "weapons":
@@ -303,6 +352,28 @@ class AdminCog(commands.Cog, name='admin'):
                 return
         await disp.WRONG_USAGE.send(ctx, ctx.command.name)
 
+    @commands.command()
+    @commands.guild_only()
+    async def balance(self, ctx, *args):
+        if len(args) == 0:
+            await disp.BALANCE_DISPLAY.send(ctx, title="All bases", nb_matches=base_stats.get_nb_matches(),
+                                            factions=base_stats.get_faction_stats(),
+                                            sides=base_stats.get_side_stats(),
+                                            pairings=base_stats.get_pairing_stats())
+            return
+        bases = classes.Base.get_bases_from_name(" ".join(args))
+        if len(bases) == 0:
+            await disp.BASE_NOT_FOUND.send(ctx)
+            return
+        base = bases[0]
+        nb_matches = base_stats.get_nb_matches(base.id)
+        if nb_matches == 0:
+            await disp.BALANCE_NO_DATA.send(ctx)
+            return
+        await disp.BALANCE_DISPLAY.send(ctx, title=base.name, nb_matches=nb_matches,
+                                        factions=base_stats.get_faction_stats(base.id),
+                                        sides=base_stats.get_side_stats(base.id))
+
     @commands.command(aliases=['rm'])
     @commands.guild_only()
     async def remove(self, ctx):
@@ -347,10 +418,10 @@ def setup(client):
     client.add_cog(AdminCog(client))
 
 def _log_command(ctx):
-    Loop(coro=_log_admin_command_impl, count=1).start(ctx)
+    timers.spawn(_log_admin_command_impl, ctx)
 
 async def _log_admin_command_impl(ctx):
-    await disp.ADMIN_MSG_LOG.send(ContextWrapper.channel(cfg.channels["spam"]), ctx.author.name, ctx.author.id, ctx.message.content, ctx.channel.id)
+    await disp.ADMIN_MSG_LOG.send(ContextWrapper.channel(cfg.channels["spam"], is_batchable=True), ctx.author.name, ctx.author.id, ctx.message.content, ctx.channel.id)
 
 async def _check_channels(ctx, channels):
     if not isinstance(channels, list):
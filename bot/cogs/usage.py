@@ -10,6 +10,7 @@ import modules.config as cfg
 import modules.database as db
 import modules.tools as tools
 import modules.stat_processor as stat_processor
+import modules.leaderboard as leaderboard
 
 from classes import PlayerStat, Player
 
@@ -106,6 +107,26 @@ class RegisterCog(commands.Cog, name='usage'):
 
         await disp.PSB_USAGE.send(ctx, stat_player.mention, req_date, player=stat_player, usages=usages)
 
+    @commands.command(aliases=['leaderboard'])
+    @commands.guild_only()
+    async def top(self, ctx, *args):
+        metric = "kpm"
+        period = None
+        for arg in args:
+            if arg in leaderboard.METRICS:
+                metric = arg
+            elif arg in leaderboard.PERIODS:
+                period = arg
+            else:
+                await disp.TOP_INVALID.send(ctx, arg, ", ".join(leaderboard.METRICS), ", ".join(leaderboard.PERIODS))
+                return
+
+        top = leaderboard.get_top(metric, period)
+        if not top:
+            await disp.TOP_NO_DATA.send(ctx)
+            return
+        await disp.TOP_DISPLAY.send(ctx, metric=leaderboard.get_metric_name(metric), period=period, top=top)
+
 
 def setup(client):
     client.add_cog(RegisterCog(client))
@@ -4,7 +4,10 @@ from logging import getLogger
 from aiohttp.client_exceptions import ClientError
 from discord.backoff import ExponentialBackoff
 import asyncio
+from hashlib import blake2b
+from json import dumps
 from modules.tools import UnexpectedError
+import modules.send_scheduler as send_scheduler
 
 log = getLogger("pog_bot")
 
@@ -60,10 +63,21 @@ class Message:
 
         return elements
 
+    @staticmethod
+    def get_digest(elements):
+        """ Digest of the content and embed of rendered elements, used to detect identical edits
+        """
+        data = {'content': elements.get('content')}
+        if 'embed' in elements:
+            data['embed'] = elements['embed'].to_dict()
+        return blake2b(dumps(data, sort_keys=True).encode(), digest_size=16).digest()
+
 
 class ContextWrapper:
 
     client = None
+    # Interaction responses are not subject to channel rate limits, and must be sent within 3 seconds
+    is_scheduled = True
 
     @classmethod
     def init(cls, client):
@@ -77,7 +91,10 @@ class ContextWrapper:
             author = ctx.author
             message = ctx.message
             original_ctx = ctx.original_ctx
-            return cls(author, cmd_name, channel_id, message, original_ctx)
+            new_ctx = cls(author, cmd_name, channel_id, message, original_ctx)
+            new_ctx.priority = ctx.priority
+            new_ctx.is_batchable = ctx.is_batchable
+            return new_ctx
         try:
             cmd_name = ctx.command.name
         except AttributeError:
@@ -85,7 +102,8 @@ class ContextWrapper:
         try:
             channel_id = ctx.channel.id
         except AttributeError:
-            channel_id = 0
+            # ctx is the channel itself (or a user, for DMs)
+            channel_id = getattr(ctx, "id", 0)
         if not author:
             try:
                 author = ctx.author
@@ -110,9 +128,15 @@ class ContextWrapper:
         return cls(user, "?", user_id, None, user)
 
     @classmethod
-    def channel(cls, channel_id, cmd_name="?"):
+    def channel(cls, channel_id, cmd_name="?", priority=None, is_batchable=False):
+        """ Context for a channel. If is_batchable, the message can be merged with other low priority messages
+            of the channel: only use it when the message sent is not used afterwards.
+        """
         channel = cls.client.get_channel(channel_id)
-        return cls(None, cmd_name, channel_id, None, channel)
+        ctx = cls(None, cmd_name, channel_id, None, channel)
+        ctx.priority = priority
+        ctx.is_batchable = is_batchable
+        return ctx
 
     def __init__(self, author, cmd_name, channel_id, message, original_ctx):
         self.author = author
@@ -121,6 +145,8 @@ class ContextWrapper:
         self.original_ctx = original_ctx
         self.message = message
         self.interaction_payload = None
+        self.priority = None
+        self.is_batchable = False
 
     async def send(self, **kwargs):
         return await self._do_send('send', kwargs)
@@ -134,7 +160,12 @@ class ContextWrapper:
             try:
                 if i != 0:
                     await asyncio.sleep(backoff.delay())
-                msg = await getattr(self.original_ctx, command)(**kwargs)
+                fct = getattr(self.original_ctx, command)
+                if self.is_scheduled:
+                    msg = await send_scheduler.submit(self.channel_id, fct, kwargs, self.priority,
+                                                         self.is_batchable)
+                else:
+                    msg = await fct(**kwargs)
                 if self.interaction_payload:
                     self.interaction_payload.message_callback(msg, kwargs)
                 return msg
@@ -146,6 +177,8 @@ class ContextWrapper:
 
 
 class InteractionContext(ContextWrapper):
+    is_scheduled = False
+
     def __init__(self, interaction, ephemeral=True):
         cmd_name = "?"
         channel_id = interaction.channel_id
@@ -162,6 +195,8 @@ class InteractionContext(ContextWrapper):
 
 
 class InteractionFollowup(ContextWrapper):
+    is_scheduled = False
+
     def __init__(self, interaction, ephemeral=True):
         cmd_name = "?"
         channel_id = interaction.channel_id
@@ -79,8 +79,11 @@ def admin_help(ctx):
                     value='`=channel (un)freeze` - Prevent users from typing in a channel\n'
                           '`=pog version` - Display current version and lock status\n'
                           '`=pog (un)lock` - Prevent users from interacting with the bot (but admins still can)\n'
+                          '`=pog metrics [export]` - Display (or export) the duration of the match phases\n'
+                          '`=pog diagnostics` - Display the event loop lag, executor queues and http connections\n'
                           '`=reload accounts`/`bases`/`weapons`/`config` - Reload specified element from the database\n'
-                          '`=spam clear` - Clear the spam filter\n',
+                          '`=spam clear`/`debug`/`stats` - Clear or inspect the spam filter\n'
+                          '`=balance [base]` - Display faction and side win rates, on all bases or on one base\n',
                     inline=False)
     embed.add_field(name='Lobby commands',
                     value='`=remove @player` - Remove the player from queue\n'
@@ -148,7 +151,8 @@ def usage_help(ctx):
                     value=f'`=usage x` - Get last usages of POG account x\n'
                           f'`=usage @user` - Get last usages of the mentioned user\n'
                           f'`=psb @user (date)` - Get user activity formatted for PSB purposes\n'
-                          f'`=stats @user (duration)` - Get player stats for the duration provided',
+                          f'`=stats @user (duration)` - Get player stats for the duration provided\n'
+                          f'`=top (metric) (week/month)` - Display the leaderboard for the given metric',
                     inline=False)
     return embed
 
@@ -352,7 +356,13 @@ def flip_accounts(ctx, account_names):
     return embed
 
 
-def team_update(ctx, match):
+def match_status(ctx, match):
+    """ Returns the match status message, with a coarse countdown: the message is only edited when it changes
+    """
+    return team_update(ctx, match, coarse_time=True)
+
+
+def team_update(ctx, match, coarse_time=False):
     """ Returns the current teams
     """
     # title = ""
@@ -362,7 +372,7 @@ def team_update(ctx, match):
         title = f"Match {match.id}"
     desc = match.status_str
     if match.status is MatchStatus.IS_PLAYING:
-        desc += f"\nTime Remaining: **{match.get_formatted_time_to_round_end()}**"
+        desc += f"\nTime Remaining: **{match.get_formatted_time_to_round_end(coarse=coarse_time)}**"
     embed = Embed(colour=Color.blue(), title=title, description=desc)
     if match.base is not None:
         embed.add_field(name="Base", value=match.base.name, inline=False)
@@ -512,6 +522,53 @@ def psb_usage(ctx, player, usages):
 
     return embed
 
+
+def leaderboard(ctx, metric, period, top):
+    if period:
+        title = f"{metric} - this {period}"
+    else:
+        title = f"{metric} - all time"
+    embed = Embed(colour=Color.blue(), title=title)
+    lines = list()
+    for i, (p_id, value) in enumerate(top):
+        if isinstance(value, float):
+            value = '{:.3f}'.format(value)
+        lines.append(f"**{i + 1}.** <@{p_id}>: {value}")
+    embed.add_field(name="Leaderboard", value="\n".join(lines), inline=False)
+    return embed
+
+
+def balance(ctx, title, nb_matches, factions, sides, pairings=None):
+    embed = Embed(colour=Color.blue(), title=title, description=f"{nb_matches} matches played")
+
+    def format_record(name, record):
+        return f"{name}: {'{:.1f}'.format(100 * record.win_rate)}% wins " \
+               f"({record.wins}/{record.matches}, {record.draws} draws), " \
+               f"avg score {'{:.1f}'.format(record.avg_score)}"
+
+    lines = [format_record(cfg.factions[f_id], record) for f_id, record in factions.items() if record.matches]
+    embed.add_field(name="Factions", value="\n".join(lines) or "No data", inline=False)
+    lines = [format_record(f"Team {i + 1}", record) for i, record in enumerate(sides) if record.matches]
+    embed.add_field(name="Sides", value="\n".join(lines) or "No data", inline=False)
+    if pairings:
+        lines = [format_record(f"{cfg.factions[f_id]} vs {cfg.factions[other]}", record)
+                 for (f_id, other), record in sorted(pairings.items()) if record.matches and f_id < other]
+        embed.add_field(name="Faction pairings", value="\n".join(lines), inline=False)
+    return embed
+
+
+def match_metrics(ctx, summary):
+    embed = Embed(colour=Color.blue(), title="Match phases", description="Durations since bot start")
+    for description, count, mean, median, p90, max_value in summary:
+        if count == 0:
+            value = "No data"
+        else:
+            value = f"{count} matches, mean {'{:.0f}'.format(mean)}s, median {'{:.0f}'.format(median)}s, " \
+                    f"90% {'{:.0f}'.format(p90)}s, max {'{:.0f}'.format(max_value)}s"
+        embed.add_field(name=description, value=value, inline=False)
+    return embed
+
+
 def player_stats(ctx, stats, recent_stats):
     embed = Embed(title=f"{stats.name}'s Stats:", colour=Color.blue())
     embed.add_field(name="Recent (last 2 weeks)",
@@ -62,7 +62,7 @@ class AllStrings(Enum):
     PK_WRONG_CHANNEL = Message("You are in the wrong channel! Check <#{}> instead")
     PK_NOT_TURN = Message("It's not your turn!")
     PK_NOT_CAPTAIN = Message("You are not Team Captain!")
-    PK_SHOW_TEAMS = Message("Match status:", embed=embeds.team_update)
+    PK_SHOW_TEAMS = Message("Match status:", embed=embeds.match_status)
     PK_PLAYERS_HELP = Message("Waiting for {} to pick a player with `=p @mention`", ping=False)
     PK_NO_ARG = Message("@ mention a player to pick!")
     PK_TOO_MUCH = Message("You can't pick more than one player at the same time!")
@@ -94,6 +94,8 @@ class AllStrings(Enum):
     UNKNOWN_ERROR = Message("Something unexpected happened! Please try again or contact staff if it keeps happening.\n"
                             "Details: *{}*")
     STOP_SPAM = Message("Previous request is being processed... Please avoid spamming!")
+    STOP_SPAM_RATE = Message("Too many requests! Please wait a few seconds before trying again.")
+    SPAM_STATS = Message("Spam filter stats: ```{}```")
     HELP = Message("Available commands:", embed=embeds.auto_help)
     INVALID_COMMAND = Message("Invalid command! Type `=help` for the list of available commands.")
     WRONG_USAGE = Message("Wrong usage of the command `={}`!")
@@ -137,6 +139,15 @@ class AllStrings(Enum):
     BOT_DM = Message(None, embed=embeds.direct_message)
     BOT_DM_RECEIVED = Message("Thanks for your message, it was forwarded to POG staff!", ping=False)
     BOT_RELOAD = Message("{} reloaded!")
+    BOT_METRICS = Message("Here are the match metrics:", ping=False, embed=embeds.match_metrics)
+    BOT_COMMAND_STATS = Message("Command processing stats: ```{}```", ping=False)
+    BOT_MATCH_COMMAND_STATS = Message("Match commands stats: ```{}```", ping=False)
+    BOT_TIMER_STATS = Message("Timers stats: ```{}```", ping=False)
+    BOT_DIAGNOSTICS = Message("Event loop diagnostics: ```{}```", ping=False)
+    BOT_HTTP_STATS = Message("Http upstreams stats: ```{}```", ping=False)
+    BOT_AUDIO_STATS = Message("TS3 audio cues stats: ```{}```", ping=False)
+    BOT_LAST_STALL = Message("Last event loop stall: {} blocked for more than {:.2f}s ```{}```", ping=False)
+    BOT_METRICS_EXPORT = Message("Match metrics exported in Prometheus format:", ping=False)
     BOT_U_DUMB = Message("That's not really nice, I'm doing my best to bring 24/7 Jaeger matches in a friendly "
                          "environment and all the rewards that I get are insults and wickedness :(")
 
@@ -216,6 +227,11 @@ class AllStrings(Enum):
     ACCOUNT_USAGE = Message("Here is the POG account usage for this user:", embed=embeds.usage)
     DISPLAY_USAGE = Message("<@{}> played {} POG match{} in the last {}. \n(since {})", ping=False)
     PSB_USAGE = Message("Here is the participation for {}, for 8 weeks leading up to {}:", ping=False, embed=embeds.psb_usage)
+    TOP_DISPLAY = Message("Here is the POG leaderboard:", ping=False, embed=embeds.leaderboard)
+    TOP_INVALID = Message("Invalid argument `{}`! Available leaderboards: `{}`, available periods: `{}`")
+    TOP_NO_DATA = Message("No data for this leaderboard yet!")
+    BALANCE_DISPLAY = Message("Here is the balance data:", ping=False, embed=embeds.balance)
+    BALANCE_NO_DATA = Message("No match played on this base yet!")
 
     NOTIFY_REMOVED = Message("You left Notify!")
     NOTIFY_ADDED = Message("You joined Notify!")
@@ -309,6 +325,39 @@ class AllStrings(Enum):
         kwargs = self.value.get_elements(msg, string_args=args, ui_kwargs=kwargs)
         return await msg.edit(**kwargs)
 
+    async def edit_if_changed(self, msg, digest, *args, **kwargs):
+        """
+        Edit the message, unless it would be identical to the current one.
+
+        :param msg: Message to edit.
+        :param digest: Digest of the current message, as returned by a previous call. None to force the edit.
+        :param args: Additional strings to format the main string with.
+        :param kwargs: Keywords arguments to pass to the embed function.
+        :return: The new digest, and whether the message was edited.
+        """
+        if not isinstance(msg, ContextWrapper):
+            msg = ContextWrapper.wrap(msg)
+        kwargs = self.value.get_elements(msg, string_args=args, ui_kwargs=kwargs)
+        new_digest = Message.get_digest(kwargs)
+        if new_digest == digest:
+            return digest, False
+        await msg.edit(**kwargs)
+        return new_digest, True
+
+    def get_digest(self, msg, *args, **kwargs):
+        """
+        Get the digest of the message, as it would be rendered by :meth:`edit_if_changed`.
+
+        :param msg: Message which would be edited.
+        :param args: Additional strings to format the main string with.
+        :param kwargs: Keywords arguments to pass to the embed function.
+        :return: The digest.
+        """
+        if not isinstance(msg, ContextWrapper):
+            msg = ContextWrapper.wrap(msg)
+        kwargs = self.value.get_elements(msg, string_args=args, ui_kwargs=kwargs)
+        return Message.get_digest(kwargs)
+
     async def image_send(self, ctx, image_path, *args):
         if not isinstance(ctx, ContextWrapper):
             ctx = ContextWrapper.wrap(ctx)
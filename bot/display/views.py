@@ -35,6 +35,10 @@ def bases_selection(ctx):
             emoji = '🟥'
             description_args.append("Currently booked!")
 
+        if base['balance']:
+            # Displayed last
+            description_args.insert(0, base['balance'])
+
         if description_args:
             description = " ".join(description_args[::-1])
         else:
@@ -0,0 +1,98 @@
+# Benchmark of the interaction router (modules/interactions.py), run from the bot folder:
+# python interactions_test_file.py
+# NB_VIEWS handlers each send a view on a stand-in message, then the script:
+# - clicks random views NB_CLICKS times and reports the click to callback latency
+# - cleans NB_CLEANS handlers and checks their views are disabled in batches
+# - drops all handlers and checks that their routes are gone with them
+
+import asyncio
+import gc
+from random import Random
+from time import perf_counter
+from types import SimpleNamespace
+
+import modules.interactions as interactions
+from display import ContextWrapper, views
+
+NB_VIEWS = 500
+NB_CLICKS = 20000
+NB_CLEANS = 300
+# Users clicking, enough for the spam filter not to reject anyone
+NB_USERS = 5000
+
+
+class StandInChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+
+class StandInMessage:
+    def __init__(self, msg_id, channel):
+        self.id = msg_id
+        self.channel = channel
+        self.edits = list()
+
+    async def edit(self, **kwargs):
+        self.edits.append((perf_counter(), kwargs))
+
+
+class Owner:
+    # Owner of the handlers, as a match or a lobby would be
+    pass
+
+
+def get_handler(i, latencies, clicks):
+    ih = interactions.InteractionHandler(Owner(), views.accept_button, disable_after_use=False)
+
+    @ih.callback('accept')
+    async def on_accept(player, interaction_id, interaction, interaction_values):
+        latencies.append(perf_counter() - clicks[interaction.id])
+
+    ctx = ih.get_new_context(StandInChannel(i))
+    view = ctx.interaction_payload.view(ctx)
+    msg = StandInMessage(10000 + i, ctx.original_ctx)
+    ih.message_callback(msg, {'view': view})
+    return ih, msg
+
+
+async def main():
+    # Only the router is measured here, not discord rate limits
+    ContextWrapper.is_scheduled = False
+    rng = Random(0)
+    latencies = list()
+    clicks = dict()
+    handlers = [get_handler(i, latencies, clicks) for i in range(NB_VIEWS)]
+    print(f"{NB_VIEWS} live views, {len(interactions._routes)} routes")
+
+    for i in range(NB_CLICKS):
+        msg = handlers[rng.randrange(NB_VIEWS)][1]
+        user = SimpleNamespace(id=i % NB_USERS, name="user", mention=f"<@{i % NB_USERS}>")
+        interaction = SimpleNamespace(id=i, message=msg, data={'custom_id': 'accept'}, user=user,
+                                      channel_id=msg.channel.id, response=None)
+        clicks[i] = perf_counter()
+        await interactions.dispatch(interaction)
+    assert len(latencies) == NB_CLICKS, f"{NB_CLICKS - len(latencies)} clicks did not reach their callback"
+    latencies.sort()
+    print(f"{NB_CLICKS} clicks, click to callback: avg {sum(latencies) / NB_CLICKS * 1e6:.1f}us, "
+          f"p99 {latencies[int(NB_CLICKS * 0.99)] * 1e6:.1f}us, max {latencies[-1] * 1e6:.1f}us")
+
+    start = perf_counter()
+    for ih, msg in handlers[:NB_CLEANS]:
+        ih.clean()
+    while interactions._is_disabling:
+        await asyncio.sleep(0.01)
+    stamps = sorted(msg.edits[0][0] for ih, msg in handlers[:NB_CLEANS] if msg.edits)
+    assert len(stamps) == NB_CLEANS, "Every cleaned view should be disabled once"
+    assert all(item.disabled for ih, msg in handlers[:NB_CLEANS] for item in msg.edits[0][1]['view'].children)
+    nb_batches = 1 + len([1 for previous, stamp in zip(stamps, stamps[1:]) if stamp - previous > 0.05])
+    print(f"{NB_CLEANS} cleans disabled in {nb_batches} batch(es), {(perf_counter() - start) * 1000:.0f}ms")
+    assert len(interactions._routes) == NB_VIEWS - NB_CLEANS
+
+    handlers.clear()
+    gc.collect()
+    print(f"Handlers dropped, {len(interactions._routes)} routes left")
+    assert not interactions._routes
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -35,8 +35,12 @@ import modules.message_filter
 import modules.accounts_handler
 import modules.signal
 import modules.stat_processor
+import modules.leaderboard
 import modules.interactions
 import modules.asynchttp
+import modules.send_scheduler
+import modules.sheets
+import modules.diagnostics
 
 # Classes
 from match.classes.match import Match
@@ -137,7 +141,8 @@ def _add_main_handlers(client):
         player = Player.get(user.id)
         if not player:
             return
-        await modules.roles.role_update(player)
+        # Debounced: rapid status flips result in a single role update
+        modules.roles.schedule_role_update(player)
 
 
 @loop(hours=12)
@@ -188,14 +193,17 @@ def _add_init_handlers(client):
         # Init signal handler
         modules.signal.init()
 
-        # Init http
-        await modules.asynchttp.init_http()
+        # Watch the event loop lag and executor queues
+        modules.diagnostics.start()
+
+        # Keep google sheets up to date in the background
+        modules.sheets.start_sync()
 
         _update_rules_message.start(client)
 
-        # Update all players roles
+        # Update all players roles, in the background
         for p in Player.get_all_players_list():
-            await modules.roles.role_update(p)
+            modules.roles.schedule_role_update(p, delay=0)
         _add_main_handlers(client)
 
         if not modules.lobby.get_all_names_in_lobby():
@@ -220,7 +228,7 @@ def _add_init_handlers(client):
                                          names_in_lobby=modules.lobby.get_all_names_in_lobby())
         modules.loader.unlock_all(client)
         log.info('Client is ready!')
-        await disp.RDY.send(ContextWrapper.channel(cfg.channels["spam"]), cfg.VERSION)
+        await disp.RDY.send(ContextWrapper.channel(cfg.channels["spam"], is_batchable=True), cfg.VERSION)
 
     @client.event
     async def on_message(message):
@@ -295,8 +303,9 @@ class PogClient(commands.Bot):
         await super().close()
 
     async def start(self, *args, **kwargs) -> None:
-        await super().start(*args, **kwargs)
+        # Http sessions are created once, before connecting: reconnections trigger on_ready again
         await modules.asynchttp.init_http()
+        await super().start(*args, **kwargs)
 
 
 def main(launch_str=""):
@@ -341,14 +350,18 @@ def main(launch_str=""):
     modules.database.get_all_elements(Base, "static_bases")
     modules.database.get_all_elements(Weapon, "static_weapons")
 
+    # Authenticate to google, once for all sheets
+    modules.sheets.init(cfg.GAPI_JSON)
+
     # Get Account sheet from drive
-    modules.accounts_handler.init(cfg.GAPI_JSON)
+    modules.accounts_handler.init()
 
-    # Establish connection with Jaeger Calendar
-    modules.jaeger_calendar.init(cfg.GAPI_JSON)
+    # Get Jaeger Calendar
+    modules.jaeger_calendar.init(Base)
 
     # Initialise display module
     ContextWrapper.init(client)
+    modules.send_scheduler.init(high_channels=cfg.channels["matches"], low_channels=[cfg.channels["spam"]])
 
     # Init lobby
     modules.lobby.init(Match, client)
@@ -356,6 +369,9 @@ def main(launch_str=""):
     # Init stat processor
     modules.stat_processor.init()
 
+    # Init leaderboards
+    modules.leaderboard.init()
+
     # Add init handlers
     _add_init_handlers(client)
 
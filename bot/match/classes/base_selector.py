@@ -1,5 +1,4 @@
-from lib.tasks import loop
-from asyncio import get_event_loop
+import modules.timers as timers
 from logging import getLogger
 from .interactions import CaptainInteractionHandler, InteractionNotAllowed, InteractionInvalid
 
@@ -10,7 +9,8 @@ from .captain_validator import CaptainValidator
 
 from display import AllStrings as disp, ContextWrapper, InteractionContext, views
 
-from modules.jaeger_calendar import get_booked_bases
+import modules.jaeger_calendar as jaeger_calendar
+import modules.base_stats as base_stats
 from modules.roles import is_admin
 import modules.tools as tools
 
@@ -52,7 +52,6 @@ class BaseSelector:
         self.__selection = list()
         self.__match = match
         self.__selected = None
-        self.__booked = list()
         self.__reset_selection()
         self.__validator = CaptainValidator(self.__match)
         self.__base_interaction = CaptainInteractionHandler(self.__match, views.bases_selection,
@@ -60,12 +59,9 @@ class BaseSelector:
                                                             disable_after_use=False,
                                                             is_admin_allowed=True)
         self.__add_callbacks(self.__validator, self.__base_interaction)
-        self._get_booked_from_calendar.start()
-
-    @loop(count=1)
-    async def _get_booked_from_calendar(self):
-        lp = get_event_loop()
-        await lp.run_in_executor(None, get_booked_bases, Base, self.__booked)
+        # Calendar is cached and kept up to date in the background, only fetch it if it never was
+        if not jaeger_calendar.is_loaded():
+            timers.spawn(jaeger_calendar.wait_loaded)
 
     def clean(self):
         self.__validator.clean()
@@ -80,10 +76,10 @@ class BaseSelector:
 
     @property
     def is_booked(self):
-        return self.__selected in self.__booked or self.__is_used(self.__selected)
+        return jaeger_calendar.is_booked(self.__selected) or self.__is_used(self.__selected)
 
     def is_base_booked(self, base):
-        return base in self.__booked or self.__is_used(base)
+        return jaeger_calendar.is_booked(base) or self.__is_used(base)
 
     @property
     def bases_list(self):
@@ -93,7 +89,8 @@ class BaseSelector:
                 {'name': base.name,
                  'id': base.id,
                  'is_booked': self.is_base_booked(base),
-                 'was_played_recently': is_last_used(base)
+                 'was_played_recently': is_last_used(base),
+                 'balance': base_stats.get_summary(base.id)
                  })
         return result
 
@@ -164,7 +161,7 @@ class BaseSelector:
 
     async def select_by_name(self, ctx, picker, args):
         arg = " ".join(args)
-        current_list = Base.get_bases_from_name(arg, base_pool=True)
+        current_list = Base.get_bases_from_name(arg, base_pool=True, fuzzy=True)
         if len(current_list) == 0:
             await disp.BASE_NOT_FOUND.send(ctx)
         elif len(current_list) == 1:
@@ -11,6 +11,11 @@ import modules.accounts_handler as accounts
 from modules.tools import UnexpectedError
 import modules.lobby as lobby
 import modules.stat_processor as stat_processor
+import modules.leaderboard as leaderboard
+import modules.base_stats as base_stats
+import modules.match_history as match_history
+import modules.tracing as tracing
+import modules.timers as timers
 
 from match.processes import CaptainSelection, PlayerPicking, FactionPicking, BasePicking, GettingReady, MatchPlaying
 from match.commands import CommandFactory
@@ -197,8 +202,11 @@ class MatchData:
         self.round_stamps.clear()
         self.round_length = 0
 
+    @tracing.traced()
     async def push_db(self):
-        await db.async_db_call(db.set_element, "matches", self.id, self.get_data())
+        tracing.get_current_span().set_attribute("match_id", self.id)
+        with tracing.span("db_write_match"):
+            await db.async_db_call(db.set_element, "matches", self.id, self.get_data())
         stat_processor.add_match(self)
         if self.teams[0].score == self.teams[1].score:
             self.teams[0].set_winner()
@@ -207,9 +215,14 @@ class MatchData:
             self.teams[0].set_winner()
         else:
             self.teams[1].set_winner()
-        for tm in self.teams:
-            for p in tm.players:
-                await p.db_update_stats()
+        with tracing.span("db_write_players"):
+            for tm in self.teams:
+                for p in tm.players:
+                    await p.db_update_stats()
+        with tracing.span("analytics"):
+            leaderboard.add_match(self)
+            base_stats.add_match(self)
+            await match_history.add_match(self)
 
 
 _process_list = [CaptainSelection, PlayerPicking, FactionPicking, BasePicking, GettingReady, MatchPlaying,
@@ -272,7 +285,7 @@ class MatchObjects:
         if self.current_process:
             self.current_process.initialize()
         else:
-            self.match_over_loop.start()
+            timers.spawn(self.match_over)
 
     def on_spin_up(self, p_list):
         self.data.id = Match._last_match_id
@@ -282,11 +295,11 @@ class MatchObjects:
         self.plugin_manager.on_match_launching()
         self.start_next_process()
 
-    @loop(count=1)
-    async def match_over_loop(self):
+    async def match_over(self):
         await disp.MATCH_OVER.send(self.match.channel)
-        await self.data.push_db()
-        await self.clean_async()
+        with tracing.span("match_end", match_id=self.data.id):
+            await self.data.push_db()
+            await self.clean_async()
         await disp.MATCH_CLEARED.send(self.match.channel)
 
     @property
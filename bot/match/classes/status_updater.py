@@ -0,0 +1,62 @@
+from display import AllStrings as disp
+from logging import getLogger
+
+log = getLogger("pog_bot")
+
+
+class StatusUpdater:
+    """
+    Keep the match status message (PK_SHOW_TEAMS) up to date with as few discord edits as possible.
+    The rendered message is hashed and the edit is skipped if nothing changed since the last one.
+    Update requests arriving while an edit is running are coalesced into one single follow-up edit.
+    """
+    def __init__(self, match):
+        self.__match = match
+        self.__msg = None
+        self.__digest = None
+        self.__is_updating = False
+        self.__is_pending = False
+        self.nb_edits = 0
+        self.nb_skipped = 0
+
+    @property
+    def message(self):
+        return self.__msg
+
+    def set_message(self, msg):
+        """
+        Set a newly sent status message, its digest is computed so that the next identical edit is skipped.
+        """
+        self.__msg = msg
+        self.__digest = disp.PK_SHOW_TEAMS.get_digest(msg, match=self.__match.proxy)
+
+    async def update(self):
+        """
+        Update the status message if its content changed.
+        If an update is already running, only flag that another one is needed once it is done.
+        """
+        if not self.__msg:
+            return
+        if self.__is_updating:
+            self.__is_pending = True
+            return
+        self.__is_updating = True
+        self.__is_pending = True
+        try:
+            while self.__is_pending and self.__msg:
+                self.__is_pending = False
+                self.__digest, edited = await disp.PK_SHOW_TEAMS.edit_if_changed(self.__msg, self.__digest,
+                                                                                 match=self.__match.proxy)
+                if edited:
+                    self.nb_edits += 1
+                else:
+                    self.nb_skipped += 1
+        finally:
+            self.__is_updating = False
+
+    def clean(self):
+        log.debug(f"Match {self.__match.id}: status message edited {self.nb_edits} times, "
+                  f"{self.nb_skipped} edits skipped")
+        self.__msg = None
+        self.__digest = None
+        self.__is_pending = False
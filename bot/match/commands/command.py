@@ -1,6 +1,7 @@
 from match import MatchStatus
 from display import AllStrings as disp, ContextWrapper
 from logging import getLogger
+from time import perf_counter
 
 log = getLogger("pog_bot")
 
@@ -8,6 +9,62 @@ picking_states = (MatchStatus.IS_PICKING, MatchStatus.IS_FACTION, MatchStatus.IS
 captains_ok_states = (MatchStatus.IS_WAITING, MatchStatus.IS_PLAYING, MatchStatus.IS_BASING, MatchStatus.IS_PICKING,
                       MatchStatus.IS_FACTION)
 
+# Functions called after each match command with (name, status, duration, error)
+_hooks = list()
+# Command name -> _CommandStats
+_stats = dict()
+
+
+class _CommandStats:
+    __slots__ = ("count", "errors", "total_time", "max_time")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0
+        self.max_time = 0
+
+    def to_dict(self):
+        return {"count": self.count,
+                "errors": self.errors,
+                "avg_time": self.total_time / self.count if self.count else 0,
+                "max_time": self.max_time}
+
+
+def add_hook(hook):
+    """
+    Add an instrumentation hook, called after each match command.
+
+    :param hook: Function called with the command name, the match status, the duration of the command (in seconds) \
+    and the exception raised by the command (None if it succeeded).
+    """
+    _hooks.append(hook)
+
+
+def get_stats() -> dict:
+    """
+    Get the metrics of the match commands.
+
+    :return: Dictionary command name -> dictionary with the number of calls, of errors, average and max duration.
+    """
+    return {name: stats.to_dict() for name, stats in _stats.items()}
+
+
+def _record(name, status, duration, error):
+    if name not in _stats:
+        _stats[name] = _CommandStats()
+    stats = _stats[name]
+    stats.count += 1
+    stats.total_time += duration
+    stats.max_time = max(stats.max_time, duration)
+    if error:
+        stats.errors += 1
+    for hook in _hooks:
+        try:
+            hook(name, status, duration, error)
+        except Exception as e:
+            log.error(f"Error in command hook: {e}")
+
 
 class Command:
     def __init__(self, func, *args):
@@ -45,7 +102,7 @@ class Command:
 class InstantiatedCommand:
     def __init__(self, parent, command):
         self.__func = command.func
-        self.__status = command.status.copy()
+        self.__status = frozenset(command.status)
         self.__has_help = command.has_help
         self.__name = command.name
         self.__has_status = command.has_status
@@ -56,6 +113,10 @@ class InstantiatedCommand:
     def name(self):
         return self.__name
 
+    @property
+    def status(self):
+        return self.__status
+
     def on_team_ready(self, team):
         pass
 
@@ -75,7 +136,7 @@ class InstantiatedCommand:
                 self.__is_running = True
             else:
                 self.on_update()
-        elif status not in self.__status and self.__is_running:
+        elif self.__is_running:
             self.on_clean()
             self.__is_running = False
 
@@ -83,6 +144,18 @@ class InstantiatedCommand:
         return self.__func(obj, ctx, *args, **kwargs)
 
     async def __call__(self, ctx, args=(), **kwargs):
+        status = self.__parent.match.status
+        start = perf_counter()
+        error = None
+        try:
+            await self.__run(ctx, args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _record(self.__name, status, perf_counter() - start, error)
+
+    async def __run(self, ctx, args, **kwargs):
         if self.__has_help:
             if len(args) == 1 and (args[0] == "help" or args[0] == "h"):
                 await self.__has_help.send(ctx)
@@ -35,6 +35,11 @@ class MetaFactory(type):
 
 
 class CommandFactory(metaclass=MetaFactory):
+    """
+    Match commands of one match channel.
+    Commands available in each match status are listed once in a dispatch table, status updates only notify the
+    commands available before or after the update.
+    """
     def __new__(cls, *args, **kwargs):
         obj = super().__new__(cls)
         obj.commands = dict()
@@ -50,9 +55,25 @@ class CommandFactory(metaclass=MetaFactory):
 
     def __init__(self, match):
         self.match = match
+        # Status -> commands available in this status
+        by_status = dict()
+        for command in self.commands.values():
+            for status in command.status:
+                by_status.setdefault(status, list()).append(command)
+        self.__by_status = {status: tuple(commands) for status, commands in by_status.items()}
+        self.__status = None
+        self.__available = tuple()
 
     def on_status_update(self, status):
-        for command in self.commands.values():
+        if status is not self.__status:
+            available = self.__by_status.get(status, tuple())
+            # Commands no longer available are cleaned
+            for command in self.__available:
+                if command not in available:
+                    command.on_status_update(status)
+            self.__status = status
+            self.__available = available
+        for command in self.__available:
             command.on_status_update(status)
 
     def on_team_ready(self, team):
@@ -3,7 +3,7 @@ import modules.config as cfg
 import discord
 
 from modules.lobby import get_sub, get_all_names_in_lobby
-from lib.tasks import Loop
+import modules.timers as timers
 
 from classes import Player
 
@@ -69,7 +69,7 @@ async def get_substitute(match, subbed, player=None):
         await disp.SUB_NO_PLAYER.send(match.channel, subbed.mention)
         return
 
-    Loop(coro=ping_sub_in_lobby, count=1).start(match, player, was_lobbied)
+    timers.spawn(ping_sub_in_lobby, match, player, was_lobbied)
 
     await player.on_match_selected(match.proxy)
     return player
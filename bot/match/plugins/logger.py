@@ -4,6 +4,9 @@ from .plugin import Plugin
 from modules.tools import timestamp_now
 import modules.database as db
 import modules.config as cfg
+import modules.match_metrics as metrics
+
+from time import monotonic
 
 log = getLogger("pog_bot")
 
@@ -13,6 +16,14 @@ class SimpleLogger(Plugin):
     def __init__(self, match):
         super().__init__(match)
         self.data = dict()
+        self.__marks = dict()
+
+    def __mark(self, name):
+        self.__marks[name] = monotonic()
+
+    def __observe(self, phase, start, end):
+        if start in self.__marks and end in self.__marks:
+            metrics.observe(phase, self.__marks[end] - self.__marks[start])
 
     def __event(self, name):
         log.info(f"Match {self.match.id}: event received: {name}")
@@ -25,6 +36,8 @@ class SimpleLogger(Plugin):
 
     def on_match_launching(self):
         self.data = {"_id": self.match.id, "match_launching": timestamp_now()}
+        self.__marks.clear()
+        self.__mark("launching")
         self.__event("on_match_launching")
 
     def on_captain_selected(self, i, player):
@@ -32,10 +45,14 @@ class SimpleLogger(Plugin):
         self.__event(f"on_captain_selected: id: [{player.id}], name: [{player.name}]")
 
     def on_captains_selected(self):
+        self.__mark("captains")
+        self.__observe("captains", "launching", "captains")
         self.__event("on_captains_selected")
 
     def on_teams_done(self):
         self.data["teams_done"] = timestamp_now()
+        self.__mark("teams")
+        self.__observe("picks", "captains", "teams")
         self.__event("on_teams_done")
 
     def on_faction_pick(self, team):
@@ -44,10 +61,13 @@ class SimpleLogger(Plugin):
         self.__event(f"on_faction_pick: team: [{team.id}] picked: [{cfg.factions[team.faction]}]")
 
     def on_factions_picked(self):
+        self.__mark("factions")
+        self.__observe("factions", "teams", "factions")
         self.__event("on_factions_picked")
 
     def on_base_selected(self, base):
-        self.data["base"]: base.id
+        self.data["base"] = base.id
+        self.__mark("base")
         self.__event("on_base_selected")
 
     def on_team_ready(self, team):
@@ -56,11 +76,28 @@ class SimpleLogger(Plugin):
     def on_match_starting(self):
         self.__auto_dict_add("rounds",
                              {"round_number": self.match.round_no, "event": "starting", "timestamp": timestamp_now()})
+        self.__mark("starting")
+        if self.match.round_no == 1:
+            # Base can be selected before the factions, the base phase is then empty
+            if "base" in self.__marks and "factions" in self.__marks:
+                self.__marks["base"] = max(self.__marks["base"], self.__marks["factions"])
+                self.__observe("base", "factions", "base")
+                self.__observe("ready", "base", "starting")
+        else:
+            self.__observe("ready_round_2", "round_over", "starting")
         self.__event("on_match_starting")
 
+    def on_match_started(self):
+        self.__mark("started")
+        self.__observe("countdown", "starting", "started")
+        if self.match.round_no == 1:
+            self.__observe("total", "launching", "started")
+        self.__event("on_match_started")
+
     def on_round_over(self):
         self.__auto_dict_add("rounds",
                              {"round_number": self.match.round_no, "event": "stopping", "timestamp": timestamp_now()})
+        self.__mark("round_over")
         self.__event("on_round_over")
 
     def on_match_over(self):
@@ -70,3 +107,4 @@ class SimpleLogger(Plugin):
     async def async_clean(self):
         await db.async_db_call(db.set_element, "match_logs", self.match.id, self.data)
         self.data.clear()
+        self.__marks.clear()
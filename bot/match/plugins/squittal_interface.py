@@ -1,16 +1,20 @@
-import queue
-
 import modules.config as cfg
-from modules.asynchttp import request_code as http_request, post_request
-from lib.tasks import loop, Loop
+from modules.asynchttp import post_request
+import modules.timers as timers
 
-from asyncio import sleep
+from aiohttp.client_exceptions import ClientError
+from asyncio import sleep, TimeoutError
+from collections import OrderedDict
+from discord.backoff import ExponentialBackoff
 from logging import getLogger
 
 from .plugin import Plugin, PluginDisabled
 
 log = getLogger("pog_bot")
 
+#: Number of tries for one operation before giving up on it.
+MAX_TRIES = 5
+
 _ongoing_match = None
 
 
@@ -20,7 +24,7 @@ class SquittalInterface(Plugin):
         super().__init__(match)
         self.num = cfg.channels["matches"].index(match.channel.id) + 1
         self.available = True
-        self.operation_queue = queue.Queue()
+        self.operation_queue = _OperationQueue()
         self.initialized = False
         if not cfg.general['squittal']:
             raise PluginDisabled("Empty squittal URL in config file!")
@@ -32,44 +36,94 @@ class SquittalInterface(Plugin):
         else:
             self.available = True
             _ongoing_match = self.match
-            self.operation_queue.put(("clear", None))
-            self.operation_queue.put(("title", f'"Match {self.match.id}"'))
-            self.operation_queue.put(("length", f'"{self.match.round_length * 60}"'))
+            self.operation_queue.put("clear")
+            self.operation_queue.put("title", f'"Match {self.match.id}"')
+            self.operation_queue.put("length", f'"{self.match.round_length * 60}"')
 
     def on_base_selected(self, base):
         if self.available:
-            self.operation_queue.put(("base", f'"{base.id}"'))
+            self.operation_queue.put("base", f'"{base.id}"')
             if self.initialized:
-                try:
-                    self.do_all.start()
-                except RuntimeError:
-                    pass
+                self.operation_queue.flush()
 
     def on_teams_updated(self):
         if self.available:
             for tm in self.match.teams:
-                self.operation_queue.put((f"teams/{tm.id+1}", str(tm.players_to_dict).replace("'", '"')))
-            try:
-                self.do_all.start()
-            except RuntimeError:
-                pass
+                self.operation_queue.put(f"teams/{tm.id+1}", str(tm.players_to_dict).replace("'", '"'))
+            self.operation_queue.flush()
             if not self.initialized:
                 self.initialized = True
 
     def on_match_started(self):
         if self.available:
-            self.operation_queue.put(("start", None))
-            self.do_all.start()
-
-    @loop(count=1)
-    async def do_all(self):
-        while not self.operation_queue.empty():
-            current = self.operation_queue.get()
-            await post_request(f"{cfg.general['squittal_url']}/api/{current[0]}", current[1])
-            await sleep(1)
+            self.operation_queue.put("start")
+            self.operation_queue.flush()
 
     def on_clean(self):
         self.initialized = False
         if self.available:
             global _ongoing_match
             _ongoing_match = None
+
+
+class _OperationQueue:
+    """
+    Operations waiting to be posted to the Squittal server.
+    Operations are posted in order, back to back on the shared keep-alive http session.
+    An operation queued again before being posted only keeps its latest payload: e.g. after several team updates,
+    only the current teams are posted.
+    """
+
+    def __init__(self):
+        # Endpoint -> payload, in posting order
+        self.__pending = OrderedDict()
+        self.__is_posting = False
+
+    def put(self, endpoint, payload=None):
+        """
+        Queue an operation, it is only posted after :meth:`flush` is called.
+
+        :param endpoint: Api endpoint of the operation, e.g. "teams/1".
+        :param payload: (Optional) Json payload of the operation.
+        """
+        if endpoint == "clear":
+            # Nothing queued before a clear matters anymore
+            self.__pending.clear()
+        self.__pending[endpoint] = payload
+
+    def flush(self):
+        """
+        Post the queued operations in the background.
+        """
+        if not self.__is_posting and self.__pending:
+            self.__is_posting = True
+            timers.spawn(self.__post_all)
+
+    async def __post_all(self):
+        try:
+            while self.__pending:
+                endpoint, payload = self.__pending.popitem(last=False)
+                await self.__post(endpoint, payload)
+        finally:
+            self.__is_posting = False
+
+    async def __post(self, endpoint, payload):
+        url = f"{cfg.general['squittal_url']}/api/{endpoint}"
+        backoff = ExponentialBackoff()
+        for i in range(MAX_TRIES):
+            if i != 0:
+                await sleep(backoff.delay())
+                if endpoint in self.__pending:
+                    # Queued again in the meantime, the new payload supersedes this one
+                    return
+            try:
+                code = await post_request(url, payload, upstream="squittal")
+            except (ClientError, TimeoutError) as e:
+                log.warning(f"Squittal: {e!r} on try {i} for {url}")
+                continue
+            if code < 500:
+                if code >= 400:
+                    log.warning(f"Squittal: Received code {code} on {url}")
+                return
+            log.warning(f"Squittal: Received code {code} on try {i} for {url}")
+        log.error(f"Squittal: Could not post on {url} after {MAX_TRIES} tries")
@@ -1,14 +1,17 @@
 import modules.config as cfg
 from modules.asynchttp import request_code as http_request
-from lib.tasks import loop, Loop
+import modules.timers as timers
 
-from asyncio import sleep
+from asyncio import get_event_loop
 from logging import getLogger
 
 from .plugin import Plugin, PluginDisabled
 
 log = getLogger("pog_bot")
 
+#: Audio cues due within this many seconds of each other are sent in one call.
+COALESCE_WINDOW = 0.5
+
 
 class AudioBot(Plugin):
     # (note: thanks to the queue system of the TS3AudioBot, two audio won't
@@ -21,85 +24,208 @@ class AudioBot(Plugin):
         self.lobby = False
         if not cfg.ts['url']:
             raise PluginDisabled("Empty URL in config file!")
+        self.__cues = _CueScheduler(self)
 
     def on_match_launching(self):
-        Loop(coro=configure, count=1).start(self.num)
+        timers.spawn(configure, self.num)
         audio_string = f"drop_match_{self.num}_picks"
-        _TaskAudio(self).task_audio.start(audio_string, lobby=True, wait=0)
+        self.__play(audio_string, lobby=True)
 
     def on_captains_selected(self):
-        _TaskAudio(self).task_audio.start("select_teams", lobby=False)
+        self.__play("select_teams", lobby=False)
 
     def on_teams_done(self):
-        _TaskAudio(self).task_audio.start("select_factions")
+        self.__play("select_factions")
 
     def on_faction_pick(self, team):
         audio_string = f"team_{team.id + 1}_{cfg.factions[team.faction]}"
-        _TaskAudio(self).task_audio.start(audio_string)
+        self.__play(audio_string)
 
     def on_factions_picked(self):
         if not self.match.base:
-            _TaskAudio(self).task_audio.start("select_base")
+            self.__play("select_base")
 
     def on_base_selected(self, base):
-        _TaskAudio(self).task_audio.start(["base_selected", f'base_{cfg.id_to_base[base.id]}', "type_ready"], wait=0)
+        self.__play(["base_selected", f'base_{cfg.id_to_base[base.id]}', "type_ready"])
 
     def on_team_ready(self, team):
         audio_string = f"team_{team.id + 1}_ready"
-        _TaskAudio(self).task_audio.start(audio_string)
+        self.__play(audio_string)
 
     def on_match_starting(self):
         # Timing tested
-        _TaskAudio(self).task_audio.start("30s", wait=0)
-        _TaskAudio(self).task_audio.start("10s", wait=20)
-        _TaskAudio(self).task_audio.start("5s", wait=25)
+        self.__play("30s")
+        self.__play("10s", wait=20)
+        self.__play("5s", wait=25)
 
     def on_round_over(self):
         audio_strings = ["round_over"]
         if self.match.round_no == 1:
             audio_strings.append("switch_sides")
             audio_strings.append("type_ready")
-        _TaskAudio(self).task_audio.start(audio_strings)
+        self.__play(audio_strings)
 
     def on_clean(self):
+        self.__cues.cancel()
         self.lobby = False
 
-
-class _TaskAudio:
-
-    def __init__(self, bot):
-        self.bot = bot
-
-    @loop(count=1)
-    async def task_audio(self, strings, lobby=False, wait=-1):
+    def __play(self, strings, lobby=False, wait=0):
         if not isinstance(strings, list):
             strings = [strings]
-        if wait >= 0:
-            await sleep(wait)
-        await self.__lobby(lobby)
-        file_queue = "".join([f"(/add/{string}.mp3)" for string in strings])
-        url = f'{cfg.ts["url"]}/api/bot/template/{self.bot.num}(/xecute{file_queue}(/play))'
-        await _send_url(url)
+        self.__cues.cue(strings, delay=wait, lobby=lobby)
 
-    async def __lobby(self, bl):
-        if self.bot.lobby == bl:
+
+class _CueScheduler:
+    """
+    Audio cues of a match, sent to the TS3 bot of the match.
+    Cues due within :data:`COALESCE_WINDOW` seconds of each other are sent in one playlist call (along with the lobby
+    subscription change if needed), and only one timer is armed, for the next due cues.
+    A clip already pending for the same bot at about the same time is dropped.
+    """
+
+    def __init__(self, bot):
+        self.__bot = bot
+        # [due time, lobby, clips], by due time
+        self.__batches = list()
+        self.__timer = None
+        self.__timer_due = None
+
+    def cue(self, clips, delay=0, lobby=False):
+        """
+        Schedule clips to be played.
+
+        :param clips: Names of the clips.
+        :param delay: (Optional) Delay before playing, in seconds.
+        :param lobby: (Optional) Whether the bot should be subscribed to the lobby when playing.
+        """
+        due = get_event_loop().time() + delay
+        num = self.__bot.num
+        new_clips = list()
+        for clip in clips:
+            pending_due = _pending_clips.get((num, clip))
+            if pending_due is not None and abs(pending_due - due) <= COALESCE_WINDOW:
+                _stats.duplicates += 1
+                continue
+            _pending_clips[(num, clip)] = due
+            new_clips.append(clip)
+        if not new_clips:
             return
-        if bl:
-            self.bot.lobby = True
-            url = f'{cfg.ts["url"]}/api/bot/template/{self.bot.num}(/subscribe/channel/{cfg.ts["lobby_id"]})'
+        _stats.cues += 1
+        for batch in self.__batches:
+            if batch[1] == lobby and abs(batch[0] - due) <= COALESCE_WINDOW:
+                batch[2].extend(new_clips)
+                _stats.merged += 1
+                break
         else:
-            self.bot.lobby = False
-            url = f'{cfg.ts["url"]}/api/bot/template/{self.bot.num}(/unsubscribe/channel/{cfg.ts["lobby_id"]})'
-        await _send_url(url)
+            self.__batches.append([due, lobby, new_clips])
+            self.__batches.sort(key=lambda b: b[0])
+        self.__arm()
+
+    def cancel(self):
+        """
+        Drop all the cues not sent yet.
+        """
+        if self.__timer:
+            self.__timer.cancel()
+            self.__timer = None
+        for batch in self.__batches:
+            self.__release(batch)
+        self.__batches.clear()
+
+    def __arm(self):
+        if not self.__batches:
+            return
+        due = self.__batches[0][0]
+        if self.__timer:
+            if self.__timer_due == due:
+                return
+            self.__timer.cancel()
+        self.__timer_due = due
+        self.__timer = timers.call_later(max(due - get_event_loop().time(), 0), self.__send_due)
+
+    def __release(self, batch):
+        for clip in batch[2]:
+            _pending_clips.pop((self.__bot.num, clip), None)
+
+    async def __send_due(self):
+        self.__timer = None
+        now = get_event_loop().time()
+        due_batches = list()
+        while self.__batches and self.__batches[0][0] <= now:
+            due_batches.append(self.__batches.pop(0))
+        self.__arm()
+        for batch in due_batches:
+            self.__release(batch)
+            await self.__send(*batch)
+
+    async def __send(self, due, lobby, clips):
+        bot = self.__bot
+        commands = ""
+        if bot.lobby != lobby:
+            bot.lobby = lobby
+            subscription = "subscribe" if lobby else "unsubscribe"
+            commands += f'(/{subscription}/channel/{cfg.ts["lobby_id"]})'
+        commands += "".join(f"(/add/{clip}.mp3)" for clip in clips)
+        url = f'{cfg.ts["url"]}/api/bot/template/{bot.num}(/xecute{commands}(/play))'
+        _stats.calls += 1
+        if await _send_url(url):
+            _stats.add_latency(get_event_loop().time() - due)
+        else:
+            _stats.failed += 1
+
+
+class _Stats:
+    def __init__(self):
+        self.cues = 0
+        self.calls = 0
+        self.merged = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.delivered = 0
+        self.total_latency = 0
+        self.max_latency = 0
+
+    def add_latency(self, latency):
+        self.delivered += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def to_dict(self):
+        return {"cues": self.cues,
+                "calls": self.calls,
+                "merged": self.merged,
+                "duplicates": self.duplicates,
+                "failed": self.failed,
+                "avg_latency": self.total_latency / self.delivered if self.delivered else 0,
+                "max_latency": self.max_latency}
+
+
+_stats = _Stats()
+# (bot number, clip) -> due time of the pending cue
+_pending_clips = dict()
+
+
+def get_stats() -> dict:
+    """
+    Get the audio cue metrics.
+
+    :return: Dictionary with the number of cues scheduled, playlist calls made, cues merged in another call, \
+    duplicate clips dropped, failed calls, and the average and max delivery latency (from the due time of a call \
+    to the answer of the TS3 bot) in seconds.
+    """
+    return _stats.to_dict()
 
 
 async def _send_url(url):
     try:
-        code = await http_request(url)
+        code = await http_request(url, upstream="ts3")
         if code != 204:
             log.warning(f'TS3Bot API: Received code {code} on {url}')
+            return False
+        return True
     except Exception as e:
         log.warning(f"Couldn't join TS3 bot on {url}\n{e}")
+        return False
 
 
 async def configure(num):
@@ -10,6 +10,7 @@ from match.common import after_pick_sub
 
 import modules.accounts_handler as accounts
 import modules.census as census
+import modules.tracing as tracing
 import match.classes.interactions as interactions
 
 from modules.asynchttp import ApiNotReachable
@@ -48,20 +49,18 @@ class GettingReady(Process, status=MatchStatus.IS_WAITING):
         if self.is_first_round:
             await disp.ACC_SENDING.send(self.match.channel)
 
-            for tm in self.match.teams:
-                for a_player in tm.players:
-                    if not a_player.has_own_account:
-                        success = await accounts.give_account(a_player)
-                        if success:
-                            self.match.players_with_account.append(a_player)
-                        else:
-                            await disp.ACC_NOT_ENOUGH.send(self.match.channel)
-                            await self.clear()
-                            return
-
-            # Try to send the accounts:
-            for a_player in self.match.players_with_account:
-                await accounts.send_account(self.match.channel, a_player)
+            a_players = [a_player for tm in self.match.teams for a_player in tm.players
+                         if not a_player.has_own_account]
+            with tracing.span("accounts", match_id=self.match.id, players=len(a_players)):
+                if not accounts.give_accounts(a_players):
+                    await disp.ACC_NOT_ENOUGH.send(self.match.channel)
+                    await self.clear(self.match.channel)
+                    return
+                self.match.players_with_account.extend(a_players)
+
+                # Try to send the accounts:
+                with tracing.span("send_accounts"):
+                    await accounts.send_accounts(self.match.channel, a_players)
 
             await disp.ACC_SENT.send(self.match.channel)
 
@@ -148,7 +147,7 @@ class GettingReady(Process, status=MatchStatus.IS_WAITING):
 
     @Process.public
     async def give_account(self, a_player, update=False):
-        success = await accounts.give_account(a_player)
+        success = accounts.give_account(a_player)
         if success:
             self.match.players_with_account.append(a_player)
             await accounts.send_account(self.match.channel, a_player)
@@ -157,7 +156,7 @@ class GettingReady(Process, status=MatchStatus.IS_WAITING):
                 self.match.plugin_manager.on_teams_updated()
         else:
             await disp.ACC_NOT_ENOUGH.send(self.match.channel)
-            await self.clear()
+            await self.clear(self.match.channel)
 
     @Process.public
     def get_current_context(self, ctx):
@@ -13,13 +13,20 @@ import modules.interactions as interactions
 from modules.asynchttp import ApiNotReachable
 
 from match.classes.base_selector import push_last_bases
+from match.classes.status_updater import StatusUpdater
 
 import modules.census as census
 import modules.tools as tools
+import modules.timers as timers
 import modules.image_maker as i_maker
+import modules.tracing as tracing
 
 log = getLogger("pog_bot")
 
+#: (seconds to round end, granularity of the displayed countdown in seconds), nearest to the end last.
+#: The status message is only edited when its content changes: the coarser the countdown, the fewer edits.
+COUNTDOWN_STEPS = ((300, 60), (60, 30), (0, 10))
+
 
 class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
 
@@ -28,11 +35,12 @@ class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
         self.match_loop = Loop(coro=self.on_match_over, minutes=match.round_length, delay=1, count=2)
 
         self.ih = interactions.InteractionHandler(self.match, views.refresh_button, disable_after_use=False)
-        self.info_message = None
+        self.updater = StatusUpdater(match)
+        self.start_timer = None
 
         @self.ih.callback('refresh')
         async def refresh(player, interaction_id, interaction, interaction_values):
-            await disp.PK_SHOW_TEAMS.edit(self.info_message, match=self.match.proxy)
+            await self.updater.update()
 
         super().__init__(match)
 
@@ -42,10 +50,9 @@ class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
             self.match.base_selector.clean()
             push_last_bases(self.match.base)
             self.match.base_selector = None
-        self.start_match_loop.start()
+        self.start_timer = timers.spawn(self.start_match)
 
-    @loop(count=1)
-    async def start_match_loop(self):
+    async def start_match(self):
         self.match.plugin_manager.on_match_starting()
         await disp.MATCH_STARTING_1.send(self.match.channel, self.match.round_no, "30")
         await sleep(10)
@@ -66,18 +73,28 @@ class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
     async def info(self, ctx=None):
         ctx = self.ih.get_new_context(self.match.channel)
         msg = await disp.PK_SHOW_TEAMS.send(ctx, match=self.match.proxy)
-        self.info_message = msg
+        self.updater.set_message(msg)
 
-    @loop(seconds=15)
+    @loop(seconds=5)
     async def auto_info_loop(self):
-        if self.info_message:
-            await disp.PK_SHOW_TEAMS.edit(self.info_message, match=self.match.proxy)
+        # Rendering is cheap, the message is only edited when the displayed countdown (or anything else) changed
+        if self.updater.message:
+            await self.updater.update()
         else:
             await self.info()
 
     @Process.public
-    def get_formatted_time_to_round_end(self):
-        secs = self.get_seconds_to_round_end()
+    def get_formatted_time_to_round_end(self, coarse=False):
+        secs = max(self.get_seconds_to_round_end(), 0)
+        if not coarse:
+            return f"{secs // 60}m {secs % 60}s"
+        # Only for the status message, see COUNTDOWN_STEPS
+        for threshold, step in COUNTDOWN_STEPS:
+            if secs >= threshold:
+                break
+        secs -= secs % step
+        if step >= 60:
+            return f"{secs // 60}m"
         return f"{secs // 60}m {secs % 60}s"
 
     def get_seconds_to_round_end(self):
@@ -87,22 +104,26 @@ class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
     async def on_match_over(self):
         player_pings = [" ".join(tm.all_playing_pings) for tm in self.match.teams]
         self.auto_info_loop.cancel()
+        self.updater.clean()
         self.ih.clean()
         self.match.plugin_manager.on_round_over()
         round_no = self.match.round_no
         self.match.ready_next_process()
         await disp.MATCH_ROUND_OVER.send(self.match.channel, *player_pings, round_no)
-        try:
-            await census.process_score(self.match.data, self.match.last_start_stamp, self.match.channel)
+        with tracing.span("round_end", match_id=self.match.id, round=round_no):
             try:
-                await i_maker.publish_match_image(self.match)
-            except Exception as e:
-                # Should not happen
-                log.error(f"Error in publish_match_image : {e}")
-                await disp.PUBLISH_ERROR.send(ContextWrapper.channel(cfg.channels["results"]), self.match.id, round_no)
-        except ApiNotReachable as e:
-            log.error(f"ApiNotReachable caught when processing scores : {e.url}")
-            await disp.API_SCORE_ERROR.send(ContextWrapper.channel(cfg.channels["results"]), self.match.id, round_no)
+                await census.process_score(self.match.data, self.match.last_start_stamp, self.match.channel)
+                try:
+                    await i_maker.publish_match_image(self.match)
+                except Exception as e:
+                    # Should not happen
+                    log.error(f"Error in publish_match_image : {e}")
+                    await disp.PUBLISH_ERROR.send(ContextWrapper.channel(cfg.channels["results"]),
+                                                  self.match.id, round_no)
+            except ApiNotReachable as e:
+                log.error(f"ApiNotReachable caught when processing scores : {e.url}")
+                await disp.API_SCORE_ERROR.send(ContextWrapper.channel(cfg.channels["results"]),
+                                                self.match.id, round_no)
         self.match.start_next_process()
 
     @Process.public
@@ -111,9 +132,11 @@ class MatchPlaying(Process, status=MatchStatus.IS_STARTING):
 
     @Process.public
     async def clear(self, ctx):
-        self.start_match_loop.cancel()
+        if self.start_timer:
+            self.start_timer.cancel()
         self.auto_info_loop.cancel()
         self.match_loop.cancel()
+        self.updater.clean()
         self.ih.clean()
         player_pings = [" ".join(tm.all_playing_pings) for tm in self.match.teams]
         self.match.clean_critical()
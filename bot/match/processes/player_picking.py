@@ -1,5 +1,5 @@
 from display import AllStrings as disp, ContextWrapper, InteractionContext, views
-from lib.tasks import loop
+import modules.timers as timers
 
 from classes import ActivePlayer, Player, Team
 
@@ -202,7 +202,7 @@ class PlayerPicking(Process, status=MatchStatus.IS_PICKING):
             # Pick them
             self.do_pick(other, p)
             # Ping them
-            self.ping_last_player.start(other, p)
+            timers.spawn(self.ping_last_player, other, p)
         # If no player left, trigger the next step
         elif len(self.players) == 0:
             # Start next step
@@ -211,6 +211,5 @@ class PlayerPicking(Process, status=MatchStatus.IS_PICKING):
             self.match.plugin_manager.on_teams_done()
             self.match.start_next_process()
 
-    @loop(count=1)
     async def ping_last_player(self, team, p):
         await disp.PK_LAST.send(self.match.channel, p.mention, team.name, match=self.match.proxy)
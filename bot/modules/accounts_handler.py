@@ -1,14 +1,15 @@
 """
 | This module handle the POG Jaeger accounts.
 | Initialize or reload the module with :meth:`init`.
-| Then call :meth:`give_account` and :meth:`send_account` to hand an account to an in-match player.
+| Then call :meth:`give_account` and :meth:`send_account` to hand an account to an in-match player,
+  or :meth:`give_accounts` and :meth:`send_accounts` to do it for a whole match at once.
 | Use :meth:`terminate_account` to remove the account from the player.
 """
 
 # External imports
+from asyncio import gather, Semaphore
+from heapq import heappush, heappop, heapify
 from logging import getLogger
-from gspread import service_account
-from numpy import array
 import discord.errors
 
 # Internal imports
@@ -16,6 +17,8 @@ import classes
 from display import AllStrings as disp, ContextWrapper, views
 import modules.database as db
 import modules.config as cfg
+import modules.sheets as sheets
+import modules.tracing as tracing
 from modules.tools import UnexpectedError
 
 
@@ -25,34 +28,47 @@ log = getLogger("pog_bot")
 _busy_accounts = dict()
 _available_accounts = dict()
 
+# Min-heap of (nb_unique_usages, account id) for the available accounts.
+# Entries are invalidated lazily: an entry is valid only if the account is available and its usage count unchanged.
+_available_heap = list()
+
+# Unique usages index, loaded once at init and then kept up to date in memory:
+# account id -> list of player ids, and player id -> list of account ids.
+# The lists are shared with the Account and ActivePlayer objects, which update them when an account is validated.
+_usages = dict()
+
+#: Maximum number of account DMs being sent at the same time.
+MAX_CONCURRENT_DMS = 4
+
 # Offsets in the google sheet
 X_OFFSET = 1
 Y_OFFSET = 2
 
 
+def _parse_sheet(values: list) -> list:
+    """
+    Get the (id string, username, password) of each account from the sheet values.
+    """
+    return [(row[X_OFFSET], row[X_OFFSET + 1], row[X_OFFSET + 2]) for row in values[Y_OFFSET:]]
+
+
 # Will be called at bot init or on account reload
-def init(secret_file: str):
+def init():
     """
     Initialize the accounts from the google sheet.
-    If called later, reload the account usernames and passwords.
-
-    :param secret_file: Name of the gspread authentication json file.
+    If called later, reload the account usernames and passwords (the sheet is only downloaded if it was modified).
     """
-    # Open the google sheet:
-    gc = service_account(filename=secret_file)
-    sh = gc.open_by_key(cfg.database["accounts"])
-    raw_sheet = sh.worksheet("1")
-    sheet_tab = array(raw_sheet.get_all_values())
+    sheets.register("accounts", cfg.database["accounts"], "1", _parse_sheet)
+    sheets.refresh("accounts")
 
-    # Get total number of accounts
-    num_accounts = sheet_tab.shape[0] - Y_OFFSET
+    # Load the usage index, elements already in memory are kept as they are up to date
+    def add_usage(data):
+        if data["_id"] not in _usages:
+            _usages[data["_id"]] = data.get("unique_usages", list())
+    db.get_all_elements(add_usage, "accounts_usage", fields=["unique_usages"])
 
     # Add accounts one by one
-    for i in range(num_accounts):
-        # Get account data
-        a_id_str = sheet_tab[i + Y_OFFSET][X_OFFSET]
-        a_username = sheet_tab[i + Y_OFFSET][X_OFFSET + 1]
-        a_password = sheet_tab[i + Y_OFFSET][X_OFFSET + 2]
+    for a_id_str, a_username, a_password in sheets.get("accounts"):
         a_id = int(a_id_str)
 
         # Update account
@@ -62,13 +78,31 @@ def init(secret_file: str):
             _busy_accounts[a_id].update(a_username, a_password)
         else:
             # If account doesn't exist already, initialize it
-            unique_usages = db.get_field("accounts_usage", a_id, "unique_usages")
+            unique_usages = _usages.get(a_id)
             if unique_usages is None:
                 raise UnexpectedError(f"Can't find usage for account {a_id}")
             _available_accounts[a_id] = classes.Account(a_id_str, a_username, a_password, unique_usages)
+            _push_available(_available_accounts[a_id])
+
+
+@tracing.traced()
+def give_accounts(a_players: list) -> bool:
+    """
+    Give an account to each player of the list (typically a whole team or match), in one pass.
+    No account is given if there are not enough available accounts for all the players.
+
+    :param a_players: Players to give accounts to.
+    :return: True if accounts were given, False if not enough accounts available.
+    """
+    if len(_available_accounts) < len(a_players):
+        return False
+    for a_player in a_players:
+        give_account(a_player)
+    return True
 
 
-async def give_account(a_player: classes.ActivePlayer) -> bool:
+@tracing.traced()
+def give_account(a_player: classes.ActivePlayer) -> bool:
     """
     Give an account to a_player. We want each player to use as little accounts as possible.
     So we try to give an account the player already used.
@@ -77,9 +111,9 @@ async def give_account(a_player: classes.ActivePlayer) -> bool:
     :return: True is account given, False if not enough accounts available.
     """
     # Get player usages
-    unique_usages = await db.async_db_call(db.get_field, "accounts_usage", a_player.id, "unique_usages")
-    if not unique_usages:
-        unique_usages = list()
+    if a_player.id not in _usages:
+        _usages[a_player.id] = list()
+    unique_usages = _usages[a_player.id]
 
     # Set player usages in the player object
     a_player.unique_usages = unique_usages
@@ -88,40 +122,42 @@ async def give_account(a_player: classes.ActivePlayer) -> bool:
     if len(_available_accounts) == 0:
         return False
 
-    # STEP 1.A: Check for accounts the player already used by the past
-    potential = list()
+    # STEP 1: Give the account with the biggest usages amongst the available accounts the player already used.
+    # Players only ever used a handful of accounts, so going through their usages is cheap.
+    max_obj = None
     for acc_id in unique_usages:
-        if acc_id in _available_accounts:
-            potential.append(_available_accounts[acc_id])
-
-    # STEP 1.B: Give the account with the biggest usages amongst the accounts found in 1.A
-    if potential:
-        max_obj = potential[0]
-        max_value = max_obj.nb_unique_usages
-        # Find max
-        for acc in potential:
-            n_usages = acc.nb_unique_usages
-            if n_usages > max_value:
-                max_obj = acc
-                max_value = n_usages
-        # Give account, return ok
+        acc = _available_accounts.get(acc_id)
+        if acc and (max_obj is None or acc.nb_unique_usages > max_obj.nb_unique_usages):
+            max_obj = acc
+    if max_obj:
         _set_account(max_obj, a_player)
         return True
 
     # STEP 2: If we couldn't find an account the player already used, give him the account with the least usages
-    min_obj = list(_available_accounts.values())[0]
-    min_value = min_obj.nb_unique_usages
-    # Find min
-    for acc in _available_accounts.values():
-        n_usages = acc.nb_unique_usages
-        if n_usages < min_value:
-            min_obj = acc
-            min_value = n_usages
-    # Give account, return ok
-    _set_account(min_obj, a_player)
+    _set_account(_pop_least_used(), a_player)
     return True
 
 
+def _push_available(acc: classes.Account):
+    heappush(_available_heap, (acc.nb_unique_usages, acc.id))
+    # Drop the stale entries if they take too much room
+    if len(_available_heap) > 2 * len(_available_accounts) + 16:
+        _available_heap[:] = [(acc.nb_unique_usages, acc.id) for acc in _available_accounts.values()]
+        heapify(_available_heap)
+
+
+def _pop_least_used() -> classes.Account:
+    """
+    Get the available account with the least unique usages.
+    Should only be called if there is at least one available account.
+    """
+    while True:
+        nb_usages, acc_id = heappop(_available_heap)
+        acc = _available_accounts.get(acc_id)
+        if acc and acc.nb_unique_usages == nb_usages:
+            return acc
+
+
 def _set_account(acc: classes.Account, a_player: classes.ActivePlayer):
     """
     Set player's account.
@@ -141,22 +177,42 @@ def _set_account(acc: classes.Account, a_player: classes.ActivePlayer):
     a_player.account = acc
 
 
+async def send_accounts(channel: discord.TextChannel, a_players: list):
+    """
+    Send their accounts to all the players concurrently.
+
+    :param channel: Current match channel.
+    :param a_players: Players to send the accounts to.
+    """
+    semaphore = Semaphore(MAX_CONCURRENT_DMS)
+
+    async def bounded_send(a_player):
+        async with semaphore:
+            await send_account(channel, a_player)
+
+    await gather(*[bounded_send(a_player) for a_player in a_players])
+
+
 async def send_account(channel: discord.TextChannel, a_player: classes.ActivePlayer):
     """
     Actually send its account to the player.
+    If the DM can't be sent, the account is sent to the staff channel instead.
 
     :param channel: Current match channel.
     :param a_player: Player to send the account to.
     """
     msg = None
-    # Try 3 times to send a DM:
-    ctx = a_player.account.get_new_context(await ContextWrapper.user(a_player.id))
-    for j in range(3):
-        try:
-            msg = await disp.ACC_UPDATE.send(ctx, account=a_player.account)
-            break
-        except discord.errors.Forbidden:
-            pass
+    try:
+        # Try 3 times to send a DM:
+        ctx = a_player.account.get_new_context(await ContextWrapper.user(a_player.id))
+        for j in range(3):
+            try:
+                msg = await disp.ACC_UPDATE.send(ctx, account=a_player.account)
+                break
+            except discord.errors.Forbidden:
+                pass
+    except (discord.errors.HTTPException, UnexpectedError) as e:
+        log.warning(f"Could not send account to player [{a_player.id}]: {e}")
     if not msg:
         # Else validate the account and send it to staff channel instead
         await disp.ACC_CLOSED.send(channel, a_player.mention)
@@ -165,7 +221,7 @@ async def send_account(channel: discord.TextChannel, a_player: classes.ActivePla
                                         f'<@&{cfg.roles["admin"]}>', a_player.mention, account=a_player.account)
     # Set the account message, log the account:
     a_player.account.message = msg
-    await disp.ACC_LOG.send(ContextWrapper.channel(cfg.channels["spam"]), a_player.name, a_player.id, a_player.account.id)
+    await disp.ACC_LOG.send(ContextWrapper.channel(cfg.channels["spam"], is_batchable=True), a_player.name, a_player.id, a_player.account.id)
 
 
 async def terminate_account(a_player: classes.ActivePlayer):
@@ -211,6 +267,7 @@ async def terminate_account(a_player: classes.ActivePlayer):
     acc.clean()
     del _busy_accounts[acc.id]
     _available_accounts[acc.id] = acc
+    _push_available(acc)
 
 
 def get_not_validated_accounts(team: classes.Team) -> list:
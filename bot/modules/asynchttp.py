@@ -2,6 +2,9 @@
 | Handle asynchronous http requests.
 | Request to PS2 api: use :meth:`api_request_and_retry`.
 | Standard HTTP request: use :meth:`request_code`.
+| Each upstream (:data:`UPSTREAMS`) has its own session: its own pool of keep-alive connections, with a cap on
+  concurrent connections per host, a DNS cache and a default timeout. Use :meth:`get_stats` to check how well
+  connections are reused.
 """
 import aiohttp
 # External imports
@@ -18,21 +21,114 @@ from modules.tools import UnexpectedError
 
 log = getLogger("pog_bot")
 
-client = None
+#: Upstream name -> (max concurrent connections per host, timeout of a request in seconds).
+UPSTREAMS = {
+    "census": (10, 30),
+    "ts3": (4, 10),
+    "squittal": (2, 10),
+    "default": (10, 30),
+}
+
+#: Seconds a resolved host address is cached.
+DNS_CACHE_TTL = 300
+
+#: Seconds an idle connection is kept open for reuse.
+KEEPALIVE_TIMEOUT = 30
+
+# Upstream name -> session
+_sessions = dict()
+
+
+class _Stats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.created = 0
+        self.reused = 0
+        self.dns_hits = 0
+        self.dns_misses = 0
+
+    def to_dict(self):
+        nb_connections = self.created + self.reused
+        return {"requests": self.requests,
+                "errors": self.errors,
+                "connections_created": self.created,
+                "connections_reused": self.reused,
+                "reuse_rate": self.reused / nb_connections if nb_connections else 0,
+                "dns_cache_hits": self.dns_hits,
+                "dns_cache_misses": self.dns_misses}
+
+
+_stats = {name: _Stats() for name in UPSTREAMS}
+
+
+def _trace_config(stats):
+    async def on_request_start(session, ctx, params):
+        stats.requests += 1
+
+    async def on_request_exception(session, ctx, params):
+        stats.errors += 1
+
+    async def on_connection_create_end(session, ctx, params):
+        stats.created += 1
+
+    async def on_connection_reuseconn(session, ctx, params):
+        stats.reused += 1
+
+    async def on_dns_cache_hit(session, ctx, params):
+        stats.dns_hits += 1
+
+    async def on_dns_cache_miss(session, ctx, params):
+        stats.dns_misses += 1
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_request_start)
+    config.on_request_exception.append(on_request_exception)
+    config.on_connection_create_end.append(on_connection_create_end)
+    config.on_connection_reuseconn.append(on_connection_reuseconn)
+    config.on_dns_cache_hit.append(on_dns_cache_hit)
+    config.on_dns_cache_miss.append(on_dns_cache_miss)
+    return config
 
 
 async def init_http():
-    global client
-    client = aiohttp.ClientSession()
+    """
+    Create the sessions of all the upstreams. Does nothing if they already exist.
+    """
+    if _sessions:
+        return
+    for name, (limit_per_host, timeout) in UPSTREAMS.items():
+        connector = aiohttp.TCPConnector(limit_per_host=limit_per_host, ttl_dns_cache=DNS_CACHE_TTL,
+                                         keepalive_timeout=KEEPALIVE_TIMEOUT)
+        _sessions[name] = aiohttp.ClientSession(connector=connector,
+                                                timeout=aiohttp.ClientTimeout(total=timeout),
+                                                trace_configs=[_trace_config(_stats[name])])
 
 
 async def close_http():
-    await client.close()
+    """
+    Close the sessions of all the upstreams.
+    """
+    if not _sessions:
+        return
+    sessions = list(_sessions.values())
+    _sessions.clear()
+    await asyncio.gather(*[session.close() for session in sessions])
     # Sleep for a bit to allow the session to close properly
     # https://docs.aiohttp.org/en/stable/client_advanced.html#graceful-shutdown
     await asyncio.sleep(0.250)
 
 
+def get_stats() -> dict:
+    """
+    Get the connection metrics of the upstreams.
+
+    :return: Dictionary upstream name -> number of requests, of errors, of connections created and reused,
+        reuse rate, and DNS cache hits and misses.
+    """
+    return {name: stats.to_dict() for name, stats in _stats.items()}
+
+
 class ApiNotReachable(Exception):
     """
     Custom API request exception.
@@ -46,29 +142,39 @@ class ApiNotReachable(Exception):
         super().__init__(message)
 
 
-async def request_code(url: str) -> int:
+async def request_code(url: str, upstream: str = "default") -> int:
     """
     Get the url requested.
 
     :param url: URL to get.
+    :param upstream: (Optional) Upstream the url belongs to, see :data:`UPSTREAMS`.
     :return: HTTP code returned.
     """
-    result = await _fetch_code(url)
+    result = await _fetch_code(url, upstream)
     return result
 
 
-async def post_request(url, data=None):
+async def post_request(url: str, data=None, upstream: str = "default") -> int:
+    """
+    Post to the url requested.
+
+    :param url: URL to post to.
+    :param data: (Optional) Json payload.
+    :param upstream: (Optional) Upstream the url belongs to, see :data:`UPSTREAMS`.
+    :return: HTTP code returned.
+    """
     if data:
         kwargs = {"data": f'{data}', "headers": {'content-type': 'application/json'}}
     else:
         kwargs = dict()
-    async with client.post(url, **kwargs) as response:
+    async with _sessions[upstream].post(url, **kwargs) as response:
         log.debug(f"POST call at {url} returned: {response}")
+        return response.status
 
 
 async def api_request_and_retry(url: str, retries: int = 3) -> dict:
     """
-    Try to query Planetside2 API.
+    Try to query Planetside2 API, through the "census" upstream.
 
     :param retries: (Optional, default: 3) Number of retries.
     :param url: URL to get.
@@ -81,7 +187,7 @@ async def api_request_and_retry(url: str, retries: int = 3) -> dict:
             if i != 0:
                 await asyncio.sleep(backoff.delay())
             j_data = await _request(url)
-        except (ClientError, JSONDecodeError) as e:
+        except (ClientError, asyncio.TimeoutError, JSONDecodeError) as e:
             log.warning(f"API request: {e} on try {i} for {url}")
             # Try again
             continue
@@ -117,19 +223,20 @@ async def _fetch(url: str) -> str:
     :return: result of the request as text.
     :raise: UnexpectedError if OK is not returned by the request.
     """
-    async with client.get(url) as resp:
+    async with _sessions["census"].get(url) as resp:
         if resp.status != 200:
             log.error(f'Status {resp.status} for url {url}')
             raise UnexpectedError(f'Received wrong status from http page: {resp.status}')
         return await resp.text()
 
 
-async def _fetch_code(url):
+async def _fetch_code(url, upstream):
     """
     HTTP request.
 
     :param url: URL to get.
+    :param upstream: Upstream the url belongs to.
     :return: Code returned by the HTTP request.
     """
-    async with client.get(url) as resp:
+    async with _sessions[upstream].get(url) as resp:
         return resp.status
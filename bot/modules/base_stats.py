@@ -0,0 +1,178 @@
+"""
+| Maintain base and faction balance aggregates in memory.
+| Results are aggregated per base, faction and side (team 1 or team 2), and per faction pairing.
+| Match documents are fed through :meth:`add_match_data` (at init, along with the other match based modules)
+  and :meth:`add_match` (at match end).
+| Queries only read the aggregates: no database call or scan of the matches is done at query time.
+"""
+
+# External imports
+from logging import getLogger
+
+# Internal imports
+import modules.config as cfg
+
+log = getLogger("pog_bot")
+
+#: Minimum number of matches on a base before its balance is displayed during base selection.
+MIN_MATCHES_DISPLAY = 3
+
+
+class Record:
+    """
+    Results of a set of teams.
+    """
+    __slots__ = ("matches", "wins", "draws", "score")
+
+    def __init__(self):
+        self.matches = 0
+        self.wins = 0
+        self.draws = 0
+        self.score = 0
+
+    def add(self, score, other_score):
+        self.matches += 1
+        self.score += score
+        if score > other_score:
+            self.wins += 1
+        elif score == other_score:
+            self.draws += 1
+
+    def merge(self, other: 'Record'):
+        self.matches += other.matches
+        self.wins += other.wins
+        self.draws += other.draws
+        self.score += other.score
+
+    @property
+    def win_rate(self):
+        if self.matches == 0:
+            return 0
+        return self.wins / self.matches
+
+    @property
+    def avg_score(self):
+        if self.matches == 0:
+            return 0
+        return self.score / self.matches
+
+
+# (base id, faction id, side) -> Record
+_table = dict()
+# (faction id, opponent faction id) -> Record, of the first faction
+_pairings = dict()
+# base id -> number of matches
+_base_matches = dict()
+# base id -> balance summary string, invalidated when the base is played
+_summaries = dict()
+
+
+def _get_record(table, key):
+    if key not in table:
+        table[key] = Record()
+    return table[key]
+
+
+def _add(base_id, factions, scores):
+    _base_matches[base_id] = _base_matches.get(base_id, 0) + 1
+    _summaries.pop(base_id, None)
+    for side in range(2):
+        other = 1 - side
+        _get_record(_table, (base_id, factions[side], side)).add(scores[side], scores[other])
+        _get_record(_pairings, (factions[side], factions[other])).add(scores[side], scores[other])
+
+
+def add_match_data(data: dict):
+    """
+    Add a match document to the aggregates.
+    Typically called at init for every match in the database.
+
+    :param data: Match document, as stored in the database.
+    """
+    teams = data["teams"]
+    _add(data["base_id"], [tm["faction_id"] for tm in teams], [tm["score"] for tm in teams])
+
+
+def add_match(match_data: 'match.classes.MatchData'):
+    """
+    Add a match which just ended to the aggregates.
+
+    :param match_data: MatchData object of the match.
+    """
+    teams = match_data.teams
+    _add(match_data.base.id, [tm.faction for tm in teams], [tm.score for tm in teams])
+
+
+def clear():
+    _table.clear()
+    _pairings.clear()
+    _base_matches.clear()
+    _summaries.clear()
+
+
+def get_nb_matches(base_id: int = None) -> int:
+    """
+    Get the number of matches played.
+
+    :param base_id: (Optional) Only count the matches played on this base.
+    """
+    if base_id is None:
+        return sum(_base_matches.values())
+    return _base_matches.get(base_id, 0)
+
+
+def get_faction_stats(base_id: int = None) -> dict:
+    """
+    Get the results of each faction.
+
+    :param base_id: (Optional) Only count the matches played on this base.
+    :return: Dictionary faction id -> :class:`Record`.
+    """
+    result = {f_id: Record() for f_id in cfg.factions}
+    for (b_id, f_id, side), record in _table.items():
+        if base_id is None or b_id == base_id:
+            result[f_id].merge(record)
+    return result
+
+
+def get_side_stats(base_id: int = None) -> list:
+    """
+    Get the results of each side (team 1 and team 2).
+
+    :param base_id: (Optional) Only count the matches played on this base.
+    :return: List of two :class:`Record`.
+    """
+    result = [Record(), Record()]
+    for (b_id, f_id, side), record in _table.items():
+        if base_id is None or b_id == base_id:
+            result[side].merge(record)
+    return result
+
+
+def get_pairing_stats() -> dict:
+    """
+    Get the results of each faction pairing, all bases included.
+
+    :return: Dictionary (faction id, opponent faction id) -> :class:`Record` of the first faction.
+    """
+    return dict(_pairings)
+
+
+def get_summary(base_id: int) -> (str, None):
+    """
+    Get a short balance summary of a base, such as "12 matches, VS 58% NC 42% TR 50%".
+    Summaries are cached until the base is played again.
+
+    :param base_id: Id of the base.
+    :return: The summary, None if not enough matches were played on this base.
+    """
+    if base_id in _summaries:
+        return _summaries[base_id]
+    nb_matches = get_nb_matches(base_id)
+    if nb_matches < MIN_MATCHES_DISPLAY:
+        return
+    rates = [f"{cfg.factions[f_id]} {round(100 * record.win_rate)}%"
+             for f_id, record in get_faction_stats(base_id).items() if record.matches]
+    summary = f"{nb_matches} matches, {' '.join(rates)}"
+    _summaries[base_id] = summary
+    return summary
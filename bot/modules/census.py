@@ -8,12 +8,16 @@ import modules.config as cfg
 from classes import Weapon
 from display import AllStrings as display, ContextWrapper
 from modules.tools import AutoDict
+from modules.send_scheduler import Priority
+import modules.tracing as tracing
 
+from asyncio import gather
 from logging import getLogger
 
 log = getLogger("pog_bot")
 
 
+@tracing.traced()
 async def process_score(match: 'match.classes.MatchData', start_time: int, match_channel: 'TextChannel' = None):
     """
     Calculate the result score for the MatchData object provided.
@@ -42,12 +46,14 @@ async def process_score(match: 'match.classes.MatchData', start_time: int, match
     # Request url:
     url = f'http://census.daybreakgames.com/s:{cfg.general["api_key"]}/get/ps2:v2/characters_event/?character_id=' \
           f'{",".join(str(p.ig_id) for p in ig_dict.values())}&type=KILL&after={start}&before={end}&c:limit=500'
-    j_data = await http_request(url, retries=5)
+    with tracing.span("census_kills"):
+        j_data = await http_request(url, retries=5)
 
     if j_data["returned"] == 0:
         raise ApiNotReachable(f"Empty answer on score calculation (url={url})")
 
     event_list = j_data["characters_event_list"]
+    tracing.get_current_span().set_attribute("events", len(event_list))
 
     ill_weapons = dict()
 
@@ -98,17 +104,23 @@ async def process_score(match: 'match.classes.MatchData', start_time: int, match
                 ill_weapons[player].auto_add(weapon.id, 1)
 
     # Display all banned-weapons uses for this player:
+    staff_sends = list()
     for player in ill_weapons.keys():
         for weap_id in ill_weapons[player]:
             weapon = Weapon.get(weap_id)
             if match_channel:
                 await display.SC_ILLEGAL_WE.send(match_channel, player.mention, weapon.name,
                                                  match.id, ill_weapons[player][weap_id])
-                await display.SC_ILLEGAL_WE.send(ContextWrapper.channel(cfg.channels["staff"]), player.mention,
-                                                 weapon.name, match.id, ill_weapons[player][weap_id])
+                # Staff copies are only informative: submitted together so that they are batched in one message
+                staff_ctx = ContextWrapper.channel(cfg.channels["staff"], priority=Priority.LOW,
+                                                   is_batchable=True)
+                staff_sends.append(display.SC_ILLEGAL_WE.send(staff_ctx, player.mention, weapon.name,
+                                                              match.id, ill_weapons[player][weap_id]))
+    await gather(*staff_sends)
 
     # Also get base captures
-    await get_captures(match, start, end)
+    with tracing.span("census_captures"):
+        await get_captures(match, start, end)
 
 
 async def get_captures(match: 'match.classes.MatchData', start: int, end: int):
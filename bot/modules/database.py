@@ -4,10 +4,12 @@
 
 # External modules
 from pymongo import MongoClient
-from asyncio import get_event_loop
 from logging import getLogger
 from typing import Callable
 
+# Internal modules
+import modules.diagnostics as diagnostics
+
 log = getLogger("pog_bot")
 
 # dict for the collections
@@ -37,16 +39,20 @@ def init(config: dict):
         _collections[collection] = db[config["collections"][collection]]
 
 
-def get_all_elements(init_class_method: Callable, collection: str):
+def get_all_elements(init_class_method: Callable, collection: str, fields: list = None):
     """
     Get all elements of a given collection.
 
     :param init_class_method: The data will be passed to this method.
     :param collection: Collection name.
+    :param fields: (Optional) Only retrieve these fields (and the id) of each element.
     :raise DatabaseError: If an error occurs while passing data.
     """
     # Get all elements
-    items = _collections[collection].find()
+    if fields:
+        items = _collections[collection].find({}, {field: 1 for field in fields})
+    else:
+        items = _collections[collection].find()
     # Pass them to the method
     try:
         for result in items:
@@ -63,8 +69,7 @@ async def async_db_call(call: Callable, *args):
     :param args: Args to pass to the called function.
     :return: Return the result of the call.
     """
-    loop = get_event_loop()
-    return await loop.run_in_executor(None, call, *args)
+    return await diagnostics.run_in_executor("db", call, *args)
 
 
 def force_update(collection: str, elements):
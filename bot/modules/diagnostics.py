@@ -0,0 +1,246 @@
+"""
+| Diagnostics of the event loop: what blocks the bot, and for how long.
+| A probe is scheduled on the event loop every :data:`PROBE_INTERVAL` seconds, the delay between its scheduled and
+  actual run time is the loop lag.
+| A watchdog thread checks that the probe keeps running: if the loop is blocked for more than
+  :data:`STALL_THRESHOLD` seconds, the stack of the loop thread is logged while it is still blocked.
+| Blocking calls offloaded to the default executor should go through :meth:`run_in_executor`, which tracks the queue
+  depth and wait time of each pool (database calls, image rendering).
+| Call :meth:`start` once the loop is running. A summary is logged every :data:`LOG_INTERVAL` seconds.
+"""
+
+# External imports
+from asyncio import get_event_loop, current_task
+from collections import deque
+from logging import getLogger
+from threading import Thread, Lock, get_ident
+from time import monotonic, sleep
+import sys
+import traceback
+
+# Internal imports
+import modules.timers as timers
+
+log = getLogger("pog_bot")
+
+#: Seconds between two runs of the lag probe.
+PROBE_INTERVAL = 0.5
+
+#: The loop is considered stalled (and its stack is logged) if the probe is late by more than this many seconds.
+STALL_THRESHOLD = 1
+
+#: Seconds between two checks of the watchdog thread.
+WATCHDOG_INTERVAL = 0.25
+
+#: Seconds between two summaries in the logs.
+LOG_INTERVAL = 600
+
+#: Number of stall reports kept for the admin command.
+MAX_STALL_REPORTS = 5
+
+
+class _LagStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.window_max = 0
+        self.stalls = 0
+        self.longest_stall = 0
+
+    def observe(self, lag):
+        self.count += 1
+        self.total += lag
+        self.max = max(self.max, lag)
+        self.window_max = max(self.window_max, lag)
+        if lag > STALL_THRESHOLD:
+            self.stalls += 1
+            self.longest_stall = max(self.longest_stall, lag)
+
+    def to_dict(self):
+        return {"avg_lag": self.total / self.count if self.count else 0,
+                "max_lag": self.max,
+                "recent_max_lag": self.window_max,
+                "stalls": self.stalls,
+                "longest_stall": self.longest_stall}
+
+
+class _PoolStats:
+    """
+    Counters of an executor pool, updated from the worker threads.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.done = 0
+        self.failed = 0
+        self.total_wait = 0
+        self.max_wait = 0
+        self.total_time = 0
+        self.max_time = 0
+
+    def to_dict(self):
+        with self.lock:
+            return {"queued": self.queued,
+                    "running": self.running,
+                    "max_queued": self.max_queued,
+                    "done": self.done,
+                    "failed": self.failed,
+                    "avg_wait": self.total_wait / self.done if self.done else 0,
+                    "max_wait": self.max_wait,
+                    "avg_time": self.total_time / self.done if self.done else 0,
+                    "max_time": self.max_time}
+
+
+_lag = _LagStats()
+# Pool name -> _PoolStats
+_pools = dict()
+_stall_reports = deque(maxlen=MAX_STALL_REPORTS)
+
+_loop = None
+_loop_thread_id = None
+_next_probe = 0
+# Last time the probe ran, read by the watchdog thread
+_heartbeat = 0
+
+
+def start():
+    """
+    Start the lag probe, the watchdog thread and the periodic summary. Does nothing if already started.
+    """
+    global _loop, _loop_thread_id, _next_probe, _heartbeat
+    if _loop is not None:
+        return
+    _loop = get_event_loop()
+    _loop_thread_id = get_ident()
+    _heartbeat = monotonic()
+    _next_probe = _loop.time() + PROBE_INTERVAL
+    _loop.call_at(_next_probe, _probe)
+    Thread(target=_watchdog, name="loop_watchdog", daemon=True).start()
+    timers.call_every(LOG_INTERVAL, _log_summary, delay=LOG_INTERVAL)
+
+
+def _probe():
+    global _next_probe, _heartbeat
+    now = _loop.time()
+    _heartbeat = monotonic()
+    _lag.observe(now - _next_probe)
+    _next_probe = now + PROBE_INTERVAL
+    _loop.call_at(_next_probe, _probe)
+
+
+def _watchdog():
+    reported = 0
+    while True:
+        sleep(WATCHDOG_INTERVAL)
+        heartbeat = _heartbeat
+        blocked = monotonic() - heartbeat - PROBE_INTERVAL
+        if blocked <= STALL_THRESHOLD or reported == heartbeat:
+            continue
+        # Only report once per stall
+        reported = heartbeat
+        _report_stall(blocked)
+
+
+def _report_stall(blocked):
+    frame = sys._current_frames().get(_loop_thread_id)
+    stack = "".join(traceback.format_stack(frame)) if frame else "Unknown\n"
+    try:
+        task = current_task(_loop)
+    except RuntimeError:
+        task = None
+    task_name = task.get_coro().__qualname__ if task else "no task (callback)"
+    _stall_reports.append((task_name, blocked, stack))
+    log.warning(f"Event loop blocked for more than {blocked:.2f}s in {task_name}, stack:\n{stack}")
+
+
+def _get_pool(name):
+    pool = _pools.get(name)
+    if pool is None:
+        pool = _PoolStats()
+        _pools[name] = pool
+    return pool
+
+
+def _tracked_call(pool, submitted, fct, args):
+    started = monotonic()
+    wait = started - submitted
+    with pool.lock:
+        pool.queued -= 1
+        pool.running += 1
+        pool.total_wait += wait
+        pool.max_wait = max(pool.max_wait, wait)
+    is_failed = True
+    try:
+        result = fct(*args)
+        is_failed = False
+        return result
+    finally:
+        duration = monotonic() - started
+        with pool.lock:
+            pool.running -= 1
+            pool.done += 1
+            pool.total_time += duration
+            pool.max_time = max(pool.max_time, duration)
+            if is_failed:
+                pool.failed += 1
+
+
+async def run_in_executor(pool_name: str, fct, *args):
+    """
+    Run a blocking function in the default executor, keeping track of the executor queue for this kind of call.
+
+    :param pool_name: Name of the kind of call, e.g. "db" or "image".
+    :param fct: Function to call.
+    :param args: Args to pass to the function.
+    :return: Return the result of the call.
+    """
+    pool = _get_pool(pool_name)
+    with pool.lock:
+        pool.queued += 1
+        pool.max_queued = max(pool.max_queued, pool.queued)
+    return await get_event_loop().run_in_executor(None, _tracked_call, pool, monotonic(), fct, args)
+
+
+def get_stats() -> dict:
+    """
+    Get the diagnostics metrics.
+
+    :return: Dictionary with the event loop lag statistics (in seconds) under "loop",
+        and the statistics of each executor pool under its name.
+    """
+    stats = {"loop": _lag.to_dict()}
+    for name, pool in _pools.items():
+        stats[name] = pool.to_dict()
+    return stats
+
+
+def get_stall_reports() -> list:
+    """
+    Get the last stalls of the event loop.
+
+    :return: List of (task name, seconds blocked when detected, stack) tuples, oldest first.
+    """
+    return list(_stall_reports)
+
+
+def get_summary() -> str:
+    """
+    Get a one line summary of the diagnostics.
+    """
+    loop_stats = _lag.to_dict()
+    summary = f"loop lag avg {loop_stats['avg_lag'] * 1000:.1f}ms, " \
+              f"recent max {loop_stats['recent_max_lag'] * 1000:.1f}ms, " \
+              f"max {loop_stats['max_lag'] * 1000:.1f}ms, stalls {loop_stats['stalls']}"
+    for name, pool in _pools.items():
+        stats = pool.to_dict()
+        summary += f"; {name}: queued {stats['queued']} (max {stats['max_queued']}), running {stats['running']}, " \
+                   f"avg wait {stats['avg_wait'] * 1000:.1f}ms, avg time {stats['avg_time'] * 1000:.1f}ms"
+    return summary
+
+
+async def _log_summary():
+    log.info(f"Diagnostics: {get_summary()}")
+    _lag.window_max = 0
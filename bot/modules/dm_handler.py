@@ -11,7 +11,7 @@ log = getLogger("pog_bot")
 
 async def on_dm(message):
     # Check if too many requests from this user:
-    if await spam_checker.is_spam(message.author, message.channel):
+    if await spam_checker.is_spam(message.author, message.channel, budget=spam_checker.Budget.DM):
         return
     if message.content[:1] == "=":
         message.content = message.content[1:]
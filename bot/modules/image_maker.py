@@ -5,7 +5,6 @@ This module handle the creation of score images
 # External imports
 import discord
 from PIL import Image, ImageDraw, ImageFont
-from asyncio import get_event_loop
 from datetime import datetime as dt
 import os
 
@@ -13,6 +12,8 @@ import os
 from display.strings import AllStrings as display
 from display.classes import ContextWrapper
 import modules.config as cfg
+import modules.diagnostics as diagnostics
+import modules.tracing as tracing
 
 # Fonts we will use
 big_font = ImageFont.truetype("../fonts/OpenSans2.ttf", 100)
@@ -237,6 +238,7 @@ def _make_image(match: 'match.classes.MatchData'):
     img.save(f'../../POG-data/matches/match_{match.id}.png')
 
 
+@tracing.traced()
 async def publish_match_image(match: 'match.classes.Match'):
     """
     Display the match score sheet in the result channel.
@@ -244,8 +246,8 @@ async def publish_match_image(match: 'match.classes.Match'):
     :param match: Match object
     """
     # Make image
-    loop = get_event_loop()
-    await loop.run_in_executor(None, _make_image, match.data)
+    with tracing.span("render_image"):
+        await diagnostics.run_in_executor("image", _make_image, match.data)
 
     # If already posted once
     if match.result_msg:
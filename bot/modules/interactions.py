@@ -1,14 +1,84 @@
-from modules.spam_checker import is_spam, unlock
+"""
+| Handle the interactions with the bot components (buttons, select menus).
+| All components share one callback, :meth:`dispatch`, which routes each interaction to its handler from a table
+  keyed by (message id, custom id). The table only holds weak references: a handler which is not used anymore
+  is not kept alive by its views, and its routes are removed with it.
+| Views of cleaned handlers are disabled in batches, by a single task.
+"""
+
+from modules.spam_checker import is_spam, unlock, Budget
 from discord import Interaction
 from logging import getLogger
 from inspect import iscoroutinefunction as is_coroutine
 from discord.errors import NotFound
-from lib.tasks import Loop
+import modules.timers as timers
 from display import ContextWrapper, InteractionContext
 from modules.roles import is_admin
+from asyncio import gather, sleep
+from functools import partial
+from weakref import ref
 
 log = getLogger("pog_bot")
 
+#: Seconds to wait for more views to disable before editing their messages.
+DISABLE_BATCH_DELAY = 0.1
+
+# (message id, custom id) -> weak reference to the handler
+_routes = dict()
+# message id -> (message, view) to disable
+_pending_disables = dict()
+_is_disabling = False
+
+
+async def dispatch(interaction: Interaction):
+    """
+    Callback of all the components: run the handler of the message and custom id of the interaction.
+
+    :param interaction: Interaction received.
+    """
+    handler_ref = _routes.get((interaction.message.id, interaction.data['custom_id']))
+    handler = handler_ref() if handler_ref else None
+    if handler is None:
+        log.warning(f"No handler for interaction '{interaction.data['custom_id']}' "
+                    f"on message {interaction.message.id}")
+        return
+    await handler.run(interaction)
+
+
+def _drop_routes(keys, handler_ref):
+    # Handler was garbage collected
+    for key in keys:
+        if _routes.get(key) is handler_ref:
+            del _routes[key]
+
+
+def _disable_view(msg, view):
+    global _is_disabling
+    _pending_disables[msg.id] = (msg, view)
+    if not _is_disabling:
+        _is_disabling = True
+        timers.spawn(_disable_pending)
+
+
+async def _disable_pending():
+    global _is_disabling
+    try:
+        while _pending_disables:
+            await sleep(DISABLE_BATCH_DELAY)
+            batch = list(_pending_disables.values())
+            _pending_disables.clear()
+            await gather(*(_remove_msg(msg, view) for msg, view in batch))
+    finally:
+        _is_disabling = False
+
+
+async def _remove_msg(msg, view):
+    try:
+        ctx = ContextWrapper.wrap(msg)
+        await ctx.edit(view=view)
+    except NotFound:
+        log.warning("NotFound exception when trying to remove message!")
+
 
 class InteractionNotAllowed(Exception):
     pass
@@ -24,7 +94,7 @@ class InteractionInvalid(Exception):
 
 class InteractionPayload:
     def __init__(self, ih, owner, view):
-        self.callback = ih.run
+        self.callback = dispatch
         self.message_callback = ih.message_callback
         self.view = view
         self.owner = owner
@@ -40,6 +110,11 @@ class InteractionHandler:
         self.__view = None
         self.__locked = False
         self.__payload = InteractionPayload(self, owner, view)
+        # Routes of the current message
+        self.__keys = list()
+        # Routes of all messages of this handler, dropped when the handler is garbage collected
+        self.__all_keys = set()
+        self.__ref = ref(self, partial(_drop_routes, self.__all_keys))
 
     def get_new_context(self, ctx, do_clean=True):
         self.__locked = True
@@ -53,6 +128,15 @@ class InteractionHandler:
         self.__msg = msg
         self.__view = kwargs['view']
         self.__locked = False
+        if msg is None:
+            # Interaction responses don't return the message: no route, components call the handler directly
+            for child in self.__view.children:
+                child.callback = self.run
+            return
+        self.__keys = [(msg.id, child.custom_id) for child in self.__view.children]
+        for key in self.__keys:
+            _routes[key] = self.__ref
+        self.__all_keys.update(self.__keys)
 
     async def run_player_check(self, interaction):
         # For inheritance purposes
@@ -68,7 +152,8 @@ class InteractionHandler:
         user = interaction.user
         player = None
 
-        if await is_spam(user, interaction.message.channel, ctx=InteractionContext(interaction)):
+        if await is_spam(user, interaction.message.channel, ctx=InteractionContext(interaction),
+                         budget=Budget.INTERACTION):
             return
 
         self.__locked = True
@@ -120,13 +205,11 @@ class InteractionHandler:
                 # Fix for https://github.com/discord/discord-api-docs/issues/4148
                 # TODO: Just empty the view when the issue is fixed
             self.__view.stop()
-            Loop(coro=self._remove_msg, count=1).start(self.__msg, self.__view)
+            _disable_view(self.__msg, self.__view)
+        for key in self.__keys:
+            if _routes.get(key) is self.__ref:
+                del _routes[key]
+            self.__all_keys.discard(key)
+        self.__keys = list()
         self.__msg = None
         self.__view = None
-
-    async def _remove_msg(self, msg, view):
-        try:
-            ctx = ContextWrapper.wrap(msg)
-            await ctx.edit(view=view)
-        except NotFound:
-            log.warning("NotFound exception when trying to remove message!")
@@ -1,66 +1,184 @@
-from gspread import service_account
+"""
+| Read the bookings of the Jaeger calendar.
+| The calendar sheet is kept in sync by :mod:`modules.sheets`. Each time it changes, it is parsed once into a
+  timeline of booked bases: the time boundaries of all bookings, sorted, and for each segment between two
+  boundaries the set of bases booked during it.
+| Checking which bases are booked at a given time is then a single bisect on the timeline: bookings starting or
+  ending are taken into account without fetching the calendar again.
+"""
+
+from bisect import bisect_right
 from datetime import datetime as dt, timezone as tz, timedelta as td
-from numpy import array as np_array
 from re import compile as reg_compile, sub as reg_sub
 
 from modules.tools import date_parser
 
 import modules.config as cfg
+import modules.sheets as sheets
 
 from logging import getLogger
 
 log = getLogger("pog_bot")
 
-_secret_file = ""
-
-
-def init(secret_file):
-    global _secret_file
-    _secret_file = secret_file
-
-
-def get_booked_bases(base_class, booked_bases_list):  # runs on class init, saves a list of booked bases at the time of init to self.booked
-    index_start = index_end = None
-    gc = service_account(filename=_secret_file)
-    sh = gc.open_by_key(cfg.database["jaeger_cal"])
-    ws = sh.worksheet("Current")
-    cal_export = np_array(ws.get_all_values())
-    date_col = cal_export[:,0]
-    for index, value in enumerate(date_col):
-        if not index_start and value == dt.now(tz.utc).strftime('%b-%d'):
-            # gets us the header for the current date section in the google sheet
-            index_start = index + 1
-            continue
-        if value == (dt.now(tz.utc) + td(days=1)).strftime('%b-%d'):
-            # gets us the header for tomorrow's date in the sheet
-            index_end = index  # now we know the range on the google sheet to look for base availability
-            break
-    if index_start is None or index_end is None:
-        log.warning(f"Unable to find date range in Jaeger calendar for today's date. Returned: '{index_start}' "
-                    f"to '{index_end}'")
+#: Seconds between two revision checks of the calendar, done in the background.
+CALENDAR_TTL = 120
+
+# Columns of the calendar sheet
+_DATE_COL = 0
+_BASES_COL = 3
+_END_COL = 9
+_START_COL = 10  # 45 mins before start of reservation
+_END_OVERRIDE_COL = 11
+
+_SPLITTING_CHARS = ['/', ',', '&', '(', ')']
+_CLEAN_PATTERN = reg_compile("[^a-zA-Z0-9 ]")
+
+_base_class = None
+
+
+class BookingIndex:
+    """
+    Timeline of the booked bases.
+
+    :param bookings: List of (start, end, base ids) tuples, start and end being timestamps.
+    """
+    def __init__(self, bookings):
+        events = list()
+        for start, end, base_ids in bookings:
+            for b_id in base_ids:
+                events.append((start, 1, b_id))
+                events.append((end, -1, b_id))
+        events.sort()
+
+        self.__boundaries = list()
+        self.__booked = list()
+        active = dict()
+        for i, (stamp, delta, b_id) in enumerate(events):
+            active[b_id] = active.get(b_id, 0) + delta
+            if active[b_id] == 0:
+                del active[b_id]
+            # Close the segment once all the events of this boundary are processed
+            if i + 1 == len(events) or events[i + 1][0] != stamp:
+                self.__boundaries.append(stamp)
+                self.__booked.append(frozenset(active))
+
+    def get_booked(self, stamp: float) -> frozenset:
+        """
+        Get the ids of the bases booked at a given time.
+
+        :param stamp: Timestamp.
+        :return: Set of base ids.
+        """
+        i = bisect_right(self.__boundaries, stamp) - 1
+        if i < 0:
+            return frozenset()
+        return self.__booked[i]
+
+    def is_booked(self, base_id: int, stamp: float) -> bool:
+        return base_id in self.get_booked(stamp)
+
+
+def init(base_class):
+    """
+    Register the calendar sheet, and fetch it once.
+
+    :param base_class: Base class, used to identify the booked bases. Bases should be loaded already.
+    """
+    global _base_class
+    _base_class = base_class
+    sheets.register("jaeger_cal", cfg.database["jaeger_cal"], "Current", _parse_calendar, ttl=CALENDAR_TTL)
+    try:
+        sheets.refresh("jaeger_cal")
+    except Exception as e:
+        # Not critical, background sync will try again
+        log.warning(f"Could not fetch Jaeger calendar: {e}")
+
+
+def is_loaded() -> bool:
+    return sheets.get("jaeger_cal") is not None
+
+
+async def wait_loaded():
+    """
+    Fetch the calendar if it was never fetched (i.e. google was not reachable at init).
+    All callers share the same fetch.
+    """
+    if is_loaded():
         return
-
-
-    today_bookings = cal_export[index_start:index_end]
-
-    for booking in today_bookings:
+    try:
+        await sheets.async_refresh("jaeger_cal")
+    except Exception as e:
+        log.warning(f"Could not fetch Jaeger calendar: {e}")
+
+
+def is_booked(base, stamp: float = None) -> bool:
+    """
+    Check if a base is booked in the Jaeger calendar.
+
+    :param base: Base to check.
+    :param stamp: (Optional) Timestamp, defaults to now.
+    :return: True if the base is booked, False if not or if the calendar is not available.
+    """
+    index = sheets.get("jaeger_cal")
+    if index is None or base is None:
+        return False
+    if stamp is None:
+        stamp = dt.now(tz.utc).timestamp()
+    return index.is_booked(base.id, stamp)
+
+
+def _get_section_date(value, now):
+    """
+    Get the date of a day section header ('Oct-19'), None if value is not a header.
+    """
+    # Calendar is around current date: handle sections across new year
+    for year in (now.year, now.year - 1, now.year + 1):
+        try:
+            date = dt.strptime(f"{value}-{year}", '%b-%d-%Y').replace(tzinfo=tz.utc)
+        except ValueError:
+            # Not a header (or 29th of february on a non leap year)
+            continue
+        if abs(date - now) <= td(days=183):
+            return date
+
+
+def _parse_calendar(values):
+    now = dt.now(tz.utc)
+    section_date = None
+    bookings = list()
+    identified = dict()
+    for booking in values:
+        header_date = _get_section_date(booking[_DATE_COL], now)
+        if header_date:
+            section_date = header_date.replace(tzinfo=None)
+            continue
+        if section_date is None:
+            continue
         try:
-            start_time = date_parser(booking[10])  # 45 mins before start of reservation
-            if booking[11] != "":
-                end_time = date_parser(booking[11])
+            start_time = date_parser(booking[_START_COL], default=section_date)
+            if booking[_END_OVERRIDE_COL] != "":
+                end_time = date_parser(booking[_END_OVERRIDE_COL], default=section_date)
             else:
-                end_time = date_parser(booking[9])
-            if start_time <= dt.now(tz.utc) <= end_time:
-                splitting_chars = ['/', ',', '&', '(', ')']
-                booked_bases = booking[3]
-                for sc in splitting_chars:
-                    booked_bases = booked_bases.replace(sc, ';')
-                booked_bases = [_identify_base_from_name(base, base_class) for base in booked_bases.split(";")]
-                for booked in booked_bases:
-                    if booked is not None and booked not in booked_bases_list:
-                        booked_bases_list.append(booked)
-        except (ValueError, TypeError) as e:
+                end_time = date_parser(booking[_END_COL], default=section_date)
+            if start_time is None or end_time is None:
+                continue
+            if end_time < start_time:
+                # Booking ending after midnight
+                end_time += td(days=1)
+            booked_bases = booking[_BASES_COL]
+            for sc in _SPLITTING_CHARS:
+                booked_bases = booked_bases.replace(sc, ';')
+            base_ids = set()
+            for name in booked_bases.split(";"):
+                if name not in identified:
+                    identified[name] = _identify_base_from_name(name, _base_class)
+                if identified[name] is not None:
+                    base_ids.add(identified[name].id)
+            if base_ids:
+                bookings.append((start_time.timestamp(), end_time.timestamp(), base_ids))
+        except (ValueError, TypeError, IndexError) as e:
             log.warning(f"Skipping invalid line in Jaeger Calendar:\n{booking}\nError: {e}")
+    return BookingIndex(bookings)
 
 
 def _identify_base_from_name(name, base_class):
@@ -69,8 +187,7 @@ def _identify_base_from_name(name, base_class):
         return
 
     # Use regex to clean the string from unwanted characters
-    pattern = reg_compile("[^a-zA-Z0-9 ]")
-    name = reg_sub(" {2,}", " ", pattern.sub('', name)).strip()
+    name = reg_sub(" {2,}", " ", _CLEAN_PATTERN.sub('', name)).strip()
 
     # Add all matching bases to list
     results = base_class.get_bases_from_name(name)
@@ -0,0 +1,303 @@
+"""
+| Maintain ranked player leaderboards in memory.
+| Call :meth:`init` at bot init to build the all-time indexes from the player stats collection.
+| Match documents are fed through :meth:`add_match_data` (at init) and :meth:`add_match` (at match end),
+  to maintain the weekly and monthly leaderboards.
+| Use :meth:`get_top` to query a leaderboard: no database call or full scan is done at query time.
+"""
+
+# External imports
+from bisect import bisect_left, insort
+from datetime import datetime as dt, timezone as tz, timedelta as td
+from logging import getLogger
+
+# Internal imports
+from classes import PlayerStat
+import modules.database as db
+
+log = getLogger("pog_bot")
+
+#: Number of entries returned by default by :meth:`get_top`.
+DEFAULT_TOP = 10
+
+#: Minimum number of matches for a player to appear in ratio leaderboards.
+MIN_MATCHES = 2
+
+#: Number of time windows of each kind kept in memory (current one included).
+MAX_WINDOWS = 3
+
+#: Available periods for windowed leaderboards.
+PERIODS = ("week", "month")
+
+
+class _Entry:
+    """
+    Aggregated stats of one player, for one leaderboard scope (all-time, or one time window).
+    """
+    def __init__(self, p_id):
+        self.id = p_id
+        self.matches = 0
+        self.time_played = 0
+        self.times_captain = 0
+        self.kills = 0
+        self.deaths = 0
+        self.score = 0
+
+    @classmethod
+    def from_stats(cls, stats: PlayerStat):
+        obj = cls(stats.id)
+        obj.matches = stats.nb_matches_played
+        obj.time_played = stats.time_played
+        obj.times_captain = stats.times_captain
+        obj.kills = stats.kills
+        obj.deaths = stats.deaths
+        obj.score = stats.score
+        return obj
+
+    def add(self, time_played, is_captain, kills, deaths, score):
+        self.matches += 1
+        self.time_played += time_played
+        self.times_captain += int(is_captain)
+        self.kills += kills
+        self.deaths += deaths
+        self.score += score
+
+    @property
+    def kpm(self):
+        if self.time_played == 0:
+            return 0
+        return self.kills / self.time_played
+
+    @property
+    def cpm(self):
+        if self.matches == 0:
+            return 0
+        return self.times_captain / self.matches
+
+
+def _ratio(attr):
+    def getter(entry):
+        if entry.matches < MIN_MATCHES:
+            return None
+        return getattr(entry, attr)
+    return getter
+
+
+def _total(attr):
+    def getter(entry):
+        value = getattr(entry, attr)
+        if value == 0:
+            return None
+        return value
+    return getter
+
+
+#: Available metrics: name -> (value getter, display name).
+#: The getter returns None when the player should not be ranked.
+METRICS = {
+    "kpm": (_ratio("kpm"), "Kills per minute"),
+    "matches": (_total("matches"), "Matches played"),
+    "captain": (_total("times_captain"), "Times captain"),
+    "cpm": (_ratio("cpm"), "Captain / match ratio"),
+    "kills": (_total("kills"), "Kills"),
+    "score": (_total("score"), "Score"),
+}
+
+
+class _RankIndex:
+    """
+    Sorted index of the players for one metric.
+    Keys are kept sorted as (-value, player_id) so that the top of the leaderboard is at the head of the list.
+    Updating one player is a bisect, reading the top N is a slice.
+    """
+    def __init__(self, getter):
+        self.__getter = getter
+        self.__keys = list()
+        self.__current = dict()
+
+    def update(self, entry: _Entry):
+        old = self.__current.pop(entry.id, None)
+        if old is not None:
+            del self.__keys[bisect_left(self.__keys, old)]
+        value = self.__getter(entry)
+        if value is None:
+            return
+        key = (-value, entry.id)
+        insort(self.__keys, key)
+        self.__current[entry.id] = key
+
+    def top(self, n):
+        return [(p_id, -neg_value) for neg_value, p_id in self.__keys[:n]]
+
+    def rank(self, p_id):
+        key = self.__current.get(p_id)
+        if key is None:
+            return None
+        return bisect_left(self.__keys, key) + 1
+
+    def __len__(self):
+        return len(self.__keys)
+
+
+class _Board:
+    """
+    Leaderboard for one scope: holds the player entries and one index per metric.
+    """
+    def __init__(self):
+        self.entries = dict()
+        self.indexes = dict()
+        self.clear()
+
+    def clear(self):
+        self.entries.clear()
+        self.indexes = {name: _RankIndex(metric[0]) for name, metric in METRICS.items()}
+
+    def get_entry(self, p_id):
+        if p_id not in self.entries:
+            self.entries[p_id] = _Entry(p_id)
+        return self.entries[p_id]
+
+    def set_entry(self, entry: _Entry):
+        self.entries[entry.id] = entry
+        self.refresh(entry)
+
+    def refresh(self, entry: _Entry):
+        for index in self.indexes.values():
+            index.update(entry)
+
+
+_all_time = _Board()
+
+# Period name -> {window key -> _Board}
+_windows = {period: dict() for period in PERIODS}
+
+
+def _week_key(stamp):
+    # Weeks go from sunday to sunday, same as the PSB usage reports:
+    # shifting by one day puts sundays in the following ISO week.
+    date = dt.fromtimestamp(stamp, tz.utc) + td(days=1)
+    iso = date.isocalendar()
+    return iso[0], iso[1]
+
+
+def _month_key(stamp):
+    date = dt.fromtimestamp(stamp, tz.utc)
+    return date.year, date.month
+
+
+_key_functions = {
+    "week": _week_key,
+    "month": _month_key,
+}
+
+
+def _get_window(period, stamp, create=False):
+    key = _key_functions[period](stamp)
+    windows = _windows[period]
+    if key not in windows and create:
+        windows[key] = _Board()
+        # Drop the oldest windows
+        for old_key in sorted(windows.keys())[:-MAX_WINDOWS]:
+            del windows[old_key]
+    return windows.get(key)
+
+
+def _add_to_windows(stamp, p_id, *args):
+    for period in PERIODS:
+        board = _get_window(period, stamp, create=True)
+        if board is None:
+            # Window is older than the windows kept in memory
+            continue
+        entry = board.get_entry(p_id)
+        entry.add(*args)
+        board.refresh(entry)
+
+
+def init():
+    """
+    Build the all-time leaderboards from the player stats collection.
+    """
+    _all_time.clear()
+
+    def from_data(data):
+        stats = PlayerStat(data["_id"], "N/A", data=data)
+        _all_time.set_entry(_Entry.from_stats(stats))
+
+    db.get_all_elements(from_data, "player_stats")
+
+
+def add_match_data(data: dict):
+    """
+    Add a match document to the windowed leaderboards.
+    Typically called at init for every match in the database.
+
+    :param data: Match document, as stored in the database.
+    """
+    stamp = data["round_stamps"][0]
+    for team in data["teams"]:
+        for i, p_data in enumerate(team["players"]):
+            kills = deaths = score = 0
+            for loadout in p_data["loadouts"] or list():
+                kills += loadout["kills"]
+                deaths += loadout["deaths"]
+                score += loadout["score"]
+            time_played = data["round_length"] * p_data["rounds"].count(True)
+            _add_to_windows(stamp, p_data["discord_id"], time_played, i == 0, kills, deaths, score)
+
+
+def add_match(match_data: 'match.classes.MatchData'):
+    """
+    Update all leaderboards with a match which just ended.
+    Should be called once the player stats were updated with this match.
+
+    :param match_data: MatchData object of the match.
+    """
+    stamp = match_data.round_stamps[0]
+    for team in match_data.teams:
+        for p_score in team.players:
+            if p_score.stats:
+                _all_time.set_entry(_Entry.from_stats(p_score.stats))
+            time_played = match_data.round_length * p_score.nb_rounds_played
+            _add_to_windows(stamp, p_score.id, time_played, p_score.is_captain,
+                            p_score.kills, p_score.deaths, p_score.score)
+
+
+def get_top(metric: str, period: str = None, n: int = DEFAULT_TOP, stamp: int = None) -> list:
+    """
+    Get the top of a leaderboard.
+
+    :param metric: Metric name, one of :data:`METRICS`.
+    :param period: (Optional) One of :data:`PERIODS`. All-time leaderboard if None.
+    :param n: Number of entries to return.
+    :param stamp: (Optional) Timestamp within the requested period, defaults to now.
+    :return: List of (player id, value) tuples, best first.
+    :raise KeyError: If the metric or period is unknown.
+    """
+    if metric not in METRICS:
+        raise KeyError(metric)
+    if period is None:
+        board = _all_time
+    else:
+        if period not in _key_functions:
+            raise KeyError(period)
+        if stamp is None:
+            stamp = dt.now(tz.utc).timestamp()
+        board = _get_window(period, stamp)
+        if board is None:
+            return list()
+    return board.indexes[metric].top(n)
+
+
+def get_rank(p_id: int, metric: str) -> (int, None):
+    """
+    Get the all-time rank of a player for a given metric.
+
+    :param p_id: Player id.
+    :param metric: Metric name, one of :data:`METRICS`.
+    :return: Rank (starting at 1), None if the player is not ranked.
+    """
+    return _all_time.indexes[metric].rank(p_id)
+
+
+def get_metric_name(metric: str) -> str:
+    return METRICS[metric][1]
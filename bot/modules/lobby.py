@@ -1,11 +1,12 @@
 import modules.config as cfg
 from display import AllStrings as disp, ContextWrapper, views, InteractionContext
 
-from lib.tasks import Loop, loop
+from lib.tasks import loop
 from logging import getLogger
 
 import modules.tools as tools
 import modules.interactions as interactions
+import modules.timers as timers
 
 log = getLogger("pog_bot")
 
@@ -169,7 +170,7 @@ def _start_match_from_full_lobby():
     _auto_ping_cancel()
     if match is None:
         _set_lobby_stuck(True)
-        Loop(coro=_send_stuck_msg, count=1).start()
+        timers.spawn(_send_stuck_msg)
     else:
         _set_lobby_stuck(False)
         match.spin_up(_lobby_list.copy())
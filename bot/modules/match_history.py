@@ -0,0 +1,223 @@
+"""
+| Columnar store of the match history, for analytics.
+| Each match adds one row per player, stored as one raw binary file per column (see :data:`COLUMNS`).
+  Columns can be memory-mapped as numpy arrays with :meth:`load`, so that queries over the full history
+  are vectorized and don't need the database.
+| Call :meth:`add_match` once a match was pushed to the database to append its rows,
+  or :meth:`export_all` to rebuild the whole store from the matches collection.
+  If the store is empty when the first match is added, it is filled from the matches collection first,
+  so that it never holds only the recent matches.
+"""
+
+# External imports
+from asyncio import get_event_loop
+from logging import getLogger
+from threading import Lock
+import numpy as np
+import os
+
+# Internal imports
+import modules.database as db
+
+log = getLogger("pog_bot")
+
+#: Default folder of the store.
+FOLDER = "../../POG-data/match_history"
+
+#: Column name -> numpy dtype. One row per player per match.
+COLUMNS = {
+    "match_id": "<i8",
+    "round_1_stamp": "<i8",
+    "round_2_stamp": "<i8",  # 0 if the match was only one round long
+    "round_length": "<i2",
+    "base_id": "<i8",
+    "player_id": "<i8",
+    "team": "<i1",
+    "faction": "<i1",
+    "is_captain": "?",
+    "won": "?",  # True for both teams in case of a draw
+    "nb_rounds": "<i1",
+    "loadout_id": "<i2",  # Main loadout (most weight), -1 if none
+    "kills": "<i4",
+    "deaths": "<i4",
+    "net": "<i4",
+    "score": "<i4",
+    "headshots": "<i4",
+    "team_score": "<i4",
+}
+
+#: Number of matches buffered in memory by :meth:`export_all` before writing them.
+EXPORT_CHUNK = 1000
+
+# Ids of the matches already in the store, loaded on first use
+_known_ids = None
+# Writes happen in executor threads: the check of _known_ids, the write and the update must not interleave
+_lock = Lock()
+
+
+def _get_path(folder, column):
+    return os.path.join(folder, f"{column}.bin")
+
+
+def _rows_from_data(data):
+    """
+    Flatten a match document into a list of rows (tuples ordered as :data:`COLUMNS`).
+    """
+    stamps = data["round_stamps"]
+    round_2 = stamps[1] if len(stamps) > 1 else 0
+    scores = [team["score"] for team in data["teams"]]
+    rows = list()
+    for t_id, team in enumerate(data["teams"]):
+        won = scores[t_id] >= scores[1 - t_id]
+        for i, p_data in enumerate(team["players"]):
+            loadouts = p_data["loadouts"] or list()
+            kills = deaths = net = score = headshots = 0
+            main_loadout = -1
+            max_weight = -1
+            for loadout in loadouts:
+                kills += loadout["kills"]
+                deaths += loadout["deaths"]
+                net += loadout["net"]
+                score += loadout["score"]
+                headshots += loadout.get("headshots", 0)
+                if loadout["weight"] > max_weight:
+                    max_weight = loadout["weight"]
+                    main_loadout = loadout["loadout_id"]
+            rows.append((data["_id"], stamps[0], round_2, data["round_length"], data["base_id"],
+                         p_data["discord_id"], t_id, team["faction_id"], i == 0, won,
+                         p_data["rounds"].count(True), main_loadout, kills, deaths, net, score, headshots,
+                         scores[t_id]))
+    return rows
+
+
+def _get_lengths(folder):
+    lengths = dict()
+    for name, dtype in COLUMNS.items():
+        path = _get_path(folder, name)
+        size = os.path.getsize(path) if os.path.isfile(path) else 0
+        lengths[name] = size // np.dtype(dtype).itemsize
+    return lengths
+
+
+def _trim_columns(folder):
+    """
+    Truncate all columns to the length of the shortest one, so that appended rows stay aligned.
+    """
+    lengths = _get_lengths(folder)
+    nb_rows = min(lengths.values())
+    for name, dtype in COLUMNS.items():
+        if lengths[name] != nb_rows:
+            log.warning(f"Match history: column {name} trimmed from {lengths[name]} to {nb_rows} rows")
+            os.truncate(_get_path(folder, name), nb_rows * np.dtype(dtype).itemsize)
+
+
+def _write_rows(rows, folder):
+    if not rows:
+        return
+    os.makedirs(folder, exist_ok=True)
+    # An interrupted write could have left some columns longer than the others
+    _trim_columns(folder)
+    columns = list(zip(*rows))
+    for (name, dtype), values in zip(COLUMNS.items(), columns):
+        with open(_get_path(folder, name), "ab") as file:
+            file.write(np.array(values, dtype=dtype).tobytes())
+
+
+def _get_known_ids(folder):
+    global _known_ids
+    if _known_ids is None:
+        columns = load(folder)
+        if columns and len(columns["match_id"]) > 0:
+            _known_ids = set(np.unique(columns["match_id"]).tolist())
+        else:
+            # Never exported: appending to it would only give the matches played from now on
+            log.warning("Match history store is empty, exporting all matches from the database")
+            nb_matches = _export_all(folder)
+            log.info(f"Match history store filled with {nb_matches} matches")
+    return _known_ids
+
+
+def add_match_data(data: dict, folder: str = FOLDER):
+    """
+    Append a match to the store, if it is not already in it.
+    If the store is empty, it is first filled with all the matches of the database.
+
+    :param data: Match document, as stored in the database.
+    :param folder: Folder of the store.
+    """
+    with _lock:
+        known = _get_known_ids(folder)
+        if data["_id"] in known:
+            return
+        _write_rows(_rows_from_data(data), folder)
+        known.add(data["_id"])
+
+
+async def add_match(match_data: 'match.classes.MatchData'):
+    """
+    Append a match which just ended to the store, in an executor. Errors are logged, not raised.
+
+    :param match_data: MatchData object of the match, already pushed to the database.
+    """
+    try:
+        await get_event_loop().run_in_executor(None, add_match_data, match_data.get_data())
+    except (OSError, ValueError, KeyError, db.DatabaseError) as e:
+        log.error(f"Could not add match {match_data.id} to match history: {e}")
+
+
+def export_all(folder: str = FOLDER) -> int:
+    """
+    Rebuild the whole store from the matches collection.
+    Matches are streamed from the database and written by chunks, memory use does not depend on the history size.
+
+    :param folder: Folder of the store.
+    :return: Number of matches exported.
+    """
+    with _lock:
+        return _export_all(folder)
+
+
+def _export_all(folder):
+    global _known_ids
+    os.makedirs(folder, exist_ok=True)
+    for name in COLUMNS:
+        open(_get_path(folder, name), "wb").close()
+    _known_ids = set()
+    buffer = list()
+    nb_matches = 0
+
+    def from_data(data):
+        nonlocal nb_matches
+        if data["_id"] in _known_ids:
+            return
+        buffer.extend(_rows_from_data(data))
+        _known_ids.add(data["_id"])
+        nb_matches += 1
+        if nb_matches % EXPORT_CHUNK == 0:
+            _write_rows(buffer, folder)
+            buffer.clear()
+
+    db.get_all_elements(from_data, "matches")
+    _write_rows(buffer, folder)
+    return nb_matches
+
+
+def load(folder: str = FOLDER) -> dict:
+    """
+    Memory-map the store.
+
+    :param folder: Folder of the store.
+    :return: Dictionary column name -> read-only numpy array, all of the same length. Empty if there is no store.
+    """
+    if not os.path.isfile(_get_path(folder, "match_id")):
+        return dict()
+    lengths = _get_lengths(folder)
+    # An interrupted write could leave some columns longer than the others
+    nb_rows = min(lengths.values())
+    columns = dict()
+    for name, dtype in COLUMNS.items():
+        if nb_rows == 0:
+            columns[name] = np.zeros(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(_get_path(folder, name), dtype=dtype, mode="r", shape=(nb_rows,))
+    return columns
@@ -0,0 +1,131 @@
+"""
+| Histograms of the duration of each phase of a match, from the lobby being full to the start of the rounds.
+| Durations are observed by the match logger plugin (:class:`match.plugins.logger.SimpleLogger`)
+  as match events happen, and kept in memory since bot start.
+| Use :meth:`get_summary` for a readable summary, or :meth:`write_prometheus` to export the histograms
+  in the Prometheus text format.
+"""
+
+# External imports
+from bisect import bisect_left
+from logging import getLogger
+import os
+
+log = getLogger("pog_bot")
+
+#: Phases of a match, in order. Name -> description.
+PHASES = {
+    "captains": "Lobby full to captains selected",
+    "picks": "Captains selected to teams done",
+    "factions": "Teams done to factions picked",
+    "base": "Factions picked to base selected",
+    "ready": "Match ready to round 1 countdown",
+    "ready_round_2": "Round 1 over to round 2 countdown",
+    "countdown": "Countdown to round start",
+    "total": "Lobby full to round 1 start",
+}
+
+#: Upper bounds of the histogram buckets, in seconds.
+BUCKETS = (5, 15, 30, 60, 120, 180, 300, 600, 900, 1800, 3600)
+
+#: Default path of the Prometheus export.
+EXPORT_PATH = "../../POG-data/metrics/match_phases.prom"
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets: each observation is counted in the first bucket it fits in.
+    Counts are only made cumulative when exported.
+    """
+    def __init__(self):
+        # Last bucket is +Inf
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            return 0
+        return self.sum / self.count
+
+    def quantile(self, q):
+        """
+        Estimate a quantile, interpolating linearly within the bucket it falls in.
+        """
+        if self.count == 0:
+            return 0
+        rank = q * self.count
+        cumulated = 0
+        for i, nb in enumerate(self.counts):
+            if nb and cumulated + nb >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - cumulated) / nb, self.max)
+            cumulated += nb
+        return self.max
+
+
+_histograms = {phase: Histogram() for phase in PHASES}
+
+
+def observe(phase: str, seconds: float):
+    """
+    Record the duration of a match phase.
+
+    :param phase: Phase name, one of :data:`PHASES`.
+    :param seconds: Duration of the phase.
+    """
+    _histograms[phase].observe(max(seconds, 0))
+
+
+def get_summary() -> list:
+    """
+    Get a summary of the phase durations.
+
+    :return: List of (phase description, count, mean, median, 90th percentile, max) tuples, in phase order.
+    """
+    result = list()
+    for phase, description in PHASES.items():
+        hist = _histograms[phase]
+        result.append((description, hist.count, hist.mean, hist.quantile(0.5), hist.quantile(0.9), hist.max))
+    return result
+
+
+def get_prometheus() -> str:
+    """
+    Get the histograms in the Prometheus text format.
+    """
+    lines = ["# HELP pog_match_phase_seconds Duration of the phases of a match.",
+             "# TYPE pog_match_phase_seconds histogram"]
+    for phase, hist in _histograms.items():
+        cumulated = 0
+        for bound, nb in zip(BUCKETS + ("+Inf",), hist.counts):
+            cumulated += nb
+            lines.append(f'pog_match_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulated}')
+        lines.append(f'pog_match_phase_seconds_sum{{phase="{phase}"}} {hist.sum}')
+        lines.append(f'pog_match_phase_seconds_count{{phase="{phase}"}} {hist.count}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str = EXPORT_PATH) -> str:
+    """
+    Write the histograms in the Prometheus text format, e.g. for the node exporter textfile collector.
+    The file is replaced atomically.
+
+    :param path: Path of the file to write.
+    :return: The path of the file written.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        file.write(get_prometheus())
+    os.replace(tmp_path, path)
+    return path
@@ -1,4 +1,8 @@
-"""Tiny module used as a slight spam protector
+"""
+| Filter the messages received by the bot: commands are tokenized in one pass and passed to discord.py.
+| Commands of one user are processed one at a time, in the order they were received, and never at the same time as
+  an interaction of the user (see :meth:`modules.spam_checker.user_turn`).
+| Raw discord ids in the arguments are resolved as members, fetched members (and unknown ids) are cached.
 """
 
 from display import AllStrings as disp, ContextWrapper
@@ -6,10 +10,53 @@ from discord import DMChannel, NotFound
 import modules.config as cfg
 from modules.loader import is_all_locked
 from modules.roles import is_admin
-from asyncio import sleep
 import modules.spam_checker as spam_checker
 from modules.dm_handler import on_dm
 
+from collections import OrderedDict
+from logging import getLogger
+from re import compile as reg_compile
+from time import monotonic, perf_counter
+
+log = getLogger("pog_bot")
+
+#: Minimum number for a discord id.
+MIN_DISCORD_ID = 21154535154122752
+
+#: Number of members kept in the member cache.
+MEMBER_CACHE_SIZE = 256
+#: Seconds after which a cached member (or unknown id) is fetched again.
+MEMBER_CACHE_TTL = 600
+
+#: A warning is logged for commands taking more than this many seconds, end to end.
+SLOW_COMMAND = 2
+
+_SEPARATORS = reg_compile(r"[\s,/;]+")
+
+# Member id -> (member, or None if not found, stamp), least recently used first
+_members = OrderedDict()
+
+
+class _Stats:
+    def __init__(self):
+        self.commands = 0
+        self.total_time = 0
+        self.max_time = 0
+        self.slow = 0
+        self.cache_hits = 0
+        self.fetches = 0
+
+    def to_dict(self):
+        return {"commands": self.commands,
+                "avg_time": self.total_time / self.commands if self.commands else 0,
+                "max_time": self.max_time,
+                "slow": self.slow,
+                "member_cache_hits": self.cache_hits,
+                "member_fetches": self.fetches}
+
+
+_stats = _Stats()
+
 
 class FakeMember:
     def __init__(self, id):
@@ -21,6 +68,46 @@ class FakeMember:
         return f'<@{self.id}>'
 
 
+def get_stats() -> dict:
+    """
+    Get the command processing metrics.
+
+    :return: Dictionary with the number of commands processed, their average and max end to end time in seconds,
+        the number of slow commands, and the number of member cache hits and member fetches.
+    """
+    return _stats.to_dict()
+
+
+def _tokenize(content):
+    """
+    Split a command in lower-case arguments (case is kept for =rename).
+    """
+    if content[:7].lower() != "=rename":
+        content = content.lower()
+    return [arg for arg in _SEPARATORS.split(content) if arg]
+
+
+async def _get_member(guild, m_id):
+    member = guild.get_member(m_id)
+    if member:
+        return member
+    now = monotonic()
+    cached = _members.get(m_id)
+    if cached and now - cached[1] < MEMBER_CACHE_TTL:
+        _members.move_to_end(m_id)
+        _stats.cache_hits += 1
+        return cached[0]
+    _stats.fetches += 1
+    try:
+        member = await guild.fetch_member(m_id)
+    except NotFound:
+        member = None
+    _members[m_id] = (member, now)
+    _members.move_to_end(m_id)
+    if len(_members) > MEMBER_CACHE_SIZE:
+        _members.popitem(last=False)
+    return member
+
 
 async def on_message(client, message):
 
@@ -52,46 +139,26 @@ async def on_message(client, message):
             return
         # Admins can still use bot when locked
 
+    start = perf_counter()
+
     # Save actual author
     actual_author = message.author
 
-    # Check if too many requests from this user:
-    if await spam_checker.is_spam(message.author, message.channel):
+    # Check if too many requests from this user, commands are queued instead of locking the user:
+    if await spam_checker.is_spam(message.author, message.channel, lock=False):
         return
 
-    try:
-        # Make the message lower-case:
-        if not message.content.lower().startswith("=rename"):
-            message.content = message.content.lower()
-
-        message.content = message.content.replace(",", " ").replace("/", " ").replace(";", " ")
-
-        # Split on whitespaces
-        args = message.content.split()
-
+    async with spam_checker.user_turn(actual_author.id):
         new_args = list()
-        for arg in args:
+        for arg in _tokenize(message.content):
             if '@' in arg:
                 continue
-            try:
+            if arg.isdecimal():
                 arg_int = int(arg)
-            except ValueError:
-                pass
-            else:
-                if arg_int >= 21154535154122752:  # minimum number for discord id
-                    member = message.channel.guild.get_member(arg_int)
-                    if member:
-                        message.mentions.append(member)
-                        continue
-                    try:
-                        member = await message.channel.guild.fetch_member(arg_int)
-                    except NotFound:
-                        message.mentions.append(FakeMember(arg_int))
-                        continue
-                    if member:
-                        message.mentions.append(member)
-                        continue
-
+                if arg_int >= MIN_DISCORD_ID:
+                    member = await _get_member(message.channel.guild, arg_int)
+                    message.mentions.append(member if member else FakeMember(arg_int))
+                    continue
             new_args.append(arg)
 
         message.content = " ".join(new_args)
@@ -106,12 +173,14 @@ async def on_message(client, message):
             except (ValueError, IndexError):
                 ctx = ContextWrapper.wrap(message.channel, author=actual_author)
                 await disp.WRONG_USAGE.send(ctx, "as")
-                spam_checker.unlock(actual_author.id)
                 return
 
         await client.process_commands(message)  # if not spam, processes
 
-        # Call finished, we can release user
-        await sleep(0.5)
-    finally:
-        spam_checker.unlock(actual_author.id)
+    duration = perf_counter() - start
+    _stats.commands += 1
+    _stats.total_time += duration
+    _stats.max_time = max(_stats.max_time, duration)
+    if duration > SLOW_COMMAND:
+        _stats.slow += 1
+        log.warning(f"Slow command: '{message.content}' from id[{actual_author.id}] took {duration:.2f}s")
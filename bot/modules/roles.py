@@ -1,18 +1,38 @@
 # @CHECK 2.0 features OK
 
 import modules.config as cfg
+import modules.tracing as tracing
+from lib.tasks import loop
 
-from discord import Status
+from discord import Status, HTTPException
+from logging import getLogger
+from time import monotonic
+
+log = getLogger("pog_bot")
+
+#: Seconds to wait before applying a scheduled role update: status flips happening within this window are coalesced.
+DEBOUNCE_DELAY = 10
+#: A scheduled update is never postponed more than this many seconds by new flips.
+MAX_DEBOUNCE = 60
+#: Maximum number of member edits sent to discord per worker iteration (one iteration per second).
+MAX_EDITS_PER_TICK = 4
+#: Seconds to wait before retrying a member whose edit failed.
+RETRY_DELAY = 30
 
 _roles_dict = dict()
 _guild = None
 
+# Player id -> [due time, deadline, player]
+_pending = dict()
+
 
 def init(client):
     global _guild
     _guild = client.get_channel(cfg.channels["rules"]).guild
     for role in cfg.roles.keys():
         _roles_dict[role] = _guild.get_role(cfg.roles[role])
+    if not _role_worker.is_running():
+        _role_worker.start()
 
 
 def is_admin(member):
@@ -29,37 +49,90 @@ def is_muted(member):
     return _roles_dict["muted"] in member.roles
 
 
+def _get_desired_roles(player, memb):
+    """ Compute the set of managed roles the member should have
+    """
+    if player.is_timeout or player.is_away:
+        return set()
+    if player.is_notify and memb.status not in (Status.offline, Status.dnd) and not (player.is_lobbied or player.match):
+        return {_roles_dict["notify"]}
+    return {_roles_dict["registered"]}
+
+
+async def _apply_roles(memb, desired):
+    """ Diff desired roles against the cached member roles, only add and remove the managed roles which differ.
+        Roles not managed here are never sent, so a stale cache or a retried update cannot overwrite them.
+        Return True if discord was called
+    """
+    managed = (_roles_dict["registered"], _roles_dict["notify"])
+    current = {role for role in memb.roles if role in managed}
+    to_add = desired - current
+    to_remove = current - desired
+    if to_add:
+        await memb.add_roles(*to_add)
+    if to_remove:
+        await memb.remove_roles(*to_remove)
+    return bool(to_add or to_remove)
+
+
 async def remove_roles(p_id):
     memb = _guild.get_member(p_id)
     if memb is None:
         return
-    if _roles_dict["registered"] in memb.roles:
-        await memb.remove_roles(_roles_dict["registered"])
-    if _roles_dict["notify"] in memb.roles:
-        await memb.remove_roles(_roles_dict["notify"])
+    await _apply_roles(memb, set())
 
 
+@tracing.traced()
 async def role_update(player):
-    if player.is_timeout:
-        await remove_roles(player.id)
-        return
-    if player.is_away:
-        await remove_roles(player.id)
-        return
-    await perms_muted(False, player.id)
+    # Any pending update is superseded by this one
+    _pending.pop(player.id, None)
+    if not (player.is_timeout or player.is_away):
+        await perms_muted(False, player.id)
     memb = _guild.get_member(player.id)
     if memb is None:
-        return
-    if player.is_notify and memb.status not in (Status.offline, Status.dnd) and not (player.is_lobbied or player.match):
-        if _roles_dict["notify"] not in memb.roles:
-            await memb.add_roles(_roles_dict["notify"])
-        if _roles_dict["registered"] in memb.roles:
-            await memb.remove_roles(_roles_dict["registered"])
+        return False
+    return await _apply_roles(memb, _get_desired_roles(player, memb))
+
+
+def schedule_role_update(player, delay=DEBOUNCE_DELAY):
+    """ Schedule a role update for player, applied in the background by the role worker.
+        Updates scheduled again before being applied are coalesced into one.
+    """
+    now = monotonic()
+    if player.id in _pending:
+        deadline = _pending[player.id][1]
     else:
-        if _roles_dict["registered"] not in memb.roles:
-            await memb.add_roles(_roles_dict["registered"])
-        if _roles_dict["notify"] in memb.roles:
-            await memb.remove_roles(_roles_dict["notify"])
+        deadline = now + MAX_DEBOUNCE
+    _pending[player.id] = [min(now + delay, deadline), deadline, player]
+
+
+@loop(seconds=1)
+async def _role_worker():
+    now = monotonic()
+    due = [p_id for p_id, entry in _pending.items() if entry[0] <= now]
+    nb_edits = 0
+    for p_id in due:
+        if nb_edits >= MAX_EDITS_PER_TICK:
+            # Budget exhausted, remaining members will be processed on next iteration
+            break
+        entry = _pending.get(p_id)
+        if entry is None:
+            # Already updated in the meantime
+            continue
+        player = entry[2]
+        try:
+            if await role_update(player):
+                nb_edits += 1
+        except HTTPException as e:
+            log.warning(f"Role update failed for player [id={p_id}], retrying later: {e}")
+            _pending[p_id] = [now + RETRY_DELAY, now + RETRY_DELAY, player]
+            break
+        except Exception as e:
+            log.error(f"Unexpected error in role update for player [id={p_id}]: {e}")
+
+
+def get_pending_updates():
+    return len(_pending)
 
 
 async def perms_muted(value, p_id):
@@ -0,0 +1,298 @@
+"""
+| Central scheduler for all messages sent or edited on discord through :class:`display.classes.ContextWrapper`.
+| Each channel (or DM) has its own rate limit, and all channels share a global one: the bot stays below
+  discord rate limits instead of hitting 429 responses.
+| Pending messages are dispatched by priority: match-critical messages go before normal ones, which go before logs.
+| Low priority text messages are delayed a bit, and those whose message is not used by the caller are batched into
+  one single message per channel.
+| Messages of one channel are always sent one at a time, in order of priority then submission.
+| Call :meth:`init` at bot init to set the default priority of the channels.
+"""
+
+# External imports
+import asyncio
+from collections import deque
+from enum import IntEnum
+from heapq import heappush, heappop, heapify
+from itertools import count
+from logging import getLogger
+from time import monotonic
+
+# Internal imports
+import modules.timers as timers
+
+log = getLogger("pog_bot")
+
+#: Number of messages a channel can send within :data:`CHANNEL_PERIOD` seconds.
+CHANNEL_CAPACITY = 5
+CHANNEL_PERIOD = 5
+#: Number of messages the bot can send, all channels included, within :data:`GLOBAL_PERIOD` seconds.
+GLOBAL_CAPACITY = 40
+GLOBAL_PERIOD = 1
+#: Low priority messages wait this many seconds before being sent, so that bursts can be batched.
+BATCH_DELAY = 2
+#: Maximum length of a batched message (discord limit).
+BATCH_MAX_LENGTH = 2000
+#: A warning is logged when a message waited more than this many seconds in the queue.
+WAIT_WARNING = 10
+#: Seconds before dispatching again after an unexpected error.
+ERROR_DELAY = 1
+
+
+class Priority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class _Bucket:
+    """
+    Sliding window limit: at most `capacity` calls within any `period` seconds.
+    (A token bucket refilled continuously would let up to twice the capacity through in one period.)
+    """
+    def __init__(self, capacity, period):
+        self.__capacity = capacity
+        self.__period = period
+        # Stamps of the last calls, oldest first
+        self.__stamps = deque(maxlen=capacity)
+
+    def get_delay(self, now):
+        """
+        Seconds to wait before a call is allowed, 0 if it is.
+        """
+        if len(self.__stamps) < self.__capacity:
+            return 0
+        return max(self.__stamps[0] + self.__period - now, 0)
+
+    def take(self):
+        self.__stamps.append(monotonic())
+
+
+class _Job:
+    def __init__(self, channel_id, fct, kwargs, priority, not_before, batchable):
+        self.channel_id = channel_id
+        self.batchable = batchable
+        self.fct = fct
+        self.kwargs = kwargs
+        self.priority = priority
+        self.not_before = not_before
+        self.stamp = monotonic()
+        self.future = asyncio.get_event_loop().create_future()
+
+    @property
+    def is_batchable(self):
+        return self.batchable and self.priority is Priority.LOW and list(self.kwargs.keys()) == ['content']
+
+
+class _Stats:
+    def __init__(self):
+        self.submitted = 0
+        self.sent = 0
+        self.batched = 0
+        self.failed = 0
+        self.total_wait = 0
+        self.max_wait = 0
+
+    def to_dict(self):
+        nb_messages = self.sent + self.batched
+        return {"submitted": self.submitted,
+                "sent": self.sent,
+                "batched": self.batched,
+                "failed": self.failed,
+                "avg_wait": self.total_wait / nb_messages if nb_messages else 0,
+                "max_wait": self.max_wait}
+
+
+_queue = list()
+_counter = count()
+_channel_buckets = dict()
+_global_bucket = _Bucket(GLOBAL_CAPACITY, GLOBAL_PERIOD)
+_busy_channels = set()
+_channel_priorities = dict()
+_stats = {priority: _Stats() for priority in Priority}
+_throttled = 0
+_wake_up = None
+# Timer of the dispatcher task
+_dispatcher = None
+
+
+def init(high_channels=(), low_channels=()):
+    """
+    Set the default priority of the channels. Channels not specified have a normal priority.
+
+    :param high_channels: Ids of the channels where match-critical messages are sent.
+    :param low_channels: Ids of the log channels.
+    """
+    for channel_id in high_channels:
+        _channel_priorities[channel_id] = Priority.HIGH
+    for channel_id in low_channels:
+        _channel_priorities[channel_id] = Priority.LOW
+
+
+async def submit(channel_id: int, fct, kwargs: dict, priority: Priority = None, batchable: bool = False):
+    """
+    Schedule a discord call and wait for its result.
+
+    :param channel_id: Id of the channel (or user for DMs) targeted by the call.
+    :param fct: Coroutine function doing the call (send, edit...), will be called with `kwargs`.
+    :param kwargs: Keyword arguments for `fct`.
+    :param priority: Priority of the call, defaults to the priority of the channel.
+    :param batchable: If True and the call is a low priority text message, it can be merged with other ones of the \
+    channel. The caller then gets None: only use it if the message sent is not used afterwards.
+    :return: The result of the call.
+    :raise: Any exception raised by the call.
+    """
+    if priority is None:
+        priority = _channel_priorities.get(channel_id, Priority.NORMAL)
+    not_before = monotonic() + BATCH_DELAY if priority is Priority.LOW else 0
+    job = _Job(channel_id, fct, kwargs, priority, not_before, batchable)
+    _stats[priority].submitted += 1
+    heappush(_queue, (priority, next(_counter), job))
+    global _dispatcher
+    if _dispatcher is None or not _dispatcher.is_active:
+        _dispatcher = timers.spawn(_dispatch_forever)
+    elif _wake_up:
+        _wake_up.set()
+    return await job.future
+
+
+def _get_bucket(channel_id):
+    if channel_id not in _channel_buckets:
+        _channel_buckets[channel_id] = _Bucket(CHANNEL_CAPACITY, CHANNEL_PERIOD)
+    return _channel_buckets[channel_id]
+
+
+def _pop_batch(first):
+    """
+    Remove from the queue the low priority text messages which can be appended to `first`, in submission order.
+    """
+    # The heap array is not sorted: jobs of the same priority are ordered by their counter
+    candidates = sorted((item for item in _queue
+                         if item[2].channel_id == first.channel_id and item[2].is_batchable),
+                        key=lambda item: item[1])
+    batch = [first]
+    length = len(first.kwargs['content'])
+    taken = set()
+    for item in candidates:
+        job = item[2]
+        length += len(job.kwargs['content']) + 1
+        if length > BATCH_MAX_LENGTH:
+            # Later messages are not taken either, they would be sent before this one
+            break
+        batch.append(job)
+        taken.add(item[1])
+    if taken:
+        _queue[:] = [item for item in _queue if item[1] not in taken]
+        # The queue was filtered, heap invariant must be restored
+        heapify(_queue)
+    return batch
+
+
+def _dispatch_ready(now):
+    """
+    Start every job allowed by the buckets.
+
+    :return: Seconds before the next job could be started, None if nothing is waiting.
+    """
+    global _throttled
+    next_delay = None
+    blocked = set()
+    kept = list()
+    try:
+        while _queue:
+            item = heappop(_queue)
+            job = item[2]
+            if job.channel_id in _busy_channels or job.channel_id in blocked:
+                kept.append(item)
+                continue
+            bucket = _get_bucket(job.channel_id)
+            delay = max(job.not_before - now, bucket.get_delay(now), _global_bucket.get_delay(now))
+            if delay > 0:
+                # Keep the order within the channel: nothing else is sent there until this one is
+                blocked.add(job.channel_id)
+                kept.append(item)
+                if job.not_before <= now:
+                    _throttled += 1
+                if next_delay is None or delay < next_delay:
+                    next_delay = delay
+                continue
+            try:
+                batch = _pop_batch(job) if job.is_batchable else [job]
+            except Exception as e:
+                # The job is failed, not the whole queue
+                log.error(f"send_scheduler: could not dispatch message for channel {job.channel_id}: {e!r}",
+                          exc_info=True)
+                _stats[job.priority].failed += 1
+                job.future.set_exception(e)
+                continue
+            bucket.take()
+            _global_bucket.take()
+            _busy_channels.add(job.channel_id)
+            timers.spawn(_run, batch)
+    finally:
+        for item in kept:
+            heappush(_queue, item)
+    return next_delay
+
+
+async def _run(batch):
+    job = batch[0]
+    kwargs = job.kwargs
+    if len(batch) > 1:
+        kwargs = {'content': "\n".join(j.kwargs['content'] for j in batch)}
+    try:
+        result = await job.fct(**kwargs)
+    except Exception as e:
+        _stats[job.priority].failed += len(batch)
+        for j in batch:
+            if not j.future.done():
+                j.future.set_exception(e)
+    else:
+        now = monotonic()
+        stats = _stats[job.priority]
+        stats.sent += 1
+        stats.batched += len(batch) - 1
+        for j in batch:
+            wait = now - j.stamp
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+            if wait > WAIT_WARNING:
+                log.warning(f"send_scheduler: message for channel {j.channel_id} waited {wait:.1f}s in queue")
+            if not j.future.done():
+                # A batched message belongs to no caller in particular
+                j.future.set_result(result if len(batch) == 1 else None)
+    finally:
+        _busy_channels.discard(job.channel_id)
+        if _wake_up:
+            _wake_up.set()
+
+
+async def _dispatch_forever():
+    global _wake_up
+    _wake_up = asyncio.Event()
+    while True:
+        _wake_up.clear()
+        try:
+            next_delay = _dispatch_ready(monotonic())
+        except Exception as e:
+            # Should not happen, but the dispatcher must keep running or every pending message would hang
+            log.error(f"send_scheduler: dispatch failed: {e!r}", exc_info=True)
+            next_delay = ERROR_DELAY
+        try:
+            await asyncio.wait_for(_wake_up.wait(), timeout=next_delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+def get_stats() -> dict:
+    """
+    Get the metrics of the scheduler.
+
+    :return: Dictionary with the queue length, number of throttled dispatches,
+        and the per priority counters: submitted messages, discord calls sent, messages batched into another one,
+        messages failed, average and max seconds waited in queue.
+    """
+    stats = {priority.name.lower(): _stats[priority].to_dict() for priority in Priority}
+    stats["queued"] = len(_queue)
+    stats["throttled"] = _throttled
+    return stats
@@ -0,0 +1,186 @@
+"""
+| Keep google sheets in sync in memory.
+| Call :meth:`init` once to authenticate, then :meth:`register` each worksheet the bot reads.
+| A worksheet is only downloaded again if its spreadsheet was modified since the last fetch (revision check),
+  and it is parsed once per download: readers get the cached parsed result with :meth:`get`, without waiting on google.
+| Worksheets registered with a TTL are refreshed in the background once :meth:`start_sync` was called.
+| If a local folder is given to :meth:`init`, worksheets are read from `<folder>/<key>/<worksheet>.csv` files instead
+  of google, which allows running the bot or scripts without google credentials.
+"""
+
+# External imports
+from asyncio import get_event_loop, shield
+from csv import reader as csv_reader
+from gspread import service_account
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from logging import getLogger
+from os import listdir, path, stat
+from threading import Lock
+from time import monotonic
+
+# Internal imports
+from lib.tasks import loop
+
+log = getLogger("pog_bot")
+
+#: Interval, in seconds, between two checks of the background synchronisation.
+SYNC_INTERVAL = 30
+
+
+class _GoogleBackend:
+    def __init__(self, secret_file):
+        self.__client = service_account(filename=secret_file)
+        self.__spreadsheets = dict()
+
+    def __open(self, key):
+        if key not in self.__spreadsheets:
+            self.__spreadsheets[key] = self.__client.open_by_key(key)
+        return self.__spreadsheets[key]
+
+    def get_revision(self, key):
+        # Drive metadata request, much lighter than downloading the values.
+        # Not read from the Spreadsheet object: it keeps the modification time of its first fetch
+        response = self.__client.request("get", f"{DRIVE_FILES_API_V3_URL}/{key}",
+                                         params={"fields": "modifiedTime", "supportsAllDrives": True})
+        return response.json()["modifiedTime"]
+
+    def get_values(self, key, worksheet):
+        return self.__open(key).worksheet(worksheet).get_all_values()
+
+
+class _LocalBackend:
+    def __init__(self, folder):
+        self.__folder = folder
+
+    def __path(self, key, worksheet):
+        return path.join(self.__folder, key, f"{worksheet}.csv")
+
+    def get_revision(self, key):
+        # Any change in one of the worksheets is a new revision
+        folder = path.join(self.__folder, key)
+        return tuple(sorted((file, stat(path.join(folder, file)).st_mtime_ns) for file in listdir(folder)))
+
+    def get_values(self, key, worksheet):
+        with open(self.__path(key, worksheet), newline='', encoding='utf-8') as file:
+            return list(csv_reader(file))
+
+
+class _Sheet:
+    def __init__(self, key, worksheet, parser, ttl):
+        self.key = key
+        self.worksheet = worksheet
+        self.parser = parser
+        self.ttl = ttl
+        self.revision = None
+        self.data = None
+        self.stamp = None
+        self.lock = Lock()
+
+    @property
+    def is_expired(self):
+        return self.ttl is not None and (self.stamp is None or monotonic() - self.stamp > self.ttl)
+
+
+_backend = None
+_sheets = dict()
+# Worksheet name -> future of the refresh currently running in an executor
+_in_flight = dict()
+
+
+def init(secret_file: str, local_folder: str = None):
+    """
+    Authenticate to google, once for all the sheets.
+
+    :param secret_file: Name of the gspread authentication json file.
+    :param local_folder: (Optional) Read the worksheets from csv files in this folder instead of google.
+    """
+    global _backend
+    if local_folder:
+        _backend = _LocalBackend(local_folder)
+    else:
+        _backend = _GoogleBackend(secret_file)
+
+
+def register(name: str, key: str, worksheet: str, parser, ttl: int = None):
+    """
+    Register a worksheet to keep in sync. Nothing is fetched until the first refresh.
+    Registering again the same worksheet under the same name keeps its cached data.
+
+    :param name: Name used to refer to this worksheet.
+    :param key: Key of the spreadsheet.
+    :param worksheet: Title of the worksheet.
+    :param parser: Function called with the worksheet values (list of rows) after each download, \
+    its result is what :meth:`get` returns.
+    :param ttl: (Optional) Seconds after which the worksheet is checked again by the background synchronisation. \
+    If None, the worksheet is only refreshed on demand.
+    """
+    sheet = _sheets.get(name)
+    if sheet and sheet.key == key and sheet.worksheet == worksheet:
+        sheet.parser = parser
+        sheet.ttl = ttl
+        return
+    _sheets[name] = _Sheet(key, worksheet, parser, ttl)
+
+
+def refresh(name: str, force: bool = False) -> bool:
+    """
+    Refresh a worksheet: download and parse it again if its spreadsheet was modified. Blocking call.
+
+    :param name: Name of the worksheet.
+    :param force: Download the worksheet even if the revision did not change.
+    :return: True if the worksheet was downloaded again.
+    """
+    sheet = _sheets[name]
+    with sheet.lock:
+        revision = _backend.get_revision(sheet.key)
+        sheet.stamp = monotonic()
+        if not force and revision is not None and revision == sheet.revision and sheet.data is not None:
+            return False
+        sheet.data = sheet.parser(_backend.get_values(sheet.key, sheet.worksheet))
+        sheet.revision = revision
+        log.info(f"Sheets: '{name}' refreshed")
+        return True
+
+
+async def async_refresh(name: str, force: bool = False) -> bool:
+    """
+    Same as :meth:`refresh`, run in an executor.
+    If a refresh of this worksheet is already running, wait for it instead of starting another one.
+    """
+    if name not in _in_flight:
+        future = get_event_loop().run_in_executor(None, refresh, name, force)
+        _in_flight[name] = future
+        future.add_done_callback(lambda _: _in_flight.pop(name, None))
+    # Shielded: a caller being cancelled should not cancel the refresh for the others
+    return await shield(_in_flight[name])
+
+
+def get(name: str):
+    """
+    Get the parsed data of a worksheet, as of the last refresh.
+
+    :param name: Name of the worksheet.
+    :return: The result of the worksheet parser, None if the worksheet was never fetched.
+    """
+    return _sheets[name].data
+
+
+def start_sync():
+    """
+    Start the background synchronisation of the worksheets registered with a TTL.
+    """
+    if not _sync_loop.is_running():
+        _sync_loop.start()
+
+
+@loop(seconds=SYNC_INTERVAL)
+async def _sync_loop():
+    for name, sheet in list(_sheets.items()):
+        if not sheet.is_expired:
+            continue
+        try:
+            await async_refresh(name)
+        except Exception as e:
+            # Keep the cached data, it will be tried again after the TTL
+            sheet.stamp = monotonic()
+            log.warning(f"Sheets: could not refresh '{name}': {e}")
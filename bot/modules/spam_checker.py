@@ -1,54 +1,276 @@
+"""
+| Per user rate limiting of the requests made to the bot.
+| Each user has one token bucket per kind of request (:class:`Budget`): commands, interactions and DMs.
+  A request is rejected if the bucket of its kind is empty, or if a previous request of the user is still being
+  processed (until :meth:`unlock` is called, or for at most :data:`BUSY_TIMEOUT` seconds).
+| Commands are queued instead: they wait for the previous requests of the user with :meth:`user_turn`.
+  Commands, interactions and DMs of a user share the same turn, so they are never processed concurrently.
+| Buckets are refilled lazily when a request arrives. Users idle for more than :data:`IDLE_TTL` seconds are evicted
+  (their buckets would be full again anyway), so memory only depends on the number of recently active users.
+"""
+
+# External imports
+from asyncio import get_event_loop, wait
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from enum import Enum
 from logging import getLogger
-from display import AllStrings as disp, ContextWrapper
-import modules.tools as tools
+from time import monotonic
 
-__spam_list = dict()
-__SPAM_MSG_FREQUENCY = 5
-__last_requests = dict()
+# Internal imports
+from display import AllStrings as disp, ContextWrapper
 
 log = getLogger("pog_bot")
 
 
-async def is_spam(author, channel, ctx=None):
-    a_id = author.id
-    if a_id in __spam_list and __spam_list[a_id] > 0:
-        if a_id in __last_requests and __last_requests[a_id] < tools.timestamp_now() - 30:
-            log.info(f"Automatically unlocked id[{a_id}], name[{author.name}] from spam filter")
-            unlock(a_id)
-    __last_requests[a_id] = tools.timestamp_now()
-    if a_id not in __spam_list:
-        __spam_list[a_id] = 1
-        return False
-    __spam_list[a_id] += 1
-    if __spam_list[a_id] == 1:
+class Budget(Enum):
+    COMMAND = "command"
+    INTERACTION = "interaction"
+    DM = "dm"
+
+
+#: Budget -> (number of requests, period in seconds): a user can make this many requests in a burst,
+#: then one more every `period / number` seconds.
+BUDGETS = {
+    Budget.COMMAND: (5, 10),
+    Budget.INTERACTION: (8, 10),
+    Budget.DM: (3, 30),
+}
+
+#: A request still holding the turn of its user after this many seconds is considered done.
+BUSY_TIMEOUT = 30
+
+#: Users without request for this many seconds are forgotten.
+IDLE_TTL = 60
+
+#: While a user keeps being rejected, a warning is sent every this many rejections.
+SPAM_MSG_FREQUENCY = 5
+
+
+class _User:
+    __slots__ = ("tokens", "refill_stamps", "rejected", "stamp")
+
+    def __init__(self, now):
+        self.tokens = {budget: capacity for budget, (capacity, period) in BUDGETS.items()}
+        self.refill_stamps = dict.fromkeys(BUDGETS, now)
+        self.rejected = 0
+        self.stamp = now
+
+    def take(self, budget, now):
+        """
+        Take a token from a bucket, after refilling it.
+
+        :return: True if a token was available.
+        """
+        capacity, period = BUDGETS[budget]
+        tokens = self.tokens[budget] + (now - self.refill_stamps[budget]) * capacity / period
+        self.refill_stamps[budget] = now
+        if tokens < 1:
+            self.tokens[budget] = tokens
+            return False
+        self.tokens[budget] = min(tokens, capacity) - 1
+        return True
+
+
+class _Turn:
+    """
+    Turn of the requests of a user, kept until no request holds or waits for it.
+    """
+    __slots__ = ("holder", "locked_since", "waiters")
+
+    def __init__(self, holder, now):
+        # Token of the request holding the turn
+        self.holder = holder
+        self.locked_since = now
+        # (token, future) of the requests waiting for the turn, in request order
+        self.waiters = deque()
+
+
+class _Stats:
+    def __init__(self):
+        self.allowed = 0
+        self.limited = 0
+        self.busy = 0
+
+    def to_dict(self):
+        return {"allowed": self.allowed, "limited": self.limited, "busy": self.busy}
+
+
+# User id -> _User, least recently active first
+_users = OrderedDict()
+# User id -> _Turn, only for users with a request being processed or waiting
+_turns = dict()
+# Token of the turns taken by is_spam, released by unlock
+_REQUEST = "request"
+_stats = {budget: _Stats() for budget in Budget}
+_evicted = 0
+
+
+def _evict(now):
+    global _evicted
+    while _users:
+        a_id, user = next(iter(_users.items()))
+        if now - user.stamp <= IDLE_TTL:
+            break
+        del _users[a_id]
+        _evicted += 1
+
+
+def _get_user(a_id, now):
+    _evict(now)
+    user = _users.get(a_id)
+    if user is None:
+        user = _User(now)
+        _users[a_id] = user
+    else:
+        _users.move_to_end(a_id)
+    user.stamp = now
+    return user
+
+
+def _pass_turn(a_id, turn):
+    """
+    Give the turn to the next waiting request, or free it if none is waiting.
+    """
+    while turn.waiters:
+        holder, future = turn.waiters.popleft()
+        # Skip the requests cancelled while waiting
+        if not future.done():
+            turn.holder = holder
+            turn.locked_since = monotonic()
+            future.set_result(None)
+            return
+    del _turns[a_id]
+
+
+def _release(a_id, turn, holder):
+    # No-op if the turn was taken back from this request (timeout or clear_spam_list)
+    if _turns.get(a_id) is turn and turn.holder is holder:
+        turn.holder = None
+        _pass_turn(a_id, turn)
+
+
+def _check_timeout(a_id, now):
+    turn = _turns.get(a_id)
+    if turn and turn.holder is not None and now - turn.locked_since > BUSY_TIMEOUT:
+        log.info(f"Automatically unlocked id[{a_id}] from spam filter")
+        _release(a_id, turn, turn.holder)
+
+
+async def _wait_turn(a_id, turn, holder):
+    future = get_event_loop().create_future()
+    turn.waiters.append((holder, future))
+    try:
+        while not future.done():
+            # The request holding the turn gets at most BUSY_TIMEOUT seconds
+            await wait((future,), timeout=max(turn.locked_since + BUSY_TIMEOUT - monotonic(), 0))
+            if not future.done():
+                _check_timeout(a_id, monotonic())
+    finally:
+        if not future.done():
+            future.cancel()
+
+
+@asynccontextmanager
+async def user_turn(a_id: int):
+    """
+    Wait for the previous requests of the user to be processed. Turns are granted in request order.
+    A request keeping the turn for more than :data:`BUSY_TIMEOUT` seconds loses it to the next one.
+
+    :param a_id: Id of the user.
+    """
+    holder = object()
+    turn = _turns.get(a_id)
+    try:
+        if turn is None:
+            turn = _Turn(holder, monotonic())
+            _turns[a_id] = turn
+        else:
+            await _wait_turn(a_id, turn, holder)
+        yield
+    finally:
+        _release(a_id, turn, holder)
+
+
+async def is_spam(author, channel, ctx=None, budget: Budget = Budget.COMMAND, lock: bool = True) -> bool:
+    """
+    Check if a request should be rejected. If not, the user is locked until :meth:`unlock` is called.
+
+    :param author: User making the request.
+    :param channel: Channel where the request was made, used to send a warning.
+    :param ctx: (Optional) Context to send the warning with, instead of `channel`.
+    :param budget: Kind of request.
+    :param lock: If False, only the rate limit applies: the request is not rejected if the user is busy, \
+    and the caller must wait for the turn of the user with :meth:`user_turn` instead.
+    :return: True if the request should be rejected.
+    """
+    now = monotonic()
+    user = _get_user(author.id, now)
+    stats = _stats[budget]
+    _check_timeout(author.id, now)
+    if lock and author.id in _turns:
+        stats.busy += 1
+        message = disp.STOP_SPAM
+    elif not user.take(budget, now):
+        stats.limited += 1
+        message = disp.STOP_SPAM_RATE
+    else:
+        stats.allowed += 1
+        if lock:
+            _turns[author.id] = _Turn(_REQUEST, now)
+        user.rejected = 0
         return False
-    if __spam_list[a_id] % __SPAM_MSG_FREQUENCY == 0:
+    user.rejected += 1
+    if user.rejected % SPAM_MSG_FREQUENCY == 0:
         if not ctx:
             ctx = ContextWrapper.wrap(channel, author=author)
-        await disp.STOP_SPAM.send(ctx)
+        await message.send(ctx)
     return True
 
 
-# This is never called:
-def clean():
-    tmp = __spam_list.copy()
-    for a_id in tmp:
-        if __spam_list[a_id] == 0:
-            del __spam_list[a_id]
+def unlock(a_id: int):
+    """
+    Mark the current request of a user as done.
 
+    :param a_id: Id of the user.
+    """
+    turn = _turns.get(a_id)
+    # The turn could be held by a command if the request already timed out
+    if turn and turn.holder is _REQUEST:
+        _release(a_id, turn, _REQUEST)
 
-def debug():
-    result = dict()
-    for k in list(__spam_list.keys()):
-        if __spam_list[k] > 0:
-            result[k] = __spam_list[k]
-    return result
 
+def debug() -> dict:
+    """
+    Get the users currently rejected.
+
+    :return: Dictionary user id -> number of consecutive rejected requests.
+    """
+    now = monotonic()
+    _evict(now)
+    return {a_id: user.rejected for a_id, user in _users.items() if user.rejected > 0}
 
-def clear_spam_list():
-    __spam_list.clear()
 
+def get_stats() -> dict:
+    """
+    Get the counters of the spam filter.
 
-def unlock(a_id):
-    __spam_list[a_id] = 0
+    :return: Dictionary with the number of tracked and evicted users,
+        and per budget the number of requests allowed, rejected by rate limit and rejected as busy.
+    """
+    stats = {budget.value: _stats[budget].to_dict() for budget in Budget}
+    stats["tracked"] = len(_users)
+    stats["evicted"] = _evicted
+    return stats
 
+
+def clear_spam_list():
+    """
+    Forget all users and free all the turns: requests waiting for a turn are all woken up.
+    """
+    _users.clear()
+    for turn in _turns.values():
+        for holder, future in turn.waiters:
+            if not future.done():
+                future.set_result(None)
+    _turns.clear()
@@ -2,6 +2,8 @@ import modules.database as db
 from datetime import datetime as dt, timezone as tz, date as dt_date, time as dt_time, timedelta as dt_delta
 import modules.tools as tools
 from classes import PlayerStat
+import modules.leaderboard as leaderboard
+import modules.base_stats as base_stats
 from logging import getLogger
 
 log = getLogger("pog_bot")
@@ -17,6 +19,8 @@ def init():
         global oldest
         _match_stamps[match["_id"]] = match["round_stamps"][0]
         oldest = match["round_stamps"][0] if oldest == 0 else min(match["round_stamps"][0], oldest)
+        leaderboard.add_match_data(match)
+        base_stats.add_match_data(match)
     db.get_all_elements(db_match, "matches")
 
 
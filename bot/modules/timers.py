@@ -0,0 +1,173 @@
+"""
+| Lightweight timers for one-shot and repeating background calls.
+| Use :meth:`spawn`, :meth:`call_later` or :meth:`call_every` instead of creating a :class:`lib.tasks.Loop`
+  for fire-once or simple periodic calls: a timer is only an entry in the event loop timer queue until it fires,
+  and each call gets a bare task.
+| Every timer returns a :class:`TimerHandle` which can be cancelled.
+| :class:`lib.tasks.Loop` should only be used for loops which need its reconnection logic.
+"""
+
+# External imports
+from asyncio import get_event_loop, CancelledError
+from logging import getLogger
+
+log = getLogger("pog_bot")
+
+# Tasks currently running, referenced so that they are not garbage collected
+_running = set()
+
+
+class _Stats:
+    def __init__(self):
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.pending = 0
+        self.total_lag = 0
+        self.max_lag = 0
+
+    def to_dict(self):
+        return {"scheduled": self.scheduled,
+                "fired": self.fired,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+                "pending": self.pending,
+                "running": len(_running),
+                "avg_lag": self.total_lag / self.fired if self.fired else 0,
+                "max_lag": self.max_lag}
+
+
+_stats = _Stats()
+
+
+class TimerHandle:
+    """
+    Handle of a timer, returned by :meth:`spawn`, :meth:`call_later` and :meth:`call_every`.
+    """
+    __slots__ = ("__fct", "__args", "__kwargs", "__interval", "__remaining", "__when", "__timer", "__task",
+                 "__is_cancelled")
+
+    def __init__(self, fct, args, kwargs, interval=None, count=1):
+        self.__fct = fct
+        self.__args = args
+        self.__kwargs = kwargs
+        self.__interval = interval
+        self.__remaining = count
+        self.__when = 0
+        self.__timer = None
+        self.__task = None
+        self.__is_cancelled = False
+
+    @property
+    def name(self):
+        return getattr(self.__fct, "__name__", repr(self.__fct))
+
+    @property
+    def is_active(self):
+        """
+        True if the timer is waiting to fire or its call is running.
+        """
+        return self.__timer is not None or (self.__task is not None and not self.__task.done())
+
+    def _schedule(self, delay):
+        loop = get_event_loop()
+        self.__when = loop.time() + delay
+        self.__timer = loop.call_at(self.__when, self.__fire)
+        _stats.scheduled += 1
+        _stats.pending += 1
+
+    def __fire(self):
+        loop = get_event_loop()
+        self.__timer = None
+        _stats.pending -= 1
+        _stats.fired += 1
+        lag = loop.time() - self.__when
+        _stats.total_lag += lag
+        _stats.max_lag = max(_stats.max_lag, lag)
+        self.__task = loop.create_task(self.__run())
+        _running.add(self.__task)
+        self.__task.add_done_callback(_running.discard)
+
+    async def __run(self):
+        try:
+            await self.__fct(*self.__args, **self.__kwargs)
+        except CancelledError:
+            raise
+        except Exception as e:
+            _stats.failed += 1
+            log.error(f"Timer: '{self.name}' raised exception: {e}", exc_info=True)
+        if self.__interval is None or self.__is_cancelled:
+            return
+        if self.__remaining is not None:
+            self.__remaining -= 1
+            if self.__remaining <= 0:
+                return
+        # Fixed rate, but late iterations are not caught up
+        loop = get_event_loop()
+        self._schedule(max(self.__when + self.__interval - loop.time(), 0))
+
+    def cancel(self):
+        """
+        Cancel the timer. If its call is running, the call is cancelled too.
+        """
+        if self.__is_cancelled:
+            return
+        self.__is_cancelled = True
+        _stats.cancelled += 1
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+            _stats.pending -= 1
+        if self.__task is not None and not self.__task.done():
+            self.__task.cancel()
+
+
+def call_later(delay: float, fct, *args, **kwargs) -> TimerHandle:
+    """
+    Call a coroutine function once, after a delay.
+
+    :param delay: Delay in seconds.
+    :param fct: Coroutine function to call.
+    :param args: Arguments of the call.
+    :param kwargs: Keyword arguments of the call.
+    :return: Handle of the timer.
+    """
+    handle = TimerHandle(fct, args, kwargs)
+    handle._schedule(delay)
+    return handle
+
+
+def spawn(fct, *args, **kwargs) -> TimerHandle:
+    """
+    Call a coroutine function once, as soon as possible, without waiting for it.
+    Same as :meth:`call_later` with no delay.
+    """
+    return call_later(0, fct, *args, **kwargs)
+
+
+def call_every(interval: float, fct, *args, count: int = None, delay: float = 0, **kwargs) -> TimerHandle:
+    """
+    Call a coroutine function periodically. A call is never started while the previous one is running.
+
+    :param interval: Seconds between the start of two calls.
+    :param fct: Coroutine function to call.
+    :param args: Arguments of the calls.
+    :param count: (Optional) Number of calls, infinite if None.
+    :param delay: (Optional) Delay before the first call.
+    :param kwargs: Keyword arguments of the calls.
+    :return: Handle of the timer.
+    """
+    handle = TimerHandle(fct, args, kwargs, interval=interval, count=count)
+    handle._schedule(delay)
+    return handle
+
+
+def get_stats() -> dict:
+    """
+    Get the metrics of the timers.
+
+    :return: Dictionary with the number of timers scheduled, fired, cancelled, failed, pending (waiting to fire)
+        and running, and the average and max lag between the scheduled time and the actual firing, in seconds.
+    """
+    return _stats.to_dict()
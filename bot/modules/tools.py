@@ -54,9 +54,9 @@ def is_al_num(string):
     return True
 
 
-def date_parser(string):
+def date_parser(string, default=None):
     try:
-        dtx = parser.parse(string, dayfirst=False, tzinfos=TZ_OFFSETS)
+        dtx = parser.parse(string, dayfirst=False, tzinfos=TZ_OFFSETS, default=default)
     except parser.ParserError:
         return
     try:
@@ -0,0 +1,182 @@
+"""
+| Lightweight tracing of the bot hot paths.
+| A span times a block of code: use ``with tracing.span("name", key=value):`` or decorate a function with
+  :meth:`traced`. Spans opened within another span (including in tasks created from it) become its children,
+  so that the time spent in a step can be attributed to its components.
+| Finished spans are exported in batches to :data:`EXPORT_PATH`, one OpenTelemetry (OTLP JSON) export request per
+  line, which can be read by the OpenTelemetry collector file receiver or any JSON tool.
+"""
+
+# External imports
+from contextvars import ContextVar
+from collections import deque
+from functools import wraps
+from inspect import iscoroutinefunction
+from logging import getLogger
+from random import getrandbits
+from time import time_ns
+import json
+import os
+
+# Internal imports
+import modules.timers as timers
+import modules.diagnostics as diagnostics
+
+log = getLogger("pog_bot")
+
+#: Path of the export file.
+EXPORT_PATH = "../../POG-data/traces/spans.jsonl"
+
+#: Finished spans are exported after this many seconds, so that spans of a same trace are written together.
+EXPORT_DELAY = 5
+
+#: Maximum number of spans waiting to be exported, oldest ones are dropped beyond.
+MAX_PENDING_SPANS = 10000
+
+_current_span = ContextVar("current_span", default=None)
+_pending = deque(maxlen=MAX_PENDING_SPANS)
+_is_export_scheduled = False
+
+
+class Span:
+    """
+    Timed block of code, see :meth:`span`.
+    """
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start", "end", "error", "__token")
+
+    def __init__(self, name, attributes):
+        parent = _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{getrandbits(128):032x}"
+        self.span_id = f"{getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start = 0
+        self.end = 0
+        self.error = None
+        self.__token = None
+
+    def set_attribute(self, key: str, value):
+        """
+        Add an attribute to the span.
+
+        :param key: Name of the attribute.
+        :param value: Value of the attribute (str, int, float or bool).
+        """
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.__token = _current_span.set(self)
+        self.start = time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time_ns()
+        _current_span.reset(self.__token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _pending.append(self)
+        _schedule_export()
+        return False
+
+    @property
+    def duration(self):
+        """
+        Duration of the span in seconds.
+        """
+        return (self.end - self.start) / 1e9
+
+    def to_otlp(self) -> dict:
+        """
+        Get the span in the OTLP JSON format.
+        """
+        span = {"traceId": self.trace_id,
+                "spanId": self.span_id,
+                "name": self.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(self.start),
+                "endTimeUnixNano": str(self.end),
+                "attributes": [{"key": key, "value": _to_otlp_value(value)} for key, value in self.attributes.items()]}
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error:
+            span["status"] = {"code": 2, "message": self.error}  # STATUS_CODE_ERROR
+        return span
+
+
+def _to_otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def span(name: str, **attributes) -> Span:
+    """
+    Create a span, to be used as a context manager. It is the child of the current span, if any.
+
+    :param name: Name of the span.
+    :param attributes: Attributes of the span, e.g. a match id.
+    :return: The span.
+    """
+    return Span(name, attributes)
+
+
+def traced(name: str = None):
+    """
+    Decorator running each call of a function (or coroutine function) in a span.
+
+    :param name: Name of the span, name of the function by default.
+    """
+    def decorator(fct):
+        span_name = name or fct.__name__
+
+        if iscoroutinefunction(fct):
+            @wraps(fct)
+            async def wrapper(*args, **kwargs):
+                with Span(span_name, dict()):
+                    return await fct(*args, **kwargs)
+        else:
+            @wraps(fct)
+            def wrapper(*args, **kwargs):
+                with Span(span_name, dict()):
+                    return fct(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_current_span() -> Span:
+    """
+    Get the current span, None if not in a span.
+    """
+    return _current_span.get()
+
+
+def _schedule_export():
+    global _is_export_scheduled
+    if not _is_export_scheduled:
+        _is_export_scheduled = True
+        timers.call_later(EXPORT_DELAY, _export)
+
+
+def _write(request):
+    os.makedirs(os.path.dirname(EXPORT_PATH), exist_ok=True)
+    with open(EXPORT_PATH, "a") as file:
+        file.write(request + "\n")
+
+
+async def _export():
+    global _is_export_scheduled
+    _is_export_scheduled = False
+    spans = [item.to_otlp() for item in _pending]
+    _pending.clear()
+    request = {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "pog_bot"}}]},
+        "scopeSpans": [{"scope": {"name": "pog_bot"}, "spans": spans}]}]}
+    try:
+        await diagnostics.run_in_executor("tracing", _write, json.dumps(request, separators=(",", ":")))
+    except OSError as e:
+        log.warning(f"Could not export {len(spans)} spans: {e}")
@@ -0,0 +1,76 @@
+# Memory benchmark of the score classes (classes/scores.py), run from the bot folder:
+# python score_classes_test_file.py [git revision]
+# Builds the score tree of NB_MATCHES synthetic matches, as MatchData does for each match loaded from the database,
+# and reports the memory allocated per match (tracemalloc).
+# If a git revision is given, the classes/scores.py of that revision is measured too, for comparison:
+# e.g. python score_classes_test_file.py HEAD~1
+
+import subprocess
+import sys
+import tracemalloc
+from random import Random
+from types import ModuleType
+
+import classes.scores
+import modules.config as cfg
+
+NB_MATCHES = 2000
+NB_PLAYERS = 6
+NB_LOADOUTS = 4
+
+
+def get_match_data(rng, m_id):
+    teams = list()
+    loadout_ids = list(cfg.loadout_id.keys())
+    for t_id in range(2):
+        players = list()
+        for p_id in range(NB_PLAYERS):
+            loadouts = list()
+            for l_id in rng.sample(loadout_ids, NB_LOADOUTS):
+                # Illegal weapons are rare
+                ill_weapons = [{"weapon_id": 80, "kills": 1}] if rng.random() < 0.02 else list()
+                loadouts.append({"loadout_id": l_id, "score": rng.randint(0, 500), "net": rng.randint(-20, 20),
+                                 "deaths": rng.randint(0, 20), "kills": rng.randint(0, 20),
+                                 "weight": rng.randint(1, 10), "headshots": rng.randint(0, 10),
+                                 "ill_weapons": ill_weapons})
+            players.append({"discord_id": m_id * 100 + t_id * 10 + p_id, "ig_name": f"Player{p_id}",
+                            "ig_id": p_id, "rounds": [True, True], "loadouts": loadouts})
+        teams.append({"name": f"Team {t_id + 1}", "faction_id": t_id + 1, "score": 0, "net": 0, "deaths": 0,
+                      "kills": 0, "cap_points": 0, "players": players})
+    return {"_id": m_id, "teams": teams}
+
+
+def load_revision(revision):
+    source = subprocess.run(["git", "show", f"{revision}:bot/classes/scores.py"], check=True,
+                            capture_output=True, text=True).stdout
+    module = ModuleType(f"scores_{revision}")
+    exec(compile(source, f"{revision}:classes/scores.py", "exec"), module.__dict__)
+    return module
+
+
+def measure(scores_module, all_data):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    matches = [[scores_module.TeamScore.from_data(i, None, data["teams"][i]) for i in range(2)] for data in all_data]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # Same content whatever the implementation
+    checksum = sum(tm.score + tm.kills + sum(len(p.loadouts) for p in tm.players) for teams in matches for tm in teams)
+    return size / len(matches), checksum
+
+
+def main():
+    rng = Random(0)
+    all_data = [get_match_data(rng, m_id) for m_id in range(NB_MATCHES)]
+    per_match, checksum = measure(classes.scores, all_data)
+    print(f"{NB_MATCHES} matches of 2 x {NB_PLAYERS} players with {NB_LOADOUTS} loadouts each")
+    print(f"current:  {per_match / 1000:.1f} kB per match")
+    if len(sys.argv) > 1:
+        revision = sys.argv[1]
+        old_per_match, old_checksum = measure(load_revision(revision), all_data)
+        assert checksum == old_checksum, "Both implementations should load the same scores"
+        print(f"{revision}: {old_per_match / 1000:.1f} kB per match")
+
+
+if __name__ == "__main__":
+    main()
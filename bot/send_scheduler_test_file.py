@@ -0,0 +1,69 @@
+# Test script for the message scheduler (modules/send_scheduler.py), run from the bot folder:
+# python send_scheduler_test_file.py
+# Discord is replaced by stand-in channels which record when each message is sent, then the script checks that:
+# - no channel sent more than CHANNEL_CAPACITY messages within CHANNEL_PERIOD seconds (no 429 from discord)
+# - messages of one channel are sent in order, high priority ones first
+# - batchable low priority messages are merged, callers get None for them
+# - non batchable low priority messages are sent alone and callers get their own message
+
+import asyncio
+from time import monotonic
+
+import modules.send_scheduler as send_scheduler
+
+
+class StandInChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = list()
+
+    async def send(self, content):
+        # Rough discord latency
+        await asyncio.sleep(0.05)
+        message = (monotonic(), content)
+        self.sent.append(message)
+        return message
+
+
+def max_in_window(stamps, period):
+    best = 0
+    for i, stamp in enumerate(stamps):
+        best = max(best, len([s for s in stamps[i:] if s - stamp < period]))
+    return best
+
+
+async def main():
+    channels = [StandInChannel(i) for i in range(1, 4)]
+    log_channel = StandInChannel(99)
+    send_scheduler.init(high_channels=[1], low_channels=[99])
+    start = monotonic()
+
+    jobs = list()
+    for i in range(12):
+        for channel in channels:
+            jobs.append(send_scheduler.submit(channel.id, channel.send, {"content": f"{channel.id}-{i}"}))
+    batched = [send_scheduler.submit(99, log_channel.send, {"content": f"log {i}"}, batchable=True)
+               for i in range(30)]
+    own = send_scheduler.submit(99, log_channel.send, {"content": "kept"})
+    results = await asyncio.gather(*jobs)
+    batched_results = await asyncio.gather(*batched)
+    own_result = await own
+    duration = monotonic() - start
+
+    for channel in channels + [log_channel]:
+        stamps = [stamp for stamp, _ in channel.sent]
+        worst = max_in_window(stamps, send_scheduler.CHANNEL_PERIOD)
+        print(f"channel {channel.id}: {len(channel.sent)} discord calls, "
+              f"max {worst} in {send_scheduler.CHANNEL_PERIOD}s (capacity {send_scheduler.CHANNEL_CAPACITY})")
+        assert worst <= send_scheduler.CHANNEL_CAPACITY
+    for channel in channels:
+        contents = [content for _, content in channel.sent]
+        assert contents == [f"{channel.id}-{i}" for i in range(12)], contents
+    assert all(result is not None for result in results)
+    assert all(result is None for result in batched_results)
+    assert own_result[1] == "kept"
+    print(f"{len(jobs) + len(batched) + 1} messages in {duration:.1f}s, stats: {send_scheduler.get_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+# Test script for the Squittal operation queue (match/plugins/squittal_interface.py), run from the bot folder:
+# python squittal_test_file.py
+# A local aiohttp server stands in for the Squittal server and records the operations it receives, then the
+# script checks that:
+# - operations are posted in order, and a full match setup takes far less than the previous one second per post
+# - an operation queued several times before being posted is only posted with its latest payload
+# - a clear drops the operations queued before it
+# - an operation failing with a server error is retried, unless queued again in the meantime
+
+import asyncio
+from time import perf_counter
+
+from aiohttp import web
+
+import modules.asynchttp as asynchttp
+import modules.config as cfg
+from match.plugins.squittal_interface import _OperationQueue
+
+PORT = 8765
+
+
+class StandInSquittal:
+    def __init__(self):
+        self.received = list()
+        # Endpoint -> number of server errors still to return for it
+        self.failures = dict()
+
+    async def handle(self, request):
+        endpoint = request.match_info["endpoint"]
+        if self.failures.get(endpoint):
+            self.failures[endpoint] -= 1
+            return web.Response(status=503)
+        self.received.append((endpoint, await request.text()))
+        return web.Response(status=200)
+
+
+async def wait_posted(queue_fct, server, nb_expected, timeout=10):
+    start = perf_counter()
+    queue_fct()
+    while len(server.received) < nb_expected:
+        if perf_counter() - start > timeout:
+            raise AssertionError(f"Only {len(server.received)} operations received: {server.received}")
+        await asyncio.sleep(0.01)
+    duration = perf_counter() - start
+    # Give the queue a chance to post anything unexpected
+    await asyncio.sleep(0.1)
+    return duration
+
+
+async def main():
+    server = StandInSquittal()
+    app = web.Application()
+    app.router.add_post("/api/{endpoint:.*}", server.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+    cfg.general["squittal_url"] = f"http://127.0.0.1:{PORT}"
+    await asynchttp.init_http()
+    try:
+        queue = _OperationQueue()
+
+        # Match setup, teams updated several times before the first flush
+        queue.put("base", '"1"')
+        queue.put("clear")
+        queue.put("title", '"Match 1"')
+        queue.put("length", '"600"')
+        for i in range(5):
+            queue.put("teams/1", f'{{"version": {i}}}')
+            queue.put("teams/2", f'{{"version": {i}}}')
+        duration = await wait_posted(queue.flush, server, 5)
+        assert server.received == [("clear", ""), ("title", '"Match 1"'), ("length", '"600"'),
+                                   ("teams/1", '{"version": 4}'), ("teams/2", '{"version": 4}')], server.received
+        print(f"Match setup: 5 operations posted in {duration * 1000:.0f}ms (previously at least 5s)")
+
+        # A failed operation is retried
+        server.received.clear()
+        server.failures["start"] = 1
+        queue.put("start")
+        duration = await wait_posted(queue.flush, server, 1)
+        assert server.received == [("start", "")], server.received
+        print(f"Operation posted after one server error in {duration:.1f}s")
+
+        # A failed operation queued again during its backoff is superseded by the new payload
+        server.received.clear()
+        server.failures["teams/1"] = 1
+        queue.put("teams/1", '{"version": 5}')
+        queue.flush()
+        while server.failures["teams/1"]:
+            await asyncio.sleep(0.01)
+        queue.put("teams/1", '{"version": 6}')
+        await wait_posted(queue.flush, server, 1)
+        assert server.received == [("teams/1", '{"version": 6}')], server.received
+        print("Failed operation superseded by its new payload")
+        print(f"Connections: {asynchttp.get_stats()['squittal']}")
+    finally:
+        await asynchttp.close_http()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,184 +1,211 @@
-from classes import Player, PlayerStat
-import asyncio
+"""
+| Command line analytics over the match history.
+| Queries run on the columnar store of :mod:`modules.match_history` (memory-mapped, rebuild it with `export`),
+  except `latency` which streams the `match_logs` collection. Memory use does not depend on the history size.
+| Usage: `python stat_scripts.py <command> [options]`, see `python stat_scripts.py -h`.
+"""
+
+# External imports
+import argparse
 import os
-import operator
 import statistics
+from datetime import datetime as dt, timezone as tz
+from time import perf_counter
 import numpy as np
-import modules.tools as tools
-from match.classes import Match
-from classes import Player
-from datetime import datetime as dt
 
+# Internal imports
 import modules.config as cfg
 import modules.database as db
+import modules.match_history as match_history
+
+#: Metrics available for the `top` command.
+METRICS = ("kills", "deaths", "net", "score", "headshots", "matches", "captain", "kpm")
+
+
+def _parse_date(value):
+    return dt.strptime(value, "%Y-%m-%d").replace(tzinfo=tz.utc)
+
+
+def _load_columns(args):
+    """
+    Load the store, filtered by the date range and round length of the arguments.
+    """
+    columns = match_history.load(args.folder)
+    if not columns:
+        raise SystemExit(f"No match history in '{args.folder}', run the 'export' command first")
+    mask = np.ones(len(columns["match_id"]), dtype=bool)
+    if args.begin:
+        mask &= columns["round_1_stamp"] >= args.begin.timestamp()
+    if args.end:
+        mask &= columns["round_1_stamp"] < args.end.timestamp()
+    if args.round_length:
+        mask &= columns["round_length"] == args.round_length
+    if mask.all():
+        return columns
+    return {name: col[mask] for name, col in columns.items()}
+
+
+def _get_name(collection, e_id):
+    try:
+        return db.get_field(collection, int(e_id), "name") or "N/A"
+    except Exception:
+        return "N/A"
+
+
+def cmd_export(args):
+    nb_matches = match_history.export_all(args.folder)
+    print(f"Exported {nb_matches} matches to '{args.folder}'")
+
+
+def cmd_top(args):
+    columns = _load_columns(args)
+    if args.per_match:
+        if args.metric not in ("kills", "deaths", "net", "score", "headshots"):
+            raise SystemExit(f"Metric '{args.metric}' is not available per match")
+        values = columns[args.metric]
+        # Skip rows without any stat (player was not tracked)
+        valid = (columns["kills"] != 0) | (columns["deaths"] != 0) | (columns["net"] != 0)
+        indices = np.flatnonzero(valid)
+        order = indices[np.argsort(values[indices], kind="stable")[::-1][:args.n]]
+        print(f"Best {args.metric} in one match, top {args.n}:")
+        for i, row in enumerate(order):
+            p_id = columns["player_id"][row]
+            print(f"{i + 1}: Player `{_get_name('users', p_id)}` [`{p_id}`, in match `{columns['match_id'][row]}`, "
+                  f"{args.metric}: `{values[row]}`]")
+        return
+
+    player_ids, inverse = np.unique(columns["player_id"], return_inverse=True)
+    nb_matches = np.bincount(inverse)
+    if args.metric == "matches":
+        values = nb_matches
+    elif args.metric == "captain":
+        values = np.bincount(inverse, weights=columns["is_captain"])
+    elif args.metric == "kpm":
+        # Kills per minute of play, as PlayerStat.kpm: play time is round length times rounds played
+        time_played = np.bincount(inverse, weights=columns["round_length"].astype(np.int64) * columns["nb_rounds"])
+        kills = np.bincount(inverse, weights=columns["kills"])
+        values = np.divide(kills, time_played, out=np.zeros(len(kills)), where=time_played != 0)
+    else:
+        values = np.bincount(inverse, weights=columns[args.metric])
+    valid = np.flatnonzero(nb_matches >= args.min_matches)
+    order = valid[np.argsort(values[valid], kind="stable")[::-1][:args.n]]
+    print(f"Highest {args.metric}, top {args.n}:")
+    for i, p in enumerate(order):
+        value = values[p]
+        value = f"{value:.2f}" if args.metric == "kpm" else int(value)
+        print(f"{i + 1}: id: [{player_ids[p]}], name: [{_get_name('users', player_ids[p])}], "
+              f"nb_matches: [{nb_matches[p]}], value: [{value}]")
+
+
+def _get_team_rows(columns):
+    """
+    One row per team per match: keep the captain rows only.
+    """
+    captains = columns["is_captain"]
+    return {name: col[captains] for name, col in columns.items()}
+
+
+def cmd_bases(args):
+    teams = _get_team_rows(_load_columns(args))
+    base_ids, inverse = np.unique(teams["base_id"], return_inverse=True)
+    nb_matches = np.bincount(inverse) // 2
+    print(f"{'Base':<32}{'Matches':>8}" + "".join(f"{name + ' win%':>10}" for name in cfg.factions.values()))
+    for b in np.argsort(nb_matches, kind="stable")[::-1]:
+        line = f"{_get_name('static_bases', base_ids[b]):<32}{nb_matches[b]:>8}"
+        for f_id in cfg.factions:
+            played = (inverse == b) & (teams["faction"] == f_id)
+            nb_played = np.count_nonzero(played)
+            if nb_played:
+                line += f"{100 * np.count_nonzero(played & teams['won']) / nb_played:>9.1f}%"
+            else:
+                line += f"{'-':>10}"
+        print(line)
+
+
+def cmd_factions(args):
+    teams = _get_team_rows(_load_columns(args))
+    print(f"{'Faction':<10}{'Teams':>8}{'Wins':>8}{'Win%':>8}{'Avg score':>12}")
+    for f_id, name in cfg.factions.items():
+        rows = teams["faction"] == f_id
+        nb_teams = np.count_nonzero(rows)
+        if not nb_teams:
+            continue
+        nb_wins = np.count_nonzero(rows & teams["won"])
+        print(f"{name:<10}{nb_teams:>8}{nb_wins:>8}{100 * nb_wins / nb_teams:>7.1f}%"
+              f"{teams['team_score'][rows].mean():>12.1f}")
+    print(f"\n{'Side':<10}{'Teams':>8}{'Wins':>8}{'Win%':>8}{'Avg score':>12}")
+    for t_id in (0, 1):
+        rows = teams["team"] == t_id
+        nb_teams = np.count_nonzero(rows)
+        if not nb_teams:
+            continue
+        nb_wins = np.count_nonzero(rows & teams["won"])
+        print(f"{'Team ' + str(t_id + 1):<10}{nb_teams:>8}{nb_wins:>8}{100 * nb_wins / nb_teams:>7.1f}%"
+              f"{teams['team_score'][rows].mean():>12.1f}")
 
 
-if os.path.isfile("test"):
-    LAUNCHSTR = "_test"
-else:
-    LAUNCHSTR = ""
-
-cfg.get_config("")
-db.init(cfg.database)
-
-db.get_all_elements(Player.new_from_data, "users")
-
-
-def get_all_stats():
-    all_stats = list()
-
-    def from_data(dta):
-        p = Player.get(dta["_id"])
-        if p:
-            name = p.name
-        else:
-            name = "N/A"
-        stat_p = PlayerStat(dta["_id"], name=name, data=dta)
-        if stat_p.nb_matches_played > 1:
-            all_stats.append(stat_p)
-
-    db.get_all_elements(from_data, "player_stats")
-
-    print("Highest Kills per match:")
-    key = operator.attrgetter("kpm")
-    sorted_stats = sorted(all_stats, key=key, reverse=True)
-    for s in sorted_stats[:5]:
-        print(f"id: [{s.id}], name: [{s.name}], nb_matches: [{s.nb_matches_played}], value: [{s.kpm}]")
-
-    print("Highest Number of matches played, top 5:")
-    key = operator.attrgetter("nb_matches_played")
-    sorted_stats = sorted(all_stats, key=key, reverse=True)
-    for s in sorted_stats[:5]:
-        print(f"id: [{s.id}], name: [{s.name}], nb_matches: [{s.nb_matches_played}], value: [{s.nb_matches_played}]")
-
-    print("Highest Number of times captain, top 5:")
-    key = operator.attrgetter("times_captain")
-    sorted_stats = sorted(all_stats, key=key, reverse=True)
-    for s in sorted_stats[:5]:
-        print(f"id: [{s.id}], name: [{s.name}], nb_matches: [{s.nb_matches_played}], value: [{s.times_captain}]")
-
-    print("Highest ratio of captain / match, top 10:")
-    key = operator.attrgetter("cpm")
-    sorted_stats = sorted(all_stats, key=key, reverse=True)
-    for s in sorted_stats[:10]:
-        print(f"id: [{s.id}], name: [{s.name}], nb_matches: [{s.nb_matches_played}], value: [{s.cpm}]")
-
-
-_all_db_matches = list()
-
-
-class DbMatch:
-    @classmethod
-    def new_from_data(cls, data):
-        obj = cls(data)
-        _all_db_matches.append(obj)
-
-    def __init__(self, data):
-        self.data = data
-        self.id = data["_id"]
-        self.match = Match(data=data)
-
-    @property
-    def launch(self):
-        return self.data["match_launching"]
-
-    @property
-    def start(self):
-        return self.data["rounds"][0]["timestamp"]
-
-
-def get_match_stats():
-    teams_scores = [0, 0]
-    win_nb = [0, 0]
-    db.get_all_elements(DbMatch.new_from_data, "matches")
-    for m in _all_db_matches:
-        t0 = m.data["teams"][0]["score"]
-        t1 = m.data["teams"][1]["score"]
-        teams_scores[0] += t0
-        teams_scores[1] += t1
-        if t1 >= t0:
-            win_nb[1] += 1
-        else:
-            win_nb[0] += 1
-
-    print(teams_scores)
-    print(win_nb)
-
+def cmd_latency(args):
+    delays = list()
+    begin = args.begin.timestamp() if args.begin else None
+    end = args.end.timestamp() if args.end else None
 
-def get_match_logs():
-    db.get_all_elements(DbMatch.new_from_data, "match_logs")
-    average = list()
-    for m in _all_db_matches:
+    def from_data(data):
         try:
-            average.append(m.start - m.launch)
-        except KeyError:
-            pass
-    print(f"mean: {statistics.mean(average)}")
-    print(f"median: {statistics.median(average)}")
-    std = np.std(average)
-    print(statistics.quantiles(average))
-    print(std)
-
-
-class NetScore:
-    def __init__(self, id, value, match_id):
-        self.player = Player.get(id)
-        self.value = value
-        self.match = match_id
-
-
-def get_best_net():
-    players = list()
-    db.get_all_elements(DbMatch.new_from_data, "matches")
-    for m in _all_db_matches:
-        if m.match.data.round_length > 10:
-            print("skipping 15 min")
-            continue
-        invalid = False
-        for tm in m.match.data.teams:
-            for p in tm.players:
-                if p.net == 0 and p.kills == 0 and p.deaths == 0:
-                    print("skipping invalid")
-                    invalid = True
-                    break
-            if invalid:
-                break
-        if invalid:
-            continue
-
-        # if abs(m.match.data.teams[0].score - m.match.data.teams[1].score) > 30:
-        #     continue
-
-        for tm in m.match.data.teams:
-            for p in tm.players:
-                n = NetScore(p.id, p.net, m.match.id)
-                players.append(n)
-                # if p.id not in players:
-                #     players[p.id] = n
-                # elif p.kills > players[p.id].value:
-                #     players[p.id] = n
-
-    srt = sorted(players, key=operator.attrgetter("value"), reverse=True)
-    for i, s in enumerate(srt[:50]):
-        print(f"{i}: Player `{s.player.name}` [`{s.player.id}`, in match `{s.match}`, NET: `{s.value}`]")
-
-
-def get_match_stats_2(begin, end):
-    db.get_all_elements(DbMatch.new_from_data, "matches")
-    matches = list()
-    players = tools.AutoDict()
-    for m in _all_db_matches:
-        mdta = m.match.data
-        if begin.timestamp() <= mdta.round_stamps[0] <= end.timestamp():
-            matches.append(mdta)
-            for team in mdta.teams:
-                for player in team.players:
-                    players.auto_add(player.id, 1)
-    players = {k: v for k, v in sorted(players.items(), key=lambda item: item[1])}
-    for k, v in players.items():
-        print(f"Id `{k}` name `{Player.get(k).name}` => {v} matches")
-
-
-
-# get_match_stats_2(begin=dt(year=2022, month=7, day=9), end=dt(year=2022, month=11, day=10))
-get_best_net()
+            launch = data["match_launching"]
+            start = data["rounds"][0]["timestamp"]
+        except (KeyError, IndexError, TypeError):
+            return
+        if (begin and launch < begin) or (end and launch >= end):
+            return
+        delays.append(start - launch)
+
+    # Only the two needed fields are fetched, documents are not kept
+    db.get_all_elements(from_data, "match_logs", fields=["match_launching", "rounds.timestamp"])
+    if len(delays) < 2:
+        raise SystemExit("Not enough match logs in this range")
+    print(f"Lobby to start latency over {len(delays)} matches (seconds):")
+    print(f"mean: {statistics.mean(delays):.1f}")
+    print(f"median: {statistics.median(delays):.1f}")
+    print(f"std: {statistics.pstdev(delays):.1f}")
+    print(f"quartiles: {', '.join(f'{q:.1f}' for q in statistics.quantiles(delays))}")
+
+
+def _get_parser():
+    parser = argparse.ArgumentParser(description="POG match history analytics")
+    parser.add_argument("--folder", default=match_history.FOLDER, help="folder of the match history store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, fct, help_str, filters=True):
+        cmd = sub.add_parser(name, help=help_str)
+        cmd.set_defaults(fct=fct)
+        if not filters:
+            return cmd
+        cmd.add_argument("--begin", type=_parse_date, help="only matches from this date (YYYY-MM-DD)")
+        cmd.add_argument("--end", type=_parse_date, help="only matches before this date (YYYY-MM-DD)")
+        cmd.add_argument("--round-length", type=int, help="only matches with this round length (minutes)")
+        return cmd
+
+    add_command("export", cmd_export, "rebuild the match history store from the database", filters=False)
+    top = add_command("top", cmd_top, "top players by metric")
+    top.add_argument("metric", choices=METRICS)
+    top.add_argument("-n", type=int, default=10, help="number of results")
+    top.add_argument("--min-matches", type=int, default=2, help="minimum number of matches played")
+    top.add_argument("--per-match", action="store_true", help="best single match performances instead of totals")
+    add_command("bases", cmd_bases, "win rates per base and faction")
+    add_command("factions", cmd_factions, "faction and side balance")
+    add_command("latency", cmd_latency, "lobby to match start latency, from match logs")
+    return parser
+
+
+def main():
+    args = _get_parser().parse_args()
+    launch_str = "_test" if os.path.isfile("test") else ""
+    cfg.get_config(launch_str)
+    db.init(cfg.database)
+    start = perf_counter()
+    args.fct(args)
+    print(f"\n[{args.command}: {perf_counter() - start:.2f}s]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Benchmark of the timers (modules/timers.py), run from the bot folder:
+# python timers_test_file.py
+# Schedules NB_TIMERS delayed one-shot calls, first as the bot used to with Loop(seconds=delay, delay=1, count=2),
+# then with timers.call_later, and reports for each: scheduling time, memory held while pending, and firing lag.
+# Then checks that cancelled timers never fire and that a repeating timer fires the requested number of times.
+
+import asyncio
+import tracemalloc
+from time import perf_counter
+
+import modules.timers as timers
+from lib.tasks import Loop
+
+NB_TIMERS = 5000
+DELAY = 0.5
+
+
+async def run(name, schedule):
+    fired = list()
+
+    async def on_timer(scheduled_at):
+        fired.append(perf_counter() - scheduled_at - DELAY)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = perf_counter()
+    handles = [schedule(on_timer) for _ in range(NB_TIMERS)]
+    schedule_time = perf_counter() - start
+    # Let the Loop tasks reach their sleep
+    await asyncio.sleep(0)
+    pending_size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    while len(fired) < NB_TIMERS:
+        await asyncio.sleep(0.05)
+    fired.sort()
+    print(f"{name:<12} schedule: {schedule_time * 1e6 / NB_TIMERS:6.1f}us per timer, "
+          f"pending: {pending_size / NB_TIMERS:6.0f} bytes per timer, "
+          f"lag avg {sum(fired) / NB_TIMERS * 1000:.1f}ms, max {fired[-1] * 1000:.1f}ms")
+    return handles
+
+
+def schedule_loop(on_timer):
+    loop = Loop(coro=on_timer, seconds=DELAY, delay=1, count=2)
+    loop.start(perf_counter())
+    return loop
+
+
+def schedule_timer(on_timer):
+    return timers.call_later(DELAY, on_timer, perf_counter())
+
+
+async def main():
+    await run("Loop", schedule_loop)
+    await run("call_later", schedule_timer)
+
+    fired = list()
+
+    async def on_timer(i):
+        fired.append(i)
+
+    handles = [timers.call_later(0.1, on_timer, i) for i in range(100)]
+    for handle in handles[::2]:
+        handle.cancel()
+    repeating = timers.call_every(0.05, on_timer, -1, count=5)
+    await asyncio.sleep(0.5)
+    assert sorted(i for i in fired if i >= 0) == list(range(1, 100, 2)), "Cancelled timers should not fire"
+    assert fired.count(-1) == 5 and not repeating.is_active, "Repeating timer should fire 5 times"
+    print(f"Cancellation and repetition ok, stats: {timers.get_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+# Test script for the TS3 audio cue scheduler (match/plugins/ts3_interface.py), run from the bot folder:
+# python ts3_test_file.py
+# A local aiohttp server stands in for the TS3AudioBot and records the calls it receives, then the script checks
+# that:
+# - cues due within COALESCE_WINDOW seconds are merged in one playlist call
+# - a lobby subscription change is sent in the same call as its clips
+# - a clip already pending for the same bot at about the same time is not played twice, even if cued by another
+#   scheduler, while other bots still play it
+# - cancelled cues (match cleaned) are never sent
+
+import asyncio
+from time import perf_counter
+from types import SimpleNamespace
+
+from aiohttp import web
+
+import modules.asynchttp as asynchttp
+import modules.config as cfg
+import match.plugins.ts3_interface as ts3
+from match.plugins.ts3_interface import _CueScheduler
+
+PORT = 8766
+LOBBY_ID = 42
+
+
+class StandInAudioBot:
+    def __init__(self):
+        self.calls = list()
+
+    async def handle(self, request):
+        self.calls.append((perf_counter(), request.path))
+        return web.Response(status=204)
+
+
+def playlist(num, clips, subscription=""):
+    commands = "".join(f"(/add/{clip}.mp3)" for clip in clips)
+    return f"/api/bot/template/{num}(/xecute{subscription}{commands}(/play))"
+
+
+async def expect(server, expected, wait):
+    await asyncio.sleep(wait)
+    paths = [path for stamp, path in server.calls]
+    assert paths == expected, paths
+    server.calls.clear()
+
+
+async def main():
+    server = StandInAudioBot()
+    app = web.Application()
+    app.router.add_get("/api/bot/template/{commands:.*}", server.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+    cfg.ts["url"] = f"http://127.0.0.1:{PORT}"
+    cfg.ts["lobby_id"] = LOBBY_ID
+    await asynchttp.init_http()
+    try:
+        bot_1 = SimpleNamespace(num=1, lobby=False)
+        cues_1 = _CueScheduler(bot_1)
+
+        # Cues close to each other: one call
+        cues_1.cue(["base_selected", "base_1"])
+        cues_1.cue(["type_ready"], delay=0.2)
+        await expect(server, [playlist(1, ["base_selected", "base_1", "type_ready"])], 0.6)
+        print("Cues within the coalescing window merged in one call")
+
+        # Lobby subscription sent with its clips
+        cues_1.cue(["drop_match_1_picks"], lobby=True)
+        await expect(server, [playlist(1, ["drop_match_1_picks"], f"(/subscribe/channel/{LOBBY_ID})")], 0.3)
+        cues_1.cue(["select_teams"])
+        await expect(server, [playlist(1, ["select_teams"], f"(/unsubscribe/channel/{LOBBY_ID})")], 0.3)
+        print("Lobby subscription changes sent along with their clips")
+
+        # Same clip cued twice for the same bot, once for another bot
+        cues_1_bis = _CueScheduler(bot_1)
+        cues_2 = _CueScheduler(SimpleNamespace(num=2, lobby=False))
+        cues_1.cue(["30s"], delay=0.1)
+        cues_1_bis.cue(["30s"], delay=0.2)
+        cues_2.cue(["30s"], delay=0.1)
+        await expect(server, [playlist(1, ["30s"]), playlist(2, ["30s"])], 0.5)
+        print("Duplicate clip for the same bot dropped, other bot still played it")
+
+        # Match cleaned before its cues are due
+        cues_1.cue(["10s"], delay=0.3)
+        cues_1.cue(["5s"], delay=0.6)
+        cues_1.cancel()
+        await expect(server, [], 0.9)
+        assert not ts3._pending_clips, ts3._pending_clips
+        print("Cancelled cues never sent")
+
+        print(f"Stats: {ts3.get_stats()}")
+    finally:
+        await asynchttp.close_http()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())